@@ -0,0 +1,25 @@
+"""Lazy package attributes (PEP 562).
+
+Each subpackage's ``__init__`` maps its public names to the submodules that
+define them and installs the pair of functions returned by `lazy_module`, so
+that importing a package does not pull in pandas, pvlib or scikit-learn until a
+name that needs them is used.
+"""
+import importlib
+import sys
+
+
+def lazy_module(name: str, mapping: dict):
+    """(``__getattr__``, ``__dir__``) for package `name` resolving `mapping` (attribute -> relative module) on first use."""
+    def __getattr__(attr):
+        module = mapping.get(attr)
+        if module is None:
+            raise AttributeError(f"module {name!r} has no attribute {attr!r}")
+        value = getattr(importlib.import_module(module, name), attr)
+        setattr(sys.modules[name], attr, value)
+        return value
+
+    def __dir__():
+        return sorted(set(vars(sys.modules[name])) | set(mapping))
+
+    return __getattr__, __dir__
@@ -0,0 +1,2 @@
+"""Package version (part of every `aeroaqua.pipelines.result_cache` key)."""
+__version__ = '0.1.0'
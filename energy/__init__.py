@@ -1,3 +1,14 @@
-from .solarenergy import compute_daily_energy_from_location_date
+"""Daily solar energy helpers: daily totals and integration schemes."""
+from aeroaqua._lazy import lazy_module
 
-__all__ = ['compute_daily_energy_from_location_date']
+_LAZY = {
+    'compute_daily_energy_from_location_date': '.solarenergy',
+    'compute_daily_energy_for_sites': '.solarenergy',
+    'integrate_day': '.integration',
+    'integrate_samples': '.integration',
+    'clearsky_ghi_function': '.integration',
+}
+
+__all__ = list(_LAZY)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY)
@@ -0,0 +1,202 @@
+"""Daily energy integration schemes.
+
+Every scheme integrates an irradiance function ``ghi_fn(times) -> W/m^2`` (times is a
+tz-aware DatetimeIndex, evaluated in batches) over one local calendar day and
+returns kWh/m^2 together with the number of timestamps evaluated:
+
+- ``rectangle``: left rectangle sum at `freq` on 00:00..(24:00 - freq), the scheme
+  the pipelines have always used;
+- ``trapezoid`` / ``simpson``: composite rules on 00:00..24:00 at `freq`;
+- ``adaptive``: batched adaptive Simpson. The day starts as `initial_freq` panels;
+  each round evaluates the midpoints of all unresolved panels in one call and
+  splits the panels whose error estimate exceeds their share of the tolerance.
+  The estimate is the full difference between two refinement levels, and a
+  panel is accepted only when two levels in a row meet it; the tolerance spent
+  by accepted panels never exceeds the target (except at `min_step`). Flat
+  stretches (night, mid-day) stay coarse while the kinks at sunrise and sunset
+  get refined.
+
+Cost of ``adaptive`` measured by `aeroaqua.scripts.integration_report` (six Toronto
+days, 0.25% relative tolerance, default 4-hour starting panels), against a
+1-minute reference:
+
+- clear-sky GHI: 81-105 evaluations per day (mean 92), within 0.012%;
+- RF GHI (the benchmark suite's synthetic forest): 693-1185 evaluations per day
+  (mean 989), within 0.014%. The forest's output is a staircase with small steps
+  every minute or so, and the error estimate does not shrink across steps until
+  the panels are minutes wide.
+
+For smooth GHI that is about 1.5x fewer evaluations than the default 10-minute
+rectangle (144 per day); for RF GHI it is about 7x more, so the RF pipelines
+should keep the rectangle unless the error bound itself is needed. The
+coarsest fixed step that met 0.5% on each day, chosen against the reference
+(which production runs do not have), needed 12-25 evaluations for clear-sky
+and 12-73 for RF. Evaluations are at least ``8 * day / initial_freq + 1``,
+because every starting panel is split twice before it can be accepted.
+"""
+import numpy as np
+
+
+METHODS = ('rectangle', 'trapezoid', 'simpson', 'adaptive')
+
+
+def _hours(freq) -> float:
+    import pandas as pd
+    return pd.Timedelta(freq).total_seconds() / 3600.0
+
+
+def _day_bounds(date_str: str, timezone: str):
+    import pandas as pd
+
+    start = pd.Timestamp(date_str).tz_localize(timezone)
+    end = (pd.Timestamp(date_str) + pd.Timedelta(days=1)).tz_localize(timezone)
+    return start, end
+
+
+def integrate_samples(times, ghi, method: str = 'rectangle', freq: str = '10T') -> float:
+    """Integrate sampled GHI (W/m^2) into kWh/m^2.
+
+    ``rectangle`` weights each sample by the gap to the previous one (`freq` for the
+    first); ``trapezoid`` and ``simpson`` integrate over the sample span (Simpson
+    needs uniform spacing and falls back to a trapezoid on a trailing odd interval).
+    """
+    ghi = np.asarray(ghi, dtype=float)
+    if method == 'rectangle':
+        dt = np.empty(len(ghi))
+        dt[0] = _hours(freq)
+        dt[1:] = np.diff(times.asi8) / 1e9 / 3600
+        return (ghi * dt).sum() / 1000.0
+    t = (times.asi8 - times.asi8[0]) / 3.6e12  # hours from the first sample
+    if method == 'trapezoid':
+        return (np.diff(t) * (ghi[1:] + ghi[:-1]) / 2).sum() / 1000.0
+    if method == 'simpson':
+        n = len(t) - 1
+        even = n - n % 2
+        h = (t[even] - t[0]) / even if even else 0.0
+        wh = h / 3 * (ghi[0:even:2] + 4 * ghi[1:even:2] + ghi[2:even + 1:2]).sum() if even else 0.0
+        if n % 2:
+            wh += (t[-1] - t[-2]) * (ghi[-1] + ghi[-2]) / 2
+        return wh / 1000.0
+    raise ValueError(f'Unknown integration method {method!r}; expected one of {METHODS}')
+
+
+def integrate_day(
+    ghi_fn,
+    date_str: str,
+    timezone: str,
+    method: str = 'rectangle',
+    freq: str = '10T',
+    tol_kwh: float = 0.005,
+    rel_tol: float = None,
+    initial_freq: str = '240T',
+    min_step: str = '30S',
+) -> dict:
+    """Daily energy (kWh/m^2) of `ghi_fn` over the local calendar day `date_str`.
+
+    Args:
+        ghi_fn: vectorized callable(DatetimeIndex) -> GHI in W/m^2.
+        method: one of METHODS.
+        freq: sample spacing of the fixed-step schemes.
+        tol_kwh: absolute error target of the adaptive scheme (None for none).
+        rel_tol: optional error target relative to the day's energy; when both
+            targets are given the stricter one applies.
+        initial_freq, min_step: starting panel width and smallest panel width of
+            the adaptive scheme.
+
+    Returns:
+        dict with keys: solar_energy_kwh_m2, evaluations, method.
+    """
+    import pandas as pd
+
+    start, end = _day_bounds(date_str, timezone)
+    if method == 'rectangle':
+        times = pd.date_range(start, end, freq=freq, inclusive='left')
+    elif method in ('trapezoid', 'simpson'):
+        times = pd.date_range(start, end, freq=freq)
+    elif method == 'adaptive':
+        return _adaptive_simpson(ghi_fn, start, end, tol_kwh, rel_tol, initial_freq, min_step)
+    else:
+        raise ValueError(f'Unknown integration method {method!r}; expected one of {METHODS}')
+
+    ghi = np.asarray(ghi_fn(times), dtype=float)
+    return {
+        'solar_energy_kwh_m2': float(integrate_samples(times, ghi, method, freq)),
+        'evaluations': len(times),
+        'method': method,
+    }
+
+
+def _adaptive_simpson(ghi_fn, start, end, tol_kwh, rel_tol, initial_freq, min_step):
+    import pandas as pd
+
+    if tol_kwh is None and rel_tol is None:
+        raise ValueError('The adaptive scheme needs tol_kwh, rel_tol or both')
+    span = (end - start).total_seconds() / 3600.0
+    n_panels = max(1, int(round(span / _hours(initial_freq))))
+    min_width = _hours(min_step)
+
+    def evaluate(hours):
+        times = start + pd.to_timedelta(np.asarray(hours) * 3600.0, unit='s')
+        return np.asarray(ghi_fn(pd.DatetimeIndex(times)), dtype=float)
+
+    # panel = [a, b] with samples at a, (a+b)/2 and b
+    nodes = np.linspace(0.0, span, 2 * n_panels + 1)
+    values = evaluate(nodes)
+    evaluations = len(nodes)
+    a, b = nodes[0:-1:2], nodes[2::2]
+    fa, fm, fb = values[0:-1:2], values[1::2], values[2::2]
+    whole = (b - a) / 6 * (fa + 4 * fm + fb)
+    # whether the panel's parent already met its share; the starting panels have none
+    parent_ok = np.zeros(len(a), dtype=bool)
+
+    total_wh = spent_wh = 0.0
+    while len(a):
+        m = (a + b) / 2
+        lm, rm = (a + m) / 2, (m + b) / 2
+        f_mid = evaluate(np.concatenate([lm, rm]))
+        evaluations += 2 * len(a)
+        flm, frm = f_mid[:len(a)], f_mid[len(a):]
+        left = (m - a) / 6 * (fa + 4 * flm + fm)
+        right = (b - m) / 6 * (fm + 4 * frm + fb)
+        err = left + right - whole
+
+        # the stricter target applies; the relative one follows the current estimate of the day
+        tol_wh = np.inf if tol_kwh is None else tol_kwh * 1000.0
+        if rel_tol is not None:
+            tol_wh = min(tol_wh, rel_tol * abs(total_wh + (left + right).sum()))
+        # The difference between the two levels is taken as the error itself, without
+        # Richardson's 1/15: the forest output is piecewise constant in time, and across
+        # a step Simpson's error does not shrink 16-fold per halving. A panel may use its
+        # share (by width) of the tolerance not yet spent, and must meet it at two levels
+        # in a row, so a step that both levels happen to straddle alike is not accepted.
+        ok = np.abs(err) <= max(tol_wh - spent_wh, 0.0) * (b - a) / (b - a).sum()
+        done = (ok & parent_ok) | ((b - a) / 2 <= min_width)
+        total_wh += (left + right)[done].sum()
+        spent_wh += np.abs(err)[done].sum()
+
+        keep = ~done
+        a, m, b = a[keep], m[keep], b[keep]
+        fa, flm, fm, frm, fb = fa[keep], flm[keep], fm[keep], frm[keep], fb[keep]
+        left, right = left[keep], right[keep]
+        parent_ok = np.tile(ok[keep], 2)
+        a, b = np.concatenate([a, m]), np.concatenate([m, b])
+        fa, fm, fb = np.concatenate([fa, fm]), np.concatenate([flm, frm]), np.concatenate([fm, fb])
+        whole = np.concatenate([left, right])
+
+    return {
+        'solar_energy_kwh_m2': float(max(total_wh, 0.0) / 1000.0),
+        'evaluations': int(evaluations),
+        'method': 'adaptive',
+    }
+
+
+def clearsky_ghi_function(latitude: float, longitude: float, altitude: float, timezone: str):
+    """Vectorized clear-sky GHI (W/m^2) at one site, as `compute_daily_energy_from_location_date` models it."""
+    import pvlib
+
+    location = pvlib.location.Location(latitude, longitude, tz=timezone, altitude=altitude)
+
+    def ghi(times):
+        return location.get_clearsky(times)['ghi'].to_numpy()
+
+    return ghi
@@ -1,6 +1,9 @@
-import pandas as pd
+import calendar
+
 import numpy as np
-import pvlib
+
+from aeroaqua.solar import get_solar_positions_for_date, multisite_positions_for_date
+from aeroaqua.instrumentation import span
 
 
 # Helper that computes solar energy (kWh/m^2) from a pvlib Location using the clearsky model.
@@ -12,33 +15,164 @@ def compute_daily_energy_from_location_date(
     timezone: str,
     date_str: str,
     freq: str = '10T',
+    method: str = 'rectangle',
+    tol_kwh: float = 0.005,
 ):
     """Compute daily solar energy (kWh/m^2) using pvlib clearsky GHI.
 
+    `method` selects the integration scheme (see `aeroaqua.energy.integration`): the
+    default rectangle sum at `freq`, 'trapezoid', 'simpson', or 'adaptive' with an
+    error target of `tol_kwh`.
+
     Returns a pandas.DataFrame with columns: ['date', 'solar_energy_kwh_m2']
     For a single date this will be a single-row dataframe.
     """
-    start = f"{date_str} 00:00:00"
-    end = f"{date_str} 23:59:00"
-    times = pd.date_range(start=start, end=end, freq=freq, tz=timezone)
+    import pandas as pd
+    import pvlib
+
+    if method != 'rectangle':
+        from .integration import clearsky_ghi_function, integrate_day
+
+        ghi_fn = clearsky_ghi_function(latitude, longitude, altitude, timezone)
+        result = integrate_day(ghi_fn, date_str, timezone, method=method, freq=freq, tol_kwh=tol_kwh)
+        return pd.DataFrame([{'date': pd.to_datetime(date_str).date(), 'solar_energy_kwh_m2': result['solar_energy_kwh_m2']}])
 
-    location = pvlib.location.Location(latitude, longitude, tz=timezone, altitude=altitude)
-    cs = location.get_clearsky(times)  # returns dict-like with ghi, dni, dhi
+    # solar geometry comes from the shared cache so repeated dates skip the SPA
+    with span('energy.solar_positions') as sp:
+        solpos = get_solar_positions_for_date(date_str=date_str, freq=freq, latitude=latitude, longitude=longitude, altitude=altitude, timezone=timezone)
+        sp.set_rows(len(solpos))
+    times = solpos.index
+
+    with span('energy.clearsky', rows=len(times)):
+        location = pvlib.location.Location(latitude, longitude, tz=timezone, altitude=altitude)
+        cs = location.get_clearsky(times, solar_position=solpos)  # returns dict-like with ghi, dni, dhi
 
     ghi = cs['ghi']  # Series indexed by times in W/m^2
 
-    # compute delta hours per sample (handles variable freq)
-    dt = times.to_series().diff().dt.total_seconds().div(3600).fillna((pd.Timedelta(freq).total_seconds() / 3600))
+    with span('energy.integrate', rows=len(times)):
+        # compute delta hours per sample (handles variable freq)
+        dt = times.to_series().diff().dt.total_seconds().div(3600).fillna((pd.Timedelta(freq).total_seconds() / 3600))
 
-    # Wh/m^2 per sample = ghi (W/m^2) * hours
-    wh_per_sample = ghi * dt.values
+        # Wh/m^2 per sample = ghi (W/m^2) * hours
+        wh_per_sample = ghi * dt.values
 
-    # total kWh/m^2 for the date
-    total_kwh = wh_per_sample.sum() / 1000.0
+        # total kWh/m^2 for the date
+        total_kwh = wh_per_sample.sum() / 1000.0
 
     return pd.DataFrame([{'date': pd.to_datetime(date_str).date(), 'solar_energy_kwh_m2': total_kwh}])
 
 
+# The Linke turbidity lookup below follows `pvlib.clearsky.lookup_linke_turbidity`,
+# vectorized over sites. Its index math and month middles are vendored from
+# pvlib's private helpers (`_degrees_to_index`, `_calendar_month_middles`) so a
+# pvlib release cannot break it; only the bundled LinkeTurbidities.h5 is used.
+# The file holds 20 * Linke turbidity on a 2160 x 4320 grid of 5' pixels
+# (rows 90 to -90 degrees latitude, columns -180 to 180 longitude) x 12 months.
+_LINKE_GRID = {'latitude': (90, -90, 2160), 'longitude': (-180, 180, 4320)}
+
+
+def _linke_index(degrees, coordinate: str) -> np.ndarray:
+    """Pixel row ('latitude') or column ('longitude') of the turbidity grid for an array of degrees."""
+    inputmin, inputmax, outputmax = _LINKE_GRID[coordinate]
+    scale = outputmax / (inputmax - inputmin)
+    index = (np.asarray(degrees, dtype=float) - (inputmin + 1 / scale / 2)) * scale
+    # pvlib's margin: values up to half a pixel (plus rounding slack) outside the grid snap to the edge
+    bad = (index > outputmax - 1 + 0.500001) | (index < -0.500001)
+    if np.any(bad):
+        raise ValueError(f'{coordinate} {np.asarray(degrees)[bad][0]:g} is out of range ({inputmin}, {inputmax})')
+    return np.clip(np.around(index), 0, outputmax - 1).astype(np.int64)
+
+
+def _month_middles(year: int) -> np.ndarray:
+    """Day of year of the middle of each month, with December before and January after (interpolation knots)."""
+    mdays = np.array(calendar.mdays[1:])
+    if calendar.isleap(year):
+        mdays[1] += 1
+    return np.concatenate([[-calendar.mdays[12] / 2.0], np.cumsum(mdays) - mdays / 2.0, [mdays.sum() + calendar.mdays[1] / 2.0]])
+
+
+def _linke_turbidity_for_sites(times, latitudes, longitudes):
+    """(n_sites, n_times) Linke turbidity, equal to `pvlib.clearsky.lookup_linke_turbidity` per site.
+
+    The climatology file is opened once and each distinct 5' pixel is interpolated
+    once, on the distinct UTC days of `times` only.
+    """
+    import os
+    import h5py
+    from pvlib import clearsky
+
+    rows = _linke_index(latitudes, 'latitude')
+    cols = _linke_index(longitudes, 'longitude')
+    pixels, site_pixel = np.unique(np.column_stack([rows, cols]), axis=0, return_inverse=True)
+
+    filepath = os.path.join(os.path.dirname(os.path.abspath(clearsky.__file__)), 'data', 'LinkeTurbidities.h5')
+    r0, c0 = pixels.min(axis=0)
+    r1, c1 = pixels.max(axis=0)
+    with h5py.File(filepath, 'r') as f:
+        block = f['LinkeTurbidity'][r0:r1 + 1, c0:c1 + 1]
+    monthly = block[pixels[:, 0] - r0, pixels[:, 1] - c0]
+
+    time_utc = times.tz_convert('UTC') if times.tz is not None else times
+    days, day_index = np.unique(np.column_stack([time_utc.dayofyear, time_utc.is_leap_year]), axis=0, return_inverse=True)
+    days_leap = _month_middles(2016)
+    days_no_leap = _month_middles(2015)
+
+    per_pixel = np.empty((len(pixels), len(days)))
+    for i, lts in enumerate(monthly):
+        lts_concat = np.concatenate([[lts[-1]], lts, [lts[0]]])
+        per_pixel[i] = np.where(days[:, 1], np.interp(days[:, 0], days_leap, lts_concat), np.interp(days[:, 0], days_no_leap, lts_concat))
+    return per_pixel[site_pixel.ravel()][:, day_index.ravel()] / 20.
+
+
+def compute_daily_energy_for_sites(
+    latitudes,
+    longitudes,
+    altitudes,
+    timezone: str,
+    date_str: str,
+    freq: str = '10T',
+):
+    """Daily clear-sky solar energy (kWh/m^2) at many sites for one date.
+
+    Vectorized counterpart of `compute_daily_energy_from_location_date`: the sites
+    share the local time grid of `timezone`, zenith angles come from one pass of
+    `aeroaqua.solar.multisite_positions_for_date`, and the Ineichen model runs on the
+    (sites x timesteps) arrays with the same airmass, pressure and extraterrestrial
+    inputs pvlib's `Location.get_clearsky` uses. Linke turbidity is looked up once
+    per distinct climatology pixel.
+
+    Returns a pandas.DataFrame with columns: ['date', 'latitude', 'longitude', 'altitude',
+    'solar_energy_kwh_m2'], one row per site.
+    """
+    import pandas as pd
+    from pvlib import atmosphere, clearsky, irradiance
+
+    times, positions = multisite_positions_for_date(date_str, latitudes, longitudes, altitudes, freq=freq, timezone=timezone)
+    apparent_zenith = positions['apparent_zenith']
+    lat, lon, alt = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float)) for a in (latitudes, longitudes, altitudes)))
+
+    turbidity = _linke_turbidity_for_sites(times, lat, lon)
+
+    airmass_relative = atmosphere.get_relative_airmass(apparent_zenith, 'kastenyoung1989')
+    airmass_absolute = atmosphere.get_absolute_airmass(airmass_relative, atmosphere.alt2pres(alt)[:, None])
+    dni_extra = irradiance.get_extra_radiation(times).to_numpy()
+
+    ghi = clearsky.ineichen(apparent_zenith, airmass_absolute, turbidity, altitude=alt[:, None], dni_extra=dni_extra)['ghi']
+
+    dt = np.empty(len(times))
+    dt[0] = pd.Timedelta(freq).total_seconds() / 3600
+    dt[1:] = np.diff(times.asi8) / 1e9 / 3600
+    total_kwh = np.array([row.sum() / 1000.0 for row in ghi * dt])
+
+    return pd.DataFrame({
+        'date': pd.to_datetime(date_str).date(),
+        'latitude': lat,
+        'longitude': lon,
+        'altitude': alt,
+        'solar_energy_kwh_m2': total_kwh,
+    })
+
+
 if __name__ == '__main__':
     # example quick-run
     df_energy = compute_daily_energy_from_location_date(43.64, -79.39, 76, 'America/Toronto', '2025-11-04')
@@ -1,9 +1,11 @@
+import argparse
 import pandas as pd
 import numpy as np
-from pipeline_functions import run_prediction_pipeline
-from tqdm import tqdm # A nice progress bar, install with `pip install tqdm`
+from aeroaqua.pipeline_functions import predict_liters_from_coefficients
+from aeroaqua.pipelines.executor import ProgressReporter, iter_parallel_sweep
+from aeroaqua.pipelines.sinks import DATE_PARTITIONS, SINK_FORMATS, open_sink
 
-print("Starting data generation for 3D plot...")
+# Run from the directory containing the package: python -m aeroaqua.generate_plot_data [--workers N] [--model-path PATH]
 
 # --- 1. Define Toronto-specific constants ---
 LAT = 43.6532  # Toronto Latitude
@@ -27,33 +29,53 @@ date_range = pd.date_range('2025-01-01', '2025-12-31', freq='5D')
 # We'll use all 11 integer steps from 0 to 10.
 cloud_range = np.arange(0, 11) # Generates [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
 
-# --- 4. Run the loops ---
-results_list = []
-
-# Use tqdm for a progress bar
-for date in tqdm(date_range, desc="Processing Dates"):
-    for cloud in cloud_range:
-        
-        # Call the main pipeline function
-        result = run_prediction_pipeline(
-            date_str = date.strftime('%Y-%m-%d'),
-            latitude = LAT,
-            longitude = LON,
-            altitude = ALT,
-            timezone = TZ,
-            cloud_type = float(cloud), # Ensure it's a float if model expects, but value is integer
-            rh_percent = RH_TYPICAL,
-            temperature_c = TEMP_TYPICAL
-        )
-        
-        if result:
-            results_list.append(result)
-
-# --- 5. Save to CSV ---
-output_df = pd.DataFrame(results_list)
-output_filename = 'toronto_3d_plot_data.csv'
-output_df.to_csv(output_filename, index=False)
-
-print(f"\nSuccessfully generated {len(output_df)} data points.")
-print(f"Data saved to {output_filename}")
-print("You can now upload this CSV to Google Colab and run the plotting script.")
\ No newline at end of file
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate the Toronto date x cloud type grid for the 3D plot')
+    parser.add_argument('--model-path', default=None, help='RF model (default: the model registry fallback paths)')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores; 1 runs inline)')
+    parser.add_argument('--dates-per-chunk', type=int, default=8, help='Dates per work unit')
+    parser.add_argument('--max-pending', type=int, default=None, help='Work units in flight (default: 2 x workers)')
+    parser.add_argument('--output', default='toronto_3d_plot_data.csv', help='Output file (csv, parquet) or directory (npy, partitioned output)')
+    parser.add_argument('--format', choices=SINK_FORMATS, default=None, help='Output format (default: from the --output suffix)')
+    parser.add_argument('--partition', choices=DATE_PARTITIONS, default=None, help='Write one output per month or season into the --output directory')
+    args = parser.parse_args()
+
+    print("Starting data generation for 3D plot...")
+
+    # --- 4. Run the sweep ---
+    # The sweep engine computes solar geometry once per date and runs one model
+    # predict per chunk of (date x cloud type) scenarios, producing the same rows
+    # as calling pipeline_functions.run_prediction_pipeline for each pair. Chunks
+    # of dates run on a process pool and come back in order; each is appended to
+    # the output as it arrives, so memory does not grow with the grid.
+    chunks = iter_parallel_sweep(
+        dates = date_range,
+        cloud_types = cloud_range,
+        rh_values = [RH_TYPICAL],
+        temperatures = [TEMP_TYPICAL],
+        latitude = LAT,
+        longitude = LON,
+        altitude = ALT,
+        timezone = TZ,
+        model_path = args.model_path,
+        water_yield_fn = predict_liters_from_coefficients,
+        workers = args.workers,
+        dates_per_chunk = args.dates_per_chunk,
+        max_pending = args.max_pending,
+        progress = ProgressReporter("Processing date chunks"),
+    )
+
+    # --- 5. Save the results ---
+    output_filename = args.output
+    with open_sink(output_filename, format=args.format, partition_by=args.partition) as sink:
+        for chunk in chunks:
+            sink.write(chunk)
+
+    print(f"\nSuccessfully generated {sink.rows} data points.")
+    print(f"Data saved to {output_filename}")
+    print("You can now upload this CSV to Google Colab and run the plotting script.")
+
+
+if __name__ == '__main__':
+    main()
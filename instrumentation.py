@@ -0,0 +1,239 @@
+"""Opt-in timing spans for the pipelines.
+
+The hot paths wrap their stages in named spans (whole functions use the
+`instrumented` decorator)::
+
+    with span('rf.predict') as sp:
+        ghi = model.predict(X)
+        sp.set_rows(len(X))
+
+While instrumentation is disabled (the default) `span` returns a shared no-op
+context manager, so a span costs one function call and a global check. Enable
+it with `enable()` or the ``AEROAQUA_INSTRUMENT=1`` environment variable. Every
+finished span then records its wall time, the CPU time of the calling thread
+and its row count into a per-name aggregate with a fixed-bucket wall-time
+histogram. The aggregates can be read as a dict (`snapshot`), rendered in the
+Prometheus text exposition format (`prometheus_text`) or written as JSON lines
+(`write_jsonl`). Pass ``event_log=path`` (or set ``AEROAQUA_INSTRUMENT_EVENTS``)
+to also append every finished span to a JSON-lines file as it happens.
+
+Span names used by the package: ``pipeline.rf``, ``pipeline.rf_range``,
+``pipeline.rf_sites`` and ``pipeline.pvlib`` for whole calls; ``rf.*``
+stages (solar_positions, features, model_load, predict, integrate,
+water_yield); ``pvlib.*`` stages (daily_energy, water_yield); and ``energy.*``
+stages of `aeroaqua.energy.solarenergy` (solar_positions, clearsky, integrate).
+"""
+import functools
+import json
+import os
+import threading
+import time
+
+
+ENABLE_ENV = 'AEROAQUA_INSTRUMENT'
+EVENTS_ENV = 'AEROAQUA_INSTRUMENT_EVENTS'
+
+# Upper bounds (seconds) of the wall-time histogram buckets; the last bucket is +Inf.
+WALL_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = False
+_event_log = None
+_lock = threading.Lock()
+_stats = {}
+_local = threading.local()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set_rows(self, rows):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Stat:
+    __slots__ = ('count', 'errors', 'wall', 'cpu', 'rows', 'wall_max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.rows = 0
+        self.wall_max = 0.0
+        self.buckets = [0] * (len(WALL_BUCKETS) + 1)
+
+    def add(self, wall: float, cpu: float, rows, failed: bool):
+        self.count += 1
+        self.errors += failed
+        self.wall += wall
+        self.cpu += cpu
+        self.rows += rows or 0
+        self.wall_max = max(self.wall_max, wall)
+        for i, bound in enumerate(WALL_BUCKETS):
+            if wall <= bound:
+                self.buckets[i] += 1
+                break
+        else:
+            self.buckets[-1] += 1
+
+    def as_dict(self) -> dict:
+        cumulative, total = {}, 0
+        for bound, n in zip(WALL_BUCKETS + (float('inf'),), self.buckets):
+            total += n
+            cumulative[repr(bound) if bound != float('inf') else '+Inf'] = total
+        return {
+            'count': self.count,
+            'errors': self.errors,
+            'wall_s': self.wall,
+            'cpu_s': self.cpu,
+            'rows': self.rows,
+            'wall_max_s': self.wall_max,
+            'wall_mean_s': self.wall / self.count if self.count else 0.0,
+            'wall_buckets': cumulative,
+        }
+
+
+class Span:
+    """A running span; records itself when the ``with`` block exits."""
+
+    __slots__ = ('name', 'rows', 'parent', '_wall', '_cpu')
+
+    def __init__(self, name: str, rows=None):
+        self.name = name
+        self.rows = rows
+
+    def set_rows(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self.parent = stack[-1].name if stack else None
+        stack.append(self)
+        self._cpu = time.thread_time()
+        self._wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu = time.thread_time() - self._cpu
+        _local.stack.pop()
+        rows = None if self.rows is None else int(self.rows)
+        with _lock:
+            stat = _stats.get(self.name)
+            if stat is None:
+                stat = _stats[self.name] = _Stat()
+            stat.add(wall, cpu, rows, exc_type is not None)
+            if _event_log is not None:
+                _event_log.write(json.dumps({
+                    'ts': time.time(), 'span': self.name, 'parent': self.parent, 'wall_s': wall, 'cpu_s': cpu,
+                    'rows': rows, 'error': exc_type.__name__ if exc_type is not None else None, 'thread': threading.get_ident(),
+                }) + '\n')
+        return False
+
+
+def span(name: str, rows=None):
+    """Context manager timing the enclosed block as `name` (a no-op while disabled)."""
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(name, rows)
+
+
+def instrumented(name: str):
+    """Decorator timing every call of the function as span `name`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def enable(event_log: str = None):
+    """Start recording spans; `event_log` appends every finished span to that JSON-lines file."""
+    global _enabled, _event_log
+    with _lock:
+        if _event_log is not None:
+            _event_log.close()
+        _event_log = open(event_log, 'a', buffering=1) if event_log else None
+        _enabled = True
+
+
+def disable():
+    """Stop recording spans (aggregates are kept until `reset`)."""
+    global _enabled, _event_log
+    with _lock:
+        _enabled = False
+        if _event_log is not None:
+            _event_log.close()
+            _event_log = None
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Drop all recorded aggregates."""
+    with _lock:
+        _stats.clear()
+
+
+def snapshot() -> dict:
+    """Per-span aggregates: count, errors, wall/CPU seconds, rows, max/mean wall and cumulative wall buckets."""
+    with _lock:
+        return {name: stat.as_dict() for name, stat in sorted(_stats.items())}
+
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(prefix: str = 'aeroaqua') -> str:
+    """Render the aggregates in the Prometheus text exposition format (version 0.0.4)."""
+    stats = snapshot()
+    lines = [
+        f'# HELP {prefix}_span_wall_seconds Wall-clock time of instrumented spans.',
+        f'# TYPE {prefix}_span_wall_seconds histogram',
+    ]
+    for name, s in stats.items():
+        label = f'span="{_label(name)}"'
+        for bound, n in s['wall_buckets'].items():
+            lines.append(f'{prefix}_span_wall_seconds_bucket{{{label},le="{bound}"}} {n}')
+        lines.append(f'{prefix}_span_wall_seconds_sum{{{label}}} {s["wall_s"]!r}')
+        lines.append(f'{prefix}_span_wall_seconds_count{{{label}}} {s["count"]}')
+    for metric, key, kind, help_text in (
+        ('span_cpu_seconds_total', 'cpu_s', 'counter', 'CPU time of the calling thread inside instrumented spans.'),
+        ('span_rows_total', 'rows', 'counter', 'Rows processed by instrumented spans.'),
+        ('span_errors_total', 'errors', 'counter', 'Instrumented spans that exited with an exception.'),
+    ):
+        lines.append(f'# HELP {prefix}_{metric} {help_text}')
+        lines.append(f'# TYPE {prefix}_{metric} {kind}')
+        for name, s in stats.items():
+            lines.append(f'{prefix}_{metric}{{span="{_label(name)}"}} {s[key]!r}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_jsonl(path: str, extra: dict = None):
+    """Append one JSON line per span name with its aggregates (and the fields of `extra`)."""
+    now = time.time()
+    with open(path, 'a') as fh:
+        for name, s in snapshot().items():
+            fh.write(json.dumps({'ts': now, 'span': name, **(extra or {}), **s}) + '\n')
+
+
+if os.environ.get(ENABLE_ENV, '').strip().lower() in ('1', 'true', 'yes', 'on'):
+    enable(os.environ.get(EVENTS_ENV) or None)
@@ -1,4 +1,25 @@
-from .baselinesorption import predict_water_yield
-from .train_rf_model import train_and_save
+"""Water-yield regression, RF training, compiled forests and the model registry."""
+from aeroaqua._lazy import lazy_module
 
-__all__ = ['predict_water_yield', 'train_and_save']
+_LAZY = {
+    'predict_water_yield': '.baselinesorption',
+    'predict_water_yield_array': '.baselinesorption',
+    'train_and_save': '.train_rf_model',
+    'load_training_arrays': '.ingest',
+    'convert_csv': '.training_cache',
+    'load_cached_arrays': '.training_cache',
+    'forest_to_arrays': '.train_rf_model',
+    'export_forest': '.train_rf_model',
+    'CompiledForest': '.compiled_forest',
+    'compress_forest': '.compress',
+    'ModelRegistry': '.registry',
+    'load_model': '.registry',
+    'configure_model_registry': '.registry',
+    'model_registry_stats': '.registry',
+    'compile_feature_plan': '.feature_plan',
+    'get_feature_plan': '.feature_plan',
+}
+
+__all__ = list(_LAZY)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY)
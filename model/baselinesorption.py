@@ -1,12 +1,13 @@
-import pandas as pd
-from sklearn.linear_model import LinearRegression
-from io import StringIO
+import hashlib
+
+import numpy as np
 
 
 # The small experimental dataset from the paper is embedded below.
-# We fit a LinearRegression at import time and expose a helper
-# function `predict_water_yield` that returns liters/day given
-# solar energy (kWh/m^2) and relative humidity (%).
+# The linear regression fitted to it is stored as plain constants (see
+# `fit_coefficients`), so importing this module does not need pandas or
+# scikit-learn. `predict_water_yield` returns liters/day given solar energy
+# (kWh/m^2) and relative humidity (%).
 
 _csv_data = """RH_Percent,Solar_Energy_kWhr_m2,Liters_Per_Day
 20,5,2.5
@@ -41,21 +42,41 @@ _csv_data = """RH_Percent,Solar_Energy_kWhr_m2,Liters_Per_Day
 70,6.66,6.0
 """
 
-_df = pd.read_csv(StringIO(_csv_data))
+# Ordinary least squares fit of Liters_Per_Day ~ RH_Percent + Solar_Energy_kWhr_m2
+# on `_csv_data` (same values as sklearn's LinearRegression on that table).
+INTERCEPT = -2.7386589567064528
+RH_COEF = 0.04742857142857142
+SOLAR_COEF = 0.8412304017874339
+
+# Hash of `_csv_data` the constants above were fitted on; editing the table
+# without refitting fails loudly at import.
+_CSV_SHA256 = '2b7783630d47c60c0a31c95ee255ce130dc4a16185583ce113be7186b07e1fc8'
+
+
+def fit_coefficients(csv_data: str = _csv_data):
+    """Fit the linear model to the embedded table and return (intercept, rh_coef, solar_coef)."""
+    lines = csv_data.strip().splitlines()
+    header = lines[0].split(',')
+    rows = np.array([[float(v) for v in line.split(',')] for line in lines[1:]])
+    rh = rows[:, header.index('RH_Percent')]
+    solar = rows[:, header.index('Solar_Energy_kWhr_m2')]
+    y = rows[:, header.index('Liters_Per_Day')]
 
-_features = ['RH_Percent', 'Solar_Energy_KWhr_m2']
-# Note: dataset header from original used 'Solar_Energy_kWhr_m2' lowercase 'kWh', keep compatibility
-# We'll select by a case-insensitive match when building features for prediction.
-_target = 'Liters_Per_Day'
+    A = np.column_stack([np.ones_like(rh), rh, solar])
+    (intercept, rh_coef, solar_coef), *_ = np.linalg.lstsq(A, y, rcond=None)
+    return float(intercept), float(rh_coef), float(solar_coef)
 
-# Normalize column names to a known form
-_df.columns = [c.replace('Solar_Energy_kWhr_m2', 'Solar_Energy_kWhr_m2') for c in _df.columns]
 
-_X = _df[['RH_Percent', 'Solar_Energy_kWhr_m2']]
-_y = _df[_target]
+def check_coefficients(atol: float = 1e-9):
+    """Raise RuntimeError if the stored constants no longer match a fresh fit of `_csv_data`."""
+    fitted = fit_coefficients()
+    stored = (INTERCEPT, RH_COEF, SOLAR_COEF)
+    if not np.allclose(fitted, stored, rtol=0.0, atol=atol):
+        raise RuntimeError(f'Stored water-yield coefficients {stored} do not match the embedded data fit {fitted}')
 
-_model = LinearRegression()
-_model.fit(_X, _y)
+
+if hashlib.sha256(_csv_data.encode('utf-8')).hexdigest() != _CSV_SHA256:
+    raise RuntimeError('baselinesorption._csv_data changed; refit with fit_coefficients() and update INTERCEPT/RH_COEF/SOLAR_COEF and _CSV_SHA256')
 
 
 def predict_water_yield(solar_energy_kwh_m2: float, rh_percent: float) -> float:
@@ -68,14 +89,41 @@ def predict_water_yield(solar_energy_kwh_m2: float, rh_percent: float) -> float:
     Returns:
         Predicted liters per day (float)
     """
-    X_pred = [[rh_percent, solar_energy_kwh_m2]]
-    pred = _model.predict(X_pred)[0]
+    pred = rh_percent * RH_COEF + solar_energy_kwh_m2 * SOLAR_COEF + INTERCEPT
     return float(pred)
 
 
+def predict_water_yield_array(solar_energy_kwh_m2, rh_percent):
+    """Vectorized `predict_water_yield` over arrays of any shape.
+
+    Inputs are broadcast against each other (e.g. a column of solar energies against
+    a row of RH values gives the full grid) and evaluated in one NumPy expression,
+    using the same arithmetic as the scalar function.
+
+    Args:
+        solar_energy_kwh_m2: scalar, array-like or pandas Series of daily solar energy (kWh/m^2)
+        rh_percent: scalar, array-like or pandas Series of relative humidity (%)
+
+    Returns:
+        numpy.ndarray of liters per day, or a pandas Series aligned with the input
+        Series when the result is one-dimensional.
+    """
+    solar = np.asarray(solar_energy_kwh_m2, dtype=float)
+    rh = np.asarray(rh_percent, dtype=float)
+    pred = rh * RH_COEF + solar * SOLAR_COEF + INTERCEPT
+
+    for source in (solar_energy_kwh_m2, rh_percent):
+        index = getattr(source, 'index', None)
+        if index is not None and getattr(source, 'ndim', 0) == 1 and pred.shape == (len(index),):
+            # build the Series through the input's own type so pandas is never imported here
+            return type(source)(pred, index=index, name='predicted_liters_per_day')
+    return pred
+
+
 if __name__ == '__main__':
     # simple verification printout
+    check_coefficients()
     print("Model Verification:")
-    print(f"Intercept (B0): {_model.intercept_:.4f}")
-    print(f"RH_Percent Coefficient (B1): {_model.coef_[0]:.4f}")
-    print(f"Solar_Energy Coefficient (B2): {_model.coef_[1]:.4f}")
+    print(f"Intercept (B0): {INTERCEPT:.4f}")
+    print(f"RH_Percent Coefficient (B1): {RH_COEF:.4f}")
+    print(f"Solar_Energy Coefficient (B2): {SOLAR_COEF:.4f}")
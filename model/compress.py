@@ -0,0 +1,161 @@
+"""Smaller forest artifacts: tree selection, pruning and quantization.
+
+Every function takes and returns the node-array dict of `forest_to_arrays`
+(or a loaded ``.npz`` export) and leaves its input untouched, so candidates can
+be chained and compared:
+
+- `greedy_tree_order` ranks trees by how quickly their running mean approaches
+  the full forest on held-out rows, and `select_trees` keeps a prefix of it;
+- `prune_trees` cuts every tree at `max_depth` and/or undoes splits that leave a
+  child with fewer than `min_samples_leaf` training samples. The cut node keeps
+  the value sklearn stored for it, the mean target of its samples;
+- `quantize` stores thresholds and leaf values as float32 or float16. float32
+  thresholds are exact (see `compiled_forest._float32_thresholds`); float16 ones
+  and reduced-precision values change predictions slightly;
+- `compact_indices` stores node ids and features in the smallest integer types.
+
+`CompiledForest` widens everything on load, so the result is an ordinary
+artifact for `CompiledForest.load` and the model registry.
+"""
+import numpy as np
+
+from .compiled_forest import _float32_thresholds
+
+
+QUANTIZE_DTYPES = ('float64', 'float32', 'float16')
+TREE_UNDEFINED = -2
+
+
+def _tree_slices(arrays):
+    offsets = np.asarray(arrays['tree_offsets'], dtype=np.int64)
+    ends = np.r_[offsets[1:], len(arrays['feature'])]
+    return [slice(int(a), int(b)) for a, b in zip(offsets, ends)]
+
+
+def _node_keys(arrays):
+    return [k for k in ('feature', 'threshold', 'left', 'right', 'value', 'missing_go_to_left', 'n_node_samples') if k in arrays]
+
+
+def _with_trees(arrays, trees: list) -> dict:
+    """Copy of `arrays` whose node arrays are the concatenation of `trees` (dicts of per-node arrays)."""
+    out = {k: v for k, v in arrays.items()}
+    for key in _node_keys(arrays):
+        out[key] = np.concatenate([t[key] for t in trees]).astype(np.asarray(arrays[key]).dtype, copy=False)
+    counts = np.array([len(t['feature']) for t in trees], dtype=np.int64)
+    out['tree_offsets'] = np.r_[0, np.cumsum(counts)[:-1]].astype(np.int64)
+    return out
+
+
+def greedy_tree_order(leaf_values, reference) -> np.ndarray:
+    """Forward selection of trees on held-out rows.
+
+    Args:
+        leaf_values: per-tree predictions, shape (n_trees, n_rows) (`CompiledForest.apply`).
+        reference: predictions to approach (usually the full forest's), shape (n_rows,).
+
+    Returns:
+        tree indices; the mean of the first k trees is the best k-tree subset found greedily.
+    """
+    leaf_values = np.asarray(leaf_values, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64)
+    remaining = list(range(len(leaf_values)))
+    running = np.zeros(leaf_values.shape[1])
+    order = []
+    for k in range(1, len(leaf_values) + 1):
+        candidates = leaf_values[remaining]
+        errors = (((running + candidates) / k - reference) ** 2).mean(axis=1)
+        best = remaining.pop(int(np.argmin(errors)))
+        running += leaf_values[best]
+        order.append(best)
+    return np.array(order, dtype=np.int64)
+
+
+def select_trees(arrays, trees) -> dict:
+    """Keep only the trees with the given indices, in that order."""
+    slices = _tree_slices(arrays)
+    keys = _node_keys(arrays)
+    return _with_trees(arrays, [{k: np.asarray(arrays[k])[slices[t]] for k in keys} for t in trees])
+
+
+def _prune_tree(tree: dict, max_depth: int, min_samples_leaf: int) -> dict:
+    left, right = tree['left'], tree['right']
+    new_id = np.full(len(left), -1, dtype=np.int64)
+    becomes_leaf = np.zeros(len(left), dtype=bool)
+    levels = []
+    frontier, depth, next_id = np.array([0]), 0, 0
+    while len(frontier):
+        new_id[frontier] = np.arange(next_id, next_id + len(frontier))
+        next_id += len(frontier)
+        levels.append(frontier)
+        split = left[frontier] != -1
+        if max_depth is not None and depth >= max_depth:
+            split[:] = False
+        if min_samples_leaf:
+            idx = frontier[split]
+            samples = tree['n_node_samples']
+            split[split] = (samples[left[idx]] >= min_samples_leaf) & (samples[right[idx]] >= min_samples_leaf)
+        becomes_leaf[frontier[~split]] = True
+        internal = frontier[split]
+        frontier = np.concatenate([left[internal], right[internal]])
+        depth += 1
+
+    old = np.concatenate(levels)
+    leaf = becomes_leaf[old]
+    out = {k: v[old] for k, v in tree.items()}
+    out['left'] = np.where(leaf, -1, new_id[left[old]])
+    out['right'] = np.where(leaf, -1, new_id[right[old]])
+    out['feature'] = np.where(leaf, TREE_UNDEFINED, out['feature'])
+    out['threshold'] = np.where(leaf, TREE_UNDEFINED, out['threshold'])
+    if 'missing_go_to_left' in out:
+        out['missing_go_to_left'] = np.where(leaf, 0, out['missing_go_to_left'])
+    return out
+
+
+def prune_trees(arrays, max_depth: int = None, min_samples_leaf: int = None) -> dict:
+    """Cut every tree at `max_depth` and/or where a split leaves fewer than `min_samples_leaf` samples in a child.
+
+    `min_samples_leaf` needs the per-node sample counts exported by `forest_to_arrays`.
+    """
+    if min_samples_leaf and 'n_node_samples' not in arrays:
+        raise ValueError('min_samples_leaf needs n_node_samples; re-export the forest with forest_to_arrays')
+    keys = _node_keys(arrays)
+    trees = []
+    for sl in _tree_slices(arrays):
+        tree = {k: np.asarray(arrays[k])[sl] for k in keys}
+        trees.append(_prune_tree(tree, max_depth, min_samples_leaf))
+    return _with_trees(arrays, trees)
+
+
+def quantize(arrays, dtype: str = 'float32') -> dict:
+    """Store thresholds and node values as `dtype` (one of QUANTIZE_DTYPES)."""
+    if dtype not in QUANTIZE_DTYPES:
+        raise ValueError(f'Unknown dtype {dtype!r}; expected one of {QUANTIZE_DTYPES}')
+    out = dict(arrays)
+    threshold = np.asarray(arrays['threshold'], dtype=np.float64)
+    if dtype == 'float32':
+        out['threshold'] = _float32_thresholds(threshold)
+    elif dtype == 'float16':
+        out['threshold'] = threshold.astype(np.float16)
+    out['value'] = np.asarray(arrays['value']).astype(dtype)
+    return out
+
+
+def compact_indices(arrays) -> dict:
+    """Smallest integer dtypes for node ids and features; drops the training-only sample counts."""
+    out = {k: v for k, v in arrays.items() if k != 'n_node_samples'}
+    largest_tree = int(np.diff(np.r_[arrays['tree_offsets'], len(arrays['feature'])]).max(initial=0))
+    index_dtype = np.int16 if largest_tree <= np.iinfo(np.int16).max else np.int32
+    out['left'] = np.asarray(arrays['left']).astype(index_dtype)
+    out['right'] = np.asarray(arrays['right']).astype(index_dtype)
+    n_features = int(arrays['n_features']) if 'n_features' in arrays else int(np.max(arrays['feature'])) + 1
+    out['feature'] = np.asarray(arrays['feature']).astype(np.int8 if n_features <= np.iinfo(np.int8).max else np.int32)
+    return out
+
+
+def compress_forest(arrays, trees=None, max_depth: int = None, min_samples_leaf: int = None, dtype: str = 'float64') -> dict:
+    """Apply `select_trees`, `prune_trees`, `quantize` and `compact_indices` in that order."""
+    if trees is not None:
+        arrays = select_trees(arrays, trees)
+    if max_depth is not None or min_samples_leaf:
+        arrays = prune_trees(arrays, max_depth, min_samples_leaf)
+    return compact_indices(quantize(arrays, dtype))
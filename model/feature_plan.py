@@ -0,0 +1,211 @@
+"""Compiled mappings from input columns to a model's feature matrix.
+
+`compile_feature_plan` resolves a model's feature names against an input
+schema once and returns a `FeaturePlan`: one step per feature that copies a
+numeric column, builds a one-hot indicator from a categorical column or fills a
+constant. `FeaturePlan.apply` then turns column chunks (NumPy arrays, no
+DataFrames) into a C-contiguous feature matrix.
+
+A schema maps every input column to its dtype (numeric columns) or to the
+sequence of its values (categorical columns). Every feature is resolved by the
+first rule that matches:
+
+1. an explicit entry of `constants`;
+2. a numeric column with that name;
+3. a numeric column whose name matches ignoring case;
+4. a numeric column from the same alias group (`FEATURE_ALIASES`), e.g.
+   ``Relative Humidity`` -> ``RH_Percent``;
+5. ``<column>_<value>`` for a categorical column that holds `value`: a one-hot
+   indicator.
+
+Features matching no rule are never zero-filled. This includes
+``<column>_<value>`` when the column never holds `value` (a typo, another
+spelling of the category, or a category the input leaves out). They are all
+collected into one `UnresolvedFeaturesError` that lists every one of them with
+close matches from the schema or from the column's values. An all-zero
+indicator for a category the input leaves out is requested explicitly with a
+constant (``constants={'Season_Winter': 0}``).
+
+`get_feature_plan` caches compiled plans per (model key, feature names,
+schema, constants). The model key is usually the artifact's content hash
+(`ModelRegistry.model_hash`).
+"""
+import difflib
+import functools
+import warnings
+
+import numpy as np
+
+
+FEATURE_ALIASES = (
+    ('Solar_Energy_kwh_m2', 'Solar_Energy_kWhr_m2', 'Solar_Energy_kWh_m2', 'solar_energy_kwh_m2', 'SolarEnergy_kwh_m2'),
+    ('RH_Percent', 'Relative Humidity', 'rh_percent', 'RH'),
+    ('Temperature', 'temperature_c', 'Temperature_C'),
+    ('Cloud Type', 'cloud_type'),
+)
+
+
+class UnresolvedFeaturesError(ValueError):
+    """Raised when model features cannot be mapped to the input columns."""
+
+    def __init__(self, unresolved: dict, schema: dict):
+        self.unresolved = unresolved
+        self.schema = schema
+        lines = [f'{len(unresolved)} model feature(s) cannot be built from the input columns {list(schema)}:']
+        for name, reason in unresolved.items():
+            lines.append(f'  - {name!r}: {reason}')
+        lines.append('Add the missing columns (e.g. a grid axis) or pass explicit constants for them.')
+        super().__init__('\n'.join(lines))
+
+
+def normalize_schema(schema) -> tuple:
+    """Hashable form of a schema: ((column, dtype string) or (column, ('category', values...)), ...)."""
+    items = []
+    for name, spec in schema.items():
+        if isinstance(spec, (np.dtype, type, str)):
+            dtype = np.dtype(spec)
+            if dtype.kind in 'OUS':
+                raise ValueError(f'categorical column {name!r} needs its values in the schema, not a dtype')
+            items.append((str(name), dtype.str))
+        else:
+            items.append((str(name), ('category',) + tuple(spec)))
+    return tuple(items)
+
+
+def schema_of(columns) -> dict:
+    """Schema of column data (a DataFrame or a mapping of arrays): dtypes, and the distinct values of string columns."""
+    if hasattr(columns, 'columns') and hasattr(columns, 'iloc'):
+        columns = {c: columns[c].to_numpy() for c in columns.columns}
+    schema = {}
+    for name, values in columns.items():
+        values = np.asarray(values)
+        schema[str(name)] = sorted(set(values.tolist())) if values.dtype.kind in 'OUS' else values.dtype
+    return schema
+
+
+class FeaturePlan:
+    """Steps building a model's feature matrix from input columns.
+
+    Attributes:
+        feature_names: model feature order.
+        steps: one (kind, column, value) tuple per feature, kind being 'column'
+            (copy `column`), 'onehot' (``column == value``) or 'constant' (`value`).
+    """
+
+    __slots__ = ('feature_names', 'steps')
+
+    def __init__(self, feature_names, steps):
+        self.feature_names = tuple(feature_names)
+        self.steps = tuple(steps)
+
+    def describe(self) -> list:
+        """Human-readable 'feature <- source' lines."""
+        text = {
+            'column': lambda column, value: column,
+            'onehot': lambda column, value: f'{column} == {value!r}',
+            'constant': lambda column, value: f'constant {value!r}',
+        }
+        return [f'{name} <- {text[kind](column, value)}' for name, (kind, column, value) in zip(self.feature_names, self.steps)]
+
+    def apply(self, columns: dict, out: np.ndarray = None, shape: tuple = None) -> np.ndarray:
+        """Feature matrix (rows, features) for a chunk of input columns.
+
+        `columns` maps names to 1-D arrays, or, with `shape`, to arrays broadcastable
+        to `shape` (e.g. `GridChunk.coords`), whose rows are taken in C order. One-hot
+        steps then compare only the sparse values.
+        """
+        n = int(np.prod(shape)) if shape is not None else len(next(iter(columns.values())))
+        if out is None:
+            out = np.empty((n, len(self.steps)))
+        for j, (kind, column, value) in enumerate(self.steps):
+            target = out[:, j] if shape is None else out[:, j].reshape(shape)
+            if kind == 'column':
+                np.copyto(target, columns[column], casting='unsafe')
+            elif kind == 'onehot':
+                np.copyto(target, np.equal(columns[column], value), casting='unsafe')
+            else:
+                target[...] = value
+        return out
+
+    def predict(self, model, columns: dict, shape: tuple = None):
+        """``model.predict`` on the feature matrix of `columns` (see `apply`)."""
+        return predict_matrix(model, self.apply(columns, shape=shape))
+
+
+def predict_matrix(model, X: np.ndarray):
+    """``model.predict(X)`` for a matrix already in the model's feature order.
+
+    Models fitted on named columns warn about the missing names; the column order
+    is the plan's responsibility, so the warning is silenced.
+    """
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        return model.predict(X)
+
+
+def _alias_group(name: str):
+    lowered = name.lower()
+    for group in FEATURE_ALIASES:
+        if lowered in (alias.lower() for alias in group):
+            return group
+    return ()
+
+
+def _resolve(name: str, numeric: dict, categorical: dict, constants: dict):
+    if name in constants:
+        return ('constant', None, float(constants[name])), None
+    if name in numeric:
+        return ('column', name, None), None
+    by_lower = {c.lower(): c for c in numeric}
+    if name.lower() in by_lower:
+        return ('column', by_lower[name.lower()], None), None
+    for alias in _alias_group(name):
+        if alias.lower() in by_lower:
+            return ('column', by_lower[alias.lower()], None), None
+    for column, values in categorical.items():
+        prefix = f'{column}_'
+        if name.startswith(prefix):
+            value = name[len(prefix):]
+            matches = [v for v in values if str(v) == value]
+            if matches:
+                return ('onehot', column, matches[0]), None
+            close = difflib.get_close_matches(value, [str(v) for v in values], n=3, cutoff=0.5)
+            return None, (f'column {column!r} never holds {value!r}' + (f' (close: {close})' if close else '')
+                          + f'; pass a constant (e.g. {name}=0) if an all-zero indicator is intended')
+    if name in categorical:
+        return None, f'{name!r} is a categorical column; the model needs numeric or one-hot ({name}_<value>) features'
+    close = difflib.get_close_matches(name, list(numeric) + list(categorical), n=3, cutoff=0.5)
+    return None, 'no matching column' + (f' (close: {close})' if close else '')
+
+
+def compile_feature_plan(feature_names, schema, constants: dict = None) -> FeaturePlan:
+    """Resolve `feature_names` against `schema` (see the module docstring) or raise `UnresolvedFeaturesError`."""
+    normalized = normalize_schema(schema) if hasattr(schema, 'items') else tuple(schema)
+    numeric = {name: spec for name, spec in normalized if not isinstance(spec, tuple)}
+    categorical = {name: spec[1:] for name, spec in normalized if isinstance(spec, tuple)}
+    constants = dict(constants or {})
+    steps, unresolved = [], {}
+    for name in feature_names:
+        step, reason = _resolve(str(name), numeric, categorical, constants)
+        if step is None:
+            unresolved[str(name)] = reason
+        steps.append(step)
+    if unresolved:
+        raise UnresolvedFeaturesError(unresolved, dict(normalized))
+    return FeaturePlan([str(n) for n in feature_names], steps)
+
+
+@functools.lru_cache(maxsize=128)
+def _cached_plan(model_key, feature_names: tuple, schema: tuple, constants: tuple) -> FeaturePlan:
+    return compile_feature_plan(feature_names, schema, dict(constants))
+
+
+def get_feature_plan(feature_names, schema, model_key: str = None, constants: dict = None) -> FeaturePlan:
+    """Cached `compile_feature_plan` keyed by (model_key, feature names, schema, constants)."""
+    normalized = normalize_schema(schema) if hasattr(schema, 'items') else tuple(schema)
+    frozen = tuple(sorted((str(k), float(v)) for k, v in (constants or {}).items()))
+    return _cached_plan(model_key, tuple(str(n) for n in feature_names), normalized, frozen)
+
+
+def feature_plan_cache_info():
+    return _cached_plan.cache_info()
@@ -0,0 +1,290 @@
+"""Streaming ingestion of the RF training CSV.
+
+The weather exports can be far larger than memory, so instead of one
+``pd.read_csv`` of the whole file the loaders here read only the eight
+required columns, in chunks, with explicit compact dtypes, and copy each chunk
+into a preallocated float32 feature matrix (the dtype the sklearn forest
+trains on anyway) and a float32 target vector.
+
+Without subsampling the matrix holds every row (its size is bounded by the
+file's line count, taken in a cheap first pass). With ``max_rows`` the rows are
+subsampled while streaming, so peak memory is ``max_rows`` rows plus one chunk
+whatever the file size:
+
+- ``reservoir``: a uniform sample (Algorithm R, vectorized per chunk);
+- ``stratified``: equal shares per value of `stratify_by` (e.g. every month),
+  capped by what each stratum holds, each filled by its own reservoir. This
+  takes one extra pass over the stratum column to count the strata.
+"""
+import os
+
+import numpy as np
+
+
+INPUT_FEATURES = [
+    'Cloud Type',
+    'Solar Zenith Angle',
+    'Relative Humidity',
+    'Temperature',
+    'Month',
+    'Day',
+    'Hour'
+]
+TARGET = 'GHI'
+REQUIRED_COLUMNS = INPUT_FEATURES + [TARGET]
+
+# int16 rather than uint8: pandas wraps out-of-range values of narrow ints
+# silently, while int16 keeps them visible to the range checks below.
+COLUMN_DTYPES = {
+    'Cloud Type': 'float32',
+    'Solar Zenith Angle': 'float32',
+    'Relative Humidity': 'float32',
+    'Temperature': 'float32',
+    'Month': 'int16',
+    'Day': 'int16',
+    'Hour': 'int16',
+    'GHI': 'float32',
+}
+COLUMN_RANGES = {'Month': (1, 12), 'Day': (1, 31), 'Hour': (0, 23)}
+
+SAMPLING = ('reservoir', 'stratified')
+STRATA_COLUMNS = ('Cloud Type', 'Month', 'Day', 'Hour')
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def read_header(csv_path: str) -> list:
+    """Column names of `csv_path` (reads only the header line)."""
+    import pandas as pd
+
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    return list(pd.read_csv(csv_path, nrows=0).columns)
+
+
+def validate_columns(columns):
+    """Raise ValueError naming any REQUIRED_COLUMNS absent from `columns`."""
+    missing = [c for c in REQUIRED_COLUMNS if c not in columns]
+    if missing:
+        raise ValueError(f"Missing required columns in CSV: {missing}")
+
+
+def _check_chunk(chunk, csv_path: str, first_row: int):
+    for column, (low, high) in COLUMN_RANGES.items():
+        values = chunk[column].to_numpy()
+        bad = (values < low) | (values > high)
+        if bad.any():
+            row = first_row + int(np.argmax(bad))
+            raise ValueError(f"{csv_path}: '{column}' = {values[bad][0]} at data row {row} is outside [{low}, {high}]")
+
+
+def iter_training_chunks(csv_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Yield (X, y) per chunk of `csv_path`: float32 arrays of shape (n, 7) and (n,).
+
+    Columns are checked on the header before any data is parsed, value ranges
+    on every chunk; a file without data rows raises ValueError.
+    """
+    import pandas as pd
+
+    validate_columns(read_header(csv_path))
+    reader = pd.read_csv(csv_path, usecols=REQUIRED_COLUMNS, dtype=COLUMN_DTYPES, chunksize=chunk_rows)
+    first_row = 0
+    with reader:
+        while True:
+            try:
+                chunk = next(reader)
+            except StopIteration:
+                break
+            except (ValueError, OverflowError) as e:
+                raise ValueError(f"{csv_path}: could not parse the training columns after data row {first_row} as {COLUMN_DTYPES}: {e}") from e
+            _check_chunk(chunk, csv_path, first_row)
+            X = np.empty((len(chunk), len(INPUT_FEATURES)), dtype=np.float32)
+            for i, column in enumerate(INPUT_FEATURES):
+                X[:, i] = chunk[column].to_numpy()
+            first_row += len(chunk)
+            yield X, chunk[TARGET].to_numpy(dtype=np.float32)
+    if first_row == 0:
+        raise ValueError(f"No training rows in {csv_path}")
+
+
+def count_data_rows(csv_path: str, block_bytes: int = 1 << 24) -> int:
+    """Upper bound on the number of data rows (newlines after the header), read in binary blocks."""
+    lines = 0
+    last = b'\n'
+    with open(csv_path, 'rb') as f:
+        while True:
+            block = f.read(block_bytes)
+            if not block:
+                break
+            lines += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        lines += 1
+    return max(lines - 1, 0)
+
+
+def _add_counts(counts: dict, values):
+    values, n = np.unique(values, return_counts=True)
+    for value, count in zip(values.tolist(), n.tolist()):
+        counts[value] = counts.get(value, 0) + count
+
+
+def count_strata(csv_path: str, column: str, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> dict:
+    """Rows per value of `column`, streaming only that column."""
+    import pandas as pd
+
+    if column not in STRATA_COLUMNS:
+        raise ValueError(f"stratify_by must be one of {STRATA_COLUMNS}, got {column!r}")
+    validate_columns(read_header(csv_path))
+    counts = {}
+    with pd.read_csv(csv_path, usecols=[column], dtype={column: COLUMN_DTYPES[column]}, chunksize=chunk_rows) as reader:
+        for chunk in reader:
+            _add_counts(counts, chunk[column].to_numpy())
+    return counts
+
+
+def stratum_quotas(counts: dict, max_rows: int) -> dict:
+    """Split `max_rows` equally over the strata; small strata give their unused share to the others."""
+    quotas = {}
+    remaining = max_rows
+    pending = sorted(counts, key=lambda s: counts[s])
+    while pending:
+        share = remaining // len(pending)
+        stratum = pending.pop(0)
+        quotas[stratum] = min(counts[stratum], share)
+        remaining -= quotas[stratum]
+    return quotas
+
+
+class _Reservoir:
+    """Algorithm R into rows [start, start + size) of shared output arrays."""
+
+    def __init__(self, X, y, start: int, size: int, rng):
+        self.X, self.y = X, y
+        self.start, self.size = start, size
+        self.rng = rng
+        self.filled = 0
+        self.seen = 0
+
+    def update(self, X, y):
+        n = len(X)
+        take = min(self.size - self.filled, n)
+        if take:
+            rows = slice(self.start + self.filled, self.start + self.filled + take)
+            self.X[rows], self.y[rows] = X[:take], y[:take]
+            self.filled += take
+        if n > take and self.size:
+            # item with global index i replaces slot j ~ U[0, i] when j < size
+            index = self.seen + np.arange(take, n)
+            slot = self.rng.integers(0, index + 1)
+            accept = np.nonzero(slot < self.size)[0]
+            # several items may hit the same slot in one chunk; the last one wins
+            slot, last = np.unique(slot[accept][::-1], return_index=True)
+            source = take + accept[::-1][last]
+            self.X[self.start + slot], self.y[self.start + slot] = X[source], y[source]
+        self.seen += n
+
+
+def _check_sampling(max_rows: int, sample: str):
+    if sample is not None and sample not in SAMPLING:
+        raise ValueError(f"Unknown sampling {sample!r}; expected one of {SAMPLING}")
+    if sample is not None and max_rows is None:
+        raise ValueError('Sampling needs max_rows')
+    if max_rows is not None and max_rows < 1:
+        raise ValueError('max_rows must be positive')
+
+
+def _sample_chunks(chunks, max_rows: int, counts: dict = None, column: int = None, seed: int = 42):
+    """Subsample a stream of (X, y) chunks: one reservoir, or one per stratum when `counts` is given."""
+    rng = np.random.default_rng(seed)
+    quotas = stratum_quotas(counts, max_rows) if counts is not None else None
+    size = sum(quotas.values()) if quotas is not None else max_rows
+    X = np.empty((size, len(INPUT_FEATURES)), dtype=np.float32)
+    y = np.empty(size, dtype=np.float32)
+
+    if quotas is None:
+        reservoir = _Reservoir(X, y, 0, size, rng)
+        for X_chunk, y_chunk in chunks:
+            reservoir.update(X_chunk, y_chunk)
+        return X[:reservoir.filled], y[:reservoir.filled]
+
+    reservoirs = {}
+    start = 0
+    for stratum, quota in quotas.items():
+        reservoirs[stratum] = _Reservoir(X, y, start, quota, rng)
+        start += quota
+    for X_chunk, y_chunk in chunks:
+        values = X_chunk[:, column]
+        order = np.argsort(values, kind='stable')
+        strata, bounds = np.unique(values[order], return_index=True)
+        for stratum, lo, hi in zip(strata.tolist(), bounds, np.r_[bounds[1:], len(order)]):
+            rows = order[lo:hi]
+            reservoirs[stratum].update(X_chunk[rows], y_chunk[rows])
+    return X, y
+
+
+def load_training_arrays(
+    csv_path: str,
+    max_rows: int = None,
+    sample: str = None,
+    stratify_by: str = 'Month',
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    seed: int = 42,
+):
+    """Stream `csv_path` into a preallocated float32 training matrix.
+
+    Args:
+        csv_path: training CSV with the REQUIRED_COLUMNS (any others are skipped unparsed).
+        max_rows: keep at most this many rows; None keeps them all.
+        sample: 'reservoir' (default when max_rows is set) or 'stratified'.
+        stratify_by: one of STRATA_COLUMNS; its values define the strata of 'stratified' sampling.
+        chunk_rows: rows parsed per chunk.
+        seed: seed of the sampling RNG.
+
+    Returns:
+        (X, y): float32 arrays of shape (n_rows, 7) in INPUT_FEATURES order and (n_rows,).
+    """
+    _check_sampling(max_rows, sample)
+    if max_rows is None:
+        capacity = count_data_rows(csv_path)
+        X = np.empty((capacity, len(INPUT_FEATURES)), dtype=np.float32)
+        y = np.empty(capacity, dtype=np.float32)
+        n = 0
+        for X_chunk, y_chunk in iter_training_chunks(csv_path, chunk_rows):
+            X[n:n + len(X_chunk)], y[n:n + len(y_chunk)] = X_chunk, y_chunk
+            n += len(X_chunk)
+        return X[:n], y[:n]
+
+    if sample == 'stratified':
+        counts = count_strata(csv_path, stratify_by, chunk_rows)
+        return _sample_chunks(iter_training_chunks(csv_path, chunk_rows), max_rows, counts, INPUT_FEATURES.index(stratify_by), seed)
+    return _sample_chunks(iter_training_chunks(csv_path, chunk_rows), max_rows, seed=seed)
+
+
+def sample_training_arrays(
+    X,
+    y,
+    max_rows: int,
+    sample: str = 'reservoir',
+    stratify_by: str = 'Month',
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    seed: int = 42,
+):
+    """Subsample in-memory (or memory-mapped) training arrays exactly like `load_training_arrays`.
+
+    The arrays are walked in blocks of `chunk_rows` rows, the chunks the CSV
+    reader yields, through the same seeded reservoirs. The same `max_rows`,
+    `sample`, `chunk_rows` and `seed` therefore select the same rows, in the same
+    order, from a CSV and from its columnar cache.
+    """
+    _check_sampling(max_rows, sample)
+    chunk_rows = max(1, int(chunk_rows))
+    chunks = ((X[i:i + chunk_rows], y[i:i + chunk_rows]) for i in range(0, len(X), chunk_rows))
+    if sample != 'stratified':
+        return _sample_chunks(chunks, max_rows, seed=seed)
+    if stratify_by not in STRATA_COLUMNS:
+        raise ValueError(f"stratify_by must be one of {STRATA_COLUMNS}, got {stratify_by!r}")
+    column = INPUT_FEATURES.index(stratify_by)
+    counts = {}
+    for i in range(0, len(X), chunk_rows):
+        _add_counts(counts, X[i:i + chunk_rows, column])
+    return _sample_chunks(chunks, max_rows, counts, column, seed)
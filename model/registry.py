@@ -0,0 +1,199 @@
+"""Process-wide registry of loaded model artifacts.
+
+Every artifact is loaded once per process and shared by all callers. On each
+lookup the file is stat'ed; it is only reloaded when its mtime/size changed *and*
+its content hash differs from the loaded copy, so touching a file is cheap.
+
+Artifacts ending in ``.npz`` are compiled forests (`CompiledForest.load`; e.g.
+the compact output of ``scripts/compress_forest.py``), anything else is
+loaded with joblib.
+
+Set ``AEROAQUA_MODEL_MMAP=r`` (or call `configure_model_registry(mmap_mode='r')`)
+to load the numpy arrays inside joblib artifacts as read-only memory maps.
+"""
+import hashlib
+import os
+import threading
+import time
+
+import numpy as np
+
+
+MODEL_FILENAME = 'solar_predictor_model.joblib'
+
+MODEL_FALLBACK_PATHS = [
+    os.path.join(os.path.dirname(__file__), MODEL_FILENAME),
+    os.path.join(os.getcwd(), 'solarenergy', MODEL_FILENAME),
+    os.path.join(os.getcwd(), 'model', MODEL_FILENAME),
+    os.path.join(os.getcwd(), MODEL_FILENAME),
+]
+
+MMAP_ENV = 'AEROAQUA_MODEL_MMAP'
+
+
+def resolve_model_path(path_hint: str = None, extra_paths=None):
+    """Return the first existing model path: the hint, then `extra_paths`, then `MODEL_FALLBACK_PATHS`."""
+    if path_hint and os.path.exists(path_hint):
+        return path_hint
+    for p in list(extra_paths or []) + MODEL_FALLBACK_PATHS:
+        candidate = os.path.normpath(p)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def estimate_model_nbytes(model) -> int:
+    """Approximate resident size of a loaded model by summing its numpy buffers."""
+    estimators = getattr(model, 'estimators_', None)
+    if estimators is not None:
+        return sum(estimate_model_nbytes(est) for est in estimators)
+    tree = getattr(model, 'tree_', None)
+    if tree is not None:
+        state = tree.__getstate__()
+        return int(state['nodes'].nbytes + state['values'].nbytes)
+    total = 0
+    for value in getattr(model, '__dict__', {}).values():
+        if isinstance(value, np.ndarray):
+            total += value.nbytes
+    return int(total)
+
+
+class _Entry:
+    __slots__ = ('model', 'path', 'mtime_ns', 'size', 'sha256', 'mmap_mode', 'load_seconds', 'resident_bytes', 'loads')
+
+    def stats(self) -> dict:
+        return {
+            'path': self.path,
+            'sha256': self.sha256,
+            'mtime_ns': self.mtime_ns,
+            'file_bytes': self.size,
+            'mmap_mode': self.mmap_mode,
+            'load_seconds': self.load_seconds,
+            'resident_bytes': self.resident_bytes,
+            'loads': self.loads,
+        }
+
+
+class ModelRegistry:
+    """Caches loaded model artifacts by absolute path.
+
+    Args:
+        mmap_mode: default ``joblib.load`` mmap mode (None or 'r').
+    """
+
+    def __init__(self, mmap_mode: str = None):
+        self.mmap_mode = mmap_mode
+        self._entries = {}
+        self._hashes = {}
+        self._lock = threading.RLock()
+
+    def get(self, path: str, mmap_mode: str = None):
+        """Return the model stored at `path`, loading or reloading it when needed."""
+        key = os.path.abspath(path)
+        mode = self.mmap_mode if mmap_mode is None else mmap_mode
+        st = os.stat(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.mmap_mode == mode:
+                if (st.st_mtime_ns, st.st_size) == (entry.mtime_ns, entry.size):
+                    return entry.model
+                digest = file_sha256(key)
+                if digest == entry.sha256:
+                    entry.mtime_ns, entry.size = st.st_mtime_ns, st.st_size
+                    return entry.model
+            else:
+                digest = file_sha256(key)
+            return self._load(key, mode, st, digest, entry).model
+
+    def model_hash(self, path: str) -> str:
+        """Content hash (sha256) of the artifact at `path`, without loading it.
+
+        Hashes are kept per (mtime_ns, size), so the file is only read again after it changes.
+        """
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._hashes.get(key)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        digest = file_sha256(key)
+        with self._lock:
+            self._hashes[key] = (stamp, digest)
+        return digest
+
+    def stats(self, path: str = None):
+        """Load statistics for one artifact, or a list for every loaded artifact."""
+        with self._lock:
+            if path is not None:
+                entry = self._entries.get(os.path.abspath(path))
+                return None if entry is None else entry.stats()
+            return [e.stats() for e in self._entries.values()]
+
+    def evict(self, path: str = None):
+        """Forget one artifact (or all of them); the next lookup reloads from disk."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._hashes.clear()
+            else:
+                self._entries.pop(os.path.abspath(path), None)
+                self._hashes.pop(os.path.abspath(path), None)
+
+    def _load(self, key: str, mode: str, st, digest: str, previous):
+        import joblib
+
+        start = time.perf_counter()
+        if key.endswith('.npz'):
+            from .compiled_forest import CompiledForest
+            model = CompiledForest.load(key, mmap_mode=mode)
+        else:
+            model = joblib.load(key, mmap_mode=mode)
+        elapsed = time.perf_counter() - start
+
+        entry = _Entry()
+        entry.model = model
+        entry.path = key
+        entry.mtime_ns = st.st_mtime_ns
+        entry.size = st.st_size
+        entry.sha256 = digest
+        entry.mmap_mode = mode
+        entry.load_seconds = elapsed
+        entry.resident_bytes = estimate_model_nbytes(model)
+        entry.loads = (previous.loads if previous is not None else 0) + 1
+        self._entries[key] = entry
+        self._hashes[key] = ((st.st_mtime_ns, st.st_size), digest)
+        return entry
+
+
+model_registry = ModelRegistry(mmap_mode=os.environ.get(MMAP_ENV) or None)
+
+
+def load_model(path_hint: str = None, mmap_mode: str = None, extra_paths=None):
+    """Resolve a model path and return the shared, cached model instance.
+
+    Raises:
+        FileNotFoundError: if neither the hint nor any fallback path exists.
+    """
+    found = resolve_model_path(path_hint, extra_paths)
+    if not found:
+        raise FileNotFoundError('RandomForest model not found. Please run model/train_rf_model.py to create solar_predictor_model.joblib and pass its path via model_path.')
+    return model_registry.get(found, mmap_mode=mmap_mode)
+
+
+def configure_model_registry(mmap_mode: str = None):
+    """Set the default mmap mode used for subsequent (re)loads."""
+    model_registry.mmap_mode = mmap_mode or None
+
+
+def model_registry_stats(path: str = None):
+    """Load time, resident size and hash of loaded artifacts."""
+    return model_registry.stats(path)
@@ -1,48 +1,67 @@
 import os
 import argparse
-import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-import joblib
 
+import numpy as np
 
-def train_and_save(csv_path: str, model_path: str = None):
+
+def train_and_save(
+    csv_path: str,
+    model_path: str = None,
+    max_rows: int = None,
+    sample: str = None,
+    stratify_by: str = 'Month',
+    chunk_rows: int = None,
+    seed: int = 42,
+    cache: bool = True,
+    cache_dir: str = None,
+):
     """Train RandomForest on provided CSV and save model.
 
     Expects the CSV to contain these columns:
         'Cloud Type', 'Solar Zenith Angle', 'Relative Humidity', 'Temperature', 'Month', 'Day', 'Hour', 'GHI'
 
+    The first run converts the CSV into a columnar ``.npy`` cache (see
+    `aeroaqua.model.training_cache`); later runs memory-map it and skip text
+    parsing until the CSV changes. With ``cache=False`` the CSV is streamed in
+    chunks into a preallocated float32 matrix (see `aeroaqua.model.ingest`).
+
     Args:
         csv_path: path to the CSV file used to train the model.
         model_path: path to save the trained joblib model. If None, saves to model/solar_predictor_model.joblib
+        max_rows: subsample to at most this many rows while streaming (bounds peak memory).
+        sample: 'reservoir' (uniform, the default with max_rows) or 'stratified' (equal shares per `stratify_by` value).
+        stratify_by: column defining the strata of stratified sampling.
+        chunk_rows: CSV rows parsed per chunk (default: ingest.DEFAULT_CHUNK_ROWS).
+        seed: seed of the subsampling RNG.
+        cache: train from the columnar cache, converting the CSV on first use.
+        cache_dir: cache location (default: $AEROAQUA_TRAINING_CACHE_DIR or .aeroaqua_cache next to the CSV).
 
     Returns:
         path to saved model
     """
-    if model_path is None:
-        model_path = os.path.join(os.path.dirname(__file__), 'solar_predictor_model.joblib')
-
-    if not os.path.exists(csv_path):
-        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    import joblib
+    import pandas as pd
+    from sklearn.ensemble import RandomForestRegressor
 
-    df = pd.read_csv(csv_path)
+    from .ingest import DEFAULT_CHUNK_ROWS, INPUT_FEATURES, load_training_arrays, sample_training_arrays
+    from .training_cache import load_cached_arrays
 
-    input_features = [
-        'Cloud Type',
-        'Solar Zenith Angle',
-        'Relative Humidity',
-        'Temperature',
-        'Month',
-        'Day',
-        'Hour'
-    ]
-    target_variable = 'GHI'
+    if model_path is None:
+        model_path = os.path.join(os.path.dirname(__file__), 'solar_predictor_model.joblib')
 
-    missing = [c for c in input_features + [target_variable] if c not in df.columns]
-    if missing:
-        raise ValueError(f"Missing required columns in CSV: {missing}")
+    if max_rows is not None and sample is None:
+        sample = 'reservoir'
+    if not cache:
+        X, y = load_training_arrays(csv_path, max_rows, sample, stratify_by, chunk_rows or DEFAULT_CHUNK_ROWS, seed)
+    else:
+        X, y = load_cached_arrays(csv_path, cache_dir, chunk_rows or DEFAULT_CHUNK_ROWS)
+        if max_rows is not None:
+            # same chunks and reservoirs as the streaming path, so --no-cache trains on the same rows
+            X, y = sample_training_arrays(X, y, max_rows, sample, stratify_by, chunk_rows or DEFAULT_CHUNK_ROWS, seed)
+    print(f"Loaded {len(X)} training rows ({(X.nbytes + y.nbytes) / 2**20:.1f} MiB)")
 
-    X = df[input_features]
-    y = df[target_variable]
+    # wrap without copying so the model keeps its feature names
+    X = pd.DataFrame(X, columns=INPUT_FEATURES, copy=False)
 
     print("Training RandomForest model...")
     model = RandomForestRegressor(
@@ -59,10 +78,87 @@ def train_and_save(csv_path: str, model_path: str = None):
     return model_path
 
 
+def forest_to_arrays(model) -> dict:
+    """Flatten a fitted averaging forest (e.g. RandomForestRegressor) into contiguous node arrays.
+
+    Node ``i`` of tree ``t`` is stored at ``tree_offsets[t] + i``; child ids in
+    `left` / `right` are tree-local (-1 marks a leaf).
+
+    Returns:
+        dict of numpy arrays: feature, threshold, left, right, value,
+        missing_go_to_left, n_node_samples, tree_offsets, n_features, feature_names,
+        format_version. Internal nodes keep their value (the mean target of their
+        training samples) so the trees can be pruned later (`aeroaqua.model.compress`).
+    """
+    from .compiled_forest import FORMAT_VERSION
+
+    estimators = getattr(model, 'estimators_', None)
+    if not estimators:
+        raise ValueError('Expected a fitted forest with estimators_')
+    if getattr(model, 'n_outputs_', 1) != 1:
+        raise ValueError('Only single-output forests can be exported')
+
+    trees = [est.tree_ for est in estimators]
+    counts = np.array([t.node_count for t in trees], dtype=np.int64)
+    nodes = [t.__getstate__()['nodes'] for t in trees]
+    names = getattr(model, 'feature_names_in_', None)
+    return {
+        'format_version': np.int64(FORMAT_VERSION),
+        'feature': np.concatenate([t.feature for t in trees]).astype(np.int32),
+        'threshold': np.concatenate([t.threshold for t in trees]).astype(np.float64),
+        'left': np.concatenate([t.children_left for t in trees]).astype(np.int32),
+        'right': np.concatenate([t.children_right for t in trees]).astype(np.int32),
+        'value': np.concatenate([t.value[:, 0, 0] for t in trees]).astype(np.float64),
+        'missing_go_to_left': np.concatenate([
+            n['missing_go_to_left'] if 'missing_go_to_left' in n.dtype.names else np.zeros(len(n), dtype=np.uint8)
+            for n in nodes
+        ]).astype(np.uint8),
+        'n_node_samples': np.concatenate([t.n_node_samples for t in trees]).astype(np.int64),
+        'tree_offsets': np.r_[0, np.cumsum(counts)[:-1]].astype(np.int64),
+        'n_features': np.int64(model.n_features_in_),
+        'feature_names': np.array([] if names is None else [str(n) for n in names], dtype=str),
+    }
+
+
+def export_forest(model, out_path: str):
+    """Write `forest_to_arrays(model)` to an uncompressed ``.npz`` file (loadable by `CompiledForest.load`)."""
+    np.savez(out_path, **forest_to_arrays(model))
+    print(f"Compiled forest saved to: {out_path}")
+    return out_path
+
+
+def export_model_file(model_path: str, out_path: str = None):
+    """Export a saved joblib forest; defaults to the same path with a ``.npz`` suffix."""
+    import joblib
+
+    if out_path is None:
+        out_path = os.path.splitext(model_path)[0] + '.npz'
+    return export_forest(joblib.load(model_path), out_path)
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Train and save RandomForest GHI predictor')
-    parser.add_argument('--csv', required=True, help='Path to usaWithWeather.csv (training data)')
+    parser.add_argument('--csv', help='Path to usaWithWeather.csv (training data)')
     parser.add_argument('--out', required=False, help='Output model path (joblib)')
+    parser.add_argument('--export', nargs='?', const='', default=None, help='Also write the compiled node arrays (.npz); optional path, defaults next to the model')
+    parser.add_argument('--export-from', help='Export an existing joblib model instead of training')
+    parser.add_argument('--max-rows', type=int, default=None, help='Subsample the CSV to at most this many rows while streaming')
+    parser.add_argument('--sample', choices=['reservoir', 'stratified'], default=None, help='Subsampling scheme with --max-rows (default: reservoir)')
+    parser.add_argument('--stratify-by', default='Month', help='Column whose values are the strata of --sample stratified (default: Month)')
+    parser.add_argument('--chunk-rows', type=int, default=None, help='CSV rows parsed per chunk')
+    parser.add_argument('--seed', type=int, default=42, help='Subsampling seed')
+    parser.add_argument('--no-cache', action='store_true', help='Stream the CSV instead of using the columnar training cache')
+    parser.add_argument('--cache-dir', default=None, help='Training cache directory (default: $AEROAQUA_TRAINING_CACHE_DIR or .aeroaqua_cache next to the CSV)')
     args = parser.parse_args()
 
-    train_and_save(args.csv, args.out)
+    if args.export_from:
+        export_model_file(args.export_from, args.export or None)
+    elif not args.csv:
+        parser.error('--csv is required unless --export-from is given')
+    else:
+        if args.sample and args.max_rows is None:
+            parser.error('--sample needs --max-rows')
+        saved = train_and_save(args.csv, args.out, args.max_rows, args.sample, args.stratify_by, args.chunk_rows, args.seed,
+                               cache=not args.no_cache, cache_dir=args.cache_dir)
+        if args.export is not None:
+            export_model_file(saved, args.export or None)
@@ -0,0 +1,186 @@
+"""Columnar binary cache of the RF training CSV.
+
+Parsing the weather CSV dominates retraining time, so the first run converts it
+once (streaming, see `aeroaqua.model.ingest`) into raw ``.npy`` arrays and every
+later run memory-maps them instead of parsing text:
+
+    <cache_dir>/<sha256 of the CSV>/features.npy   float32 (n_rows, 7), column-major
+    <cache_dir>/<sha256 of the CSV>/target.npy     float32 (n_rows,)
+    <cache_dir>/<sha256 of the CSV>/meta.json
+    <cache_dir>/index.json                          {csv path: {size, mtime_ns, sha256}}
+
+The features are stored column-major, so each feature is one contiguous column
+on disk and the memmap is handed to the forest without a copy. Entries are
+keyed by the source's content hash; `index.json` maps a path to its hash while
+its size and mtime are unchanged, so unchanged sources are not re-hashed. When
+a source changes it is re-hashed and converted again, and the entry it no
+longer uses is removed.
+
+The cache directory defaults to ``.aeroaqua_cache`` next to the CSV; set
+``AEROAQUA_TRAINING_CACHE_DIR`` or pass ``cache_dir`` to put it elsewhere.
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.model.training_cache --csv path/to/usaWithWeather.csv
+  python -m aeroaqua.model.training_cache --csv data.csv --cache-dir /scratch/cache --force
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from .ingest import DEFAULT_CHUNK_ROWS, INPUT_FEATURES, TARGET, count_data_rows, iter_training_chunks
+from .registry import file_sha256
+
+
+CACHE_FORMAT_VERSION = 1
+CACHE_DIR_ENV = 'AEROAQUA_TRAINING_CACHE_DIR'
+INDEX_FILENAME = 'index.json'
+
+_index_lock = threading.Lock()
+
+
+def training_cache_dir(csv_path: str, cache_dir: str = None) -> str:
+    """Cache directory used for `csv_path`: `cache_dir`, else the env variable, else next to the CSV."""
+    if cache_dir:
+        return cache_dir
+    return os.environ.get(CACHE_DIR_ENV) or os.path.join(os.path.dirname(os.path.abspath(csv_path)), '.aeroaqua_cache')
+
+
+def _read_json(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path: str, data: dict):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(data, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _entry_is_valid(entry_dir: str) -> bool:
+    meta = _read_json(os.path.join(entry_dir, 'meta.json'))
+    return (
+        meta.get('format_version') == CACHE_FORMAT_VERSION
+        and meta.get('features') == INPUT_FEATURES
+        and meta.get('target') == TARGET
+        and os.path.exists(os.path.join(entry_dir, 'features.npy'))
+        and os.path.exists(os.path.join(entry_dir, 'target.npy'))
+    )
+
+
+def _write_entry(csv_path: str, entry_dir: str, digest: str, chunk_rows: int):
+    capacity = count_data_rows(csv_path)
+    tmp_dir = f'{entry_dir}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        features_path = os.path.join(tmp_dir, 'features.npy')
+        target_path = os.path.join(tmp_dir, 'target.npy')
+        X = np.lib.format.open_memmap(features_path, mode='w+', dtype=np.float32,
+                                      shape=(capacity, len(INPUT_FEATURES)), fortran_order=True)
+        y = np.lib.format.open_memmap(target_path, mode='w+', dtype=np.float32, shape=(capacity,))
+        n = 0
+        for X_chunk, y_chunk in iter_training_chunks(csv_path, chunk_rows):
+            X[n:n + len(X_chunk)], y[n:n + len(y_chunk)] = X_chunk, y_chunk
+            n += len(X_chunk)
+        if n < capacity:
+            # blank or quoted-newline lines made the line count an overestimate
+            X = _shrink(features_path, X, n, fortran_order=True)
+            y = _shrink(target_path, y, n)
+        X.flush()
+        y.flush()
+        del X, y
+
+        _write_json(os.path.join(tmp_dir, 'meta.json'), {
+            'format_version': CACHE_FORMAT_VERSION,
+            'source': os.path.abspath(csv_path),
+            'sha256': digest,
+            'rows': n,
+            'features': INPUT_FEATURES,
+            'target': TARGET,
+            'dtype': 'float32',
+        })
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _shrink(path: str, array, n: int, fortran_order: bool = False):
+    shrunk_path = f'{path}.shrink'
+    shrunk = np.lib.format.open_memmap(shrunk_path, mode='w+', dtype=array.dtype,
+                                       shape=(n,) + array.shape[1:], fortran_order=fortran_order)
+    shrunk[:] = array[:n]
+    shrunk.flush()
+    os.replace(shrunk_path, path)
+    return shrunk
+
+
+def convert_csv(csv_path: str, cache_dir: str = None, chunk_rows: int = DEFAULT_CHUNK_ROWS, force: bool = False) -> str:
+    """Make sure the cache holds `csv_path`, converting it if needed; returns the entry directory.
+
+    The source is only re-hashed when its size or mtime differ from the index,
+    and only re-parsed when no valid entry exists for its content hash (or `force`).
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError(f"CSV file not found: {csv_path}")
+    cache_dir = training_cache_dir(csv_path, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    index_path = os.path.join(cache_dir, INDEX_FILENAME)
+    source = os.path.abspath(csv_path)
+    st = os.stat(source)
+
+    with _index_lock:
+        index = _read_json(index_path)
+    known = index.get(source)
+    if known is not None and (known.get('size'), known.get('mtime_ns')) == (st.st_size, st.st_mtime_ns):
+        digest = known['sha256']
+    else:
+        digest = file_sha256(source)
+
+    entry_dir = os.path.join(cache_dir, digest)
+    if force or not _entry_is_valid(entry_dir):
+        print(f"Converting {csv_path} into the training cache at {entry_dir} ...")
+        _write_entry(source, entry_dir, digest, chunk_rows)
+
+    with _index_lock:
+        index = _read_json(index_path)
+        previous = index.get(source, {}).get('sha256')
+        index[source] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest}
+        _write_json(index_path, index)
+        if previous and previous != digest and all(e.get('sha256') != previous for e in index.values()):
+            shutil.rmtree(os.path.join(cache_dir, previous), ignore_errors=True)
+    return entry_dir
+
+
+def load_cached_arrays(csv_path: str, cache_dir: str = None, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+    """Read-only memory maps (X, y) of `csv_path`, converting it first if the cache is missing or stale.
+
+    Returns:
+        (X, y): float32 memmaps of shape (n_rows, 7) (column-major, INPUT_FEATURES order) and (n_rows,).
+    """
+    entry_dir = convert_csv(csv_path, cache_dir, chunk_rows)
+    X = np.load(os.path.join(entry_dir, 'features.npy'), mmap_mode='r')
+    y = np.load(os.path.join(entry_dir, 'target.npy'), mmap_mode='r')
+    return X, y
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert the RF training CSV into the columnar .npy cache')
+    parser.add_argument('--csv', required=True, help='Path to usaWithWeather.csv (training data)')
+    parser.add_argument('--cache-dir', default=None, help=f'Cache directory (default: ${CACHE_DIR_ENV} or .aeroaqua_cache next to the CSV)')
+    parser.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS, help='CSV rows parsed per chunk')
+    parser.add_argument('--force', action='store_true', help='Convert again even if a valid entry exists')
+    args = parser.parse_args()
+
+    entry = convert_csv(args.csv, args.cache_dir, args.chunk_rows, args.force)
+    meta = _read_json(os.path.join(entry, 'meta.json'))
+    print(f"{meta['rows']} rows cached in {entry}")
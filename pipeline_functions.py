@@ -1,42 +1,24 @@
 import pandas as pd
 import pvlib
-import joblib
-import numpy as np
-import os
-import warnings
+from aeroaqua.model.registry import load_model
+from aeroaqua.pipelines.pipeline_rf import daylight_ghi, daylight_mask
 
 # --- 1. Load the RandomForest Model ---
-# We'll try to find the model in common locations.
+# We'll try to find the model in common locations. Loading goes through the
+# process-wide model registry, so the artifact is read once per process (on
+# first use, not at import time) and reloaded only when the file changes.
 def get_solar_model(model_path=None):
-    """Loads the solar_predictor_model.joblib file."""
+    """Returns the shared solar_predictor_model.joblib instance.
+
+    Raises FileNotFoundError if the model cannot be found; predictions from a
+    placeholder model would silently be wrong.
+    """
     search_paths = [
-        model_path,
         'solar_predictor_model.joblib',
         './solar_predictor_model.joblib',
         '../solar_predictor_model.joblib'
     ]
-    
-    for path in search_paths:
-        if path and os.path.exists(path):
-            try:
-                model = joblib.load(path)
-                print(f"Successfully loaded model from: {path}")
-                return model
-            except Exception as e:
-                print(f"Error loading model from {path}: {e}")
-    
-    warnings.warn("*** WARNING: Could not find or load 'solar_predictor_model.joblib'. ***")
-    warnings.warn("Pipeline will run with a DUMMY model. Predictions will be incorrect.")
-    # Return a dummy_model if the real one isn't found, so the code can still run
-    class DummyModel:
-        def predict(self, X):
-            # A simple dummy: returns 800W/m^2 for low zenith, 0 for high
-            return np.where(X['zenith'] < 85, 800 * (1 - X['cloud_type']), 0)
-            
-    return DummyModel()
-
-# Load the model ONCE when this module is imported
-SOLAR_RF_MODEL = get_solar_model()
+    return load_model(model_path, extra_paths=search_paths)
 
 # --- 2. Define the Linear Regression Coefficients ---
 # These values are from your provided image (image_8e4a5e.png)
@@ -44,6 +26,15 @@ COEF_SOLAR_ENERGY = 0.803
 COEF_RH_PERCENT = 0.001
 INTERCEPT = 0.117
 
+
+def predict_liters_from_coefficients(solar_energy_kwh_m2, rh_percent):
+    """Liters/day from the coefficients above; works on scalars and NumPy arrays."""
+    return (
+        (solar_energy_kwh_m2 * COEF_SOLAR_ENERGY) +
+        (rh_percent * COEF_RH_PERCENT) +
+        INTERCEPT
+    )
+
 def run_prediction_pipeline(
     date_str: str,
     latitude: float,
@@ -53,7 +44,8 @@ def run_prediction_pipeline(
     cloud_type: float,
     rh_percent: float,
     temperature_c: float,
-    freq: str = '10T'
+    freq: str = '10T',
+    model_path: str = None
 ):
     """
     Runs the full 2-stage pipeline for a single day and single set of weather inputs.
@@ -112,14 +104,12 @@ def run_prediction_pipeline(
     # Fill NaNs conservatively
     X_features = X_features.fillna(0)
 
+    # Only daylight samples go to the model; GHI is exactly 0 at night (zenith clipped
+    # to 90) and negative predictions are clipped to 0.
     # Feature ordering must match training-time columns
     feature_cols = ['Cloud Type', 'Solar Zenith Angle', 'Relative Humidity', 'Temperature', 'Month', 'Day', 'Hour']
-    ghi_predictions_w_m2 = SOLAR_RF_MODEL.predict(X_features[feature_cols])
-
-    # Ensure GHI is 0 during nighttime (when solar zenith angle is 90)
-    ghi_predictions_w_m2[X_features['Solar Zenith Angle'] >= 90] = 0
-    # Ensure GHI is not negative
-    ghi_predictions_w_m2[ghi_predictions_w_m2 < 0] = 0
+    daylight = daylight_mask(X_features['Solar Zenith Angle'])
+    ghi_predictions_w_m2 = daylight_ghi(get_solar_model(model_path), X_features.loc[daylight, feature_cols], daylight)
     
     # Integrate GHI (W/m^2) to get daily Solar Energy (kWh/m^2)
     # 1. Get the frequency interval in hours
@@ -134,11 +124,7 @@ def run_prediction_pipeline(
     # --- STAGE 3: LINEAR REGRESSION WATER YIELD ---
     
     # Predict liters per day using the coefficients from your model
-    predicted_liters = (
-        (solar_energy_kwh_m2 * COEF_SOLAR_ENERGY) +
-        (rh_percent * COEF_RH_PERCENT) +
-        INTERCEPT
-    )
+    predicted_liters = predict_liters_from_coefficients(solar_energy_kwh_m2, rh_percent)
     
     # --- OUTPUT ---
     
@@ -1,4 +1,30 @@
-from .pipeline_pvlib import run_pipeline_pvlib
-from .pipeline_rf import run_pipeline_rf
+"""End-to-end pipelines, sweeps, grids, result sinks and the result cache."""
+from aeroaqua._lazy import lazy_module
 
-__all__ = ['run_pipeline_pvlib', 'run_pipeline_rf']
+_LAZY = {
+    'run_pipeline_pvlib': '.pipeline_pvlib',
+    'run_pipeline_rf': '.pipeline_rf',
+    'run_pipeline_rf_range': '.pipeline_rf',
+    'run_pipeline_rf_sites': '.pipeline_rf',
+    'run_pipeline_rf_climatology': '.climatology',
+    'run_scenario_sweep': '.sweep',
+    'iter_daily_rf': '.weather',
+    'run_pipeline_rf_weather': '.weather',
+    'EnergyAtlas': '.atlas',
+    'build_energy_atlas': '.atlas',
+    'SweepExecutor': '.executor',
+    'ProgressReporter': '.executor',
+    'iter_parallel_sweep': '.executor',
+    'run_parallel_sweep': '.executor',
+    'parallel_predict': '.executor',
+    'iter_parallel_predict': '.executor',
+    'open_sink': '.sinks',
+    'Grid': '.grid',
+    'evaluate_grid': '.grid',
+    'ResultCache': '.result_cache',
+    'configure_result_cache': '.result_cache',
+}
+
+__all__ = list(_LAZY)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY)
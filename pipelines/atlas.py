@@ -0,0 +1,317 @@
+"""Precomputed daily energy atlas for one site.
+
+For a fixed site and model, the RF daily energy only depends on the day of the
+year, the cloud type, RH and temperature. `build_energy_atlas` evaluates it once
+over a (day-of-year x cloud type x RH x temperature) grid with the sweep engine
+(`aeroaqua.pipelines.sweep`, same results as `run_scenario_sweep`) and stores it as
+a float32 ``.npy`` array next to a ``meta.json`` with the axes, the site, the
+model's sha256 and the atlas' measured interpolation error:
+
+    <atlas_dir>/energy.npy   float32 (n_days, n_clouds, n_rh, n_temps), kWh/m^2
+    <atlas_dir>/meta.json
+
+`EnergyAtlas` memory-maps the array and answers with multilinear interpolation
+between the 16 surrounding grid points: `query` for one point (a few
+microseconds), `query_many` for broadcast arrays. The day axis wraps around the
+year (Dec 31 interpolates towards Jan 1); the other axes clamp to their range.
+"""
+import bisect
+import json
+import os
+import time
+
+import numpy as np
+
+from aeroaqua.solar import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
+from aeroaqua.model.registry import load_model, model_registry
+from aeroaqua.pipelines.sweep import DEFAULT_CHUNK_ROWS, DayGeometry, _chunk_dates, predict_daily_energy, scenario_grid
+
+
+ATLAS_FORMAT_VERSION = 1
+DEFAULT_YEAR = 2025
+DEFAULT_CLOUD_TYPES = tuple(float(c) for c in range(11))
+DEFAULT_RH_VALUES = tuple(float(r) for r in range(0, 101, 10))
+DEFAULT_TEMPERATURES = tuple(float(t) for t in range(-20, 41, 5))
+QUERY_BLOCK = 1 << 13
+AXES = ('day_of_year', 'cloud_type', 'rh_percent', 'temperature_c')
+
+
+def _reference_dates(year: int, days):
+    import pandas as pd
+    start = pd.Timestamp(f'{year}-01-01')
+    return [(start + pd.Timedelta(days=int(d) - 1)).strftime('%Y-%m-%d') for d in days]
+
+
+def _days_in_year(year: int) -> int:
+    import calendar
+    return 366 if calendar.isleap(year) else 365
+
+
+def _axis_weights(values, x, period: float = None):
+    """Lower/upper grid indices and the upper weight along one axis, for an array of positions."""
+    values = np.asarray(values, dtype=float)
+    x = np.asarray(x, dtype=float)
+    n = len(values)
+    if n == 1:
+        zeros = np.zeros(x.shape, dtype=np.int64)
+        return zeros, zeros, np.zeros(x.shape)
+    if period is not None:
+        x = values[0] + np.mod(x - values[0], period)
+        edges = np.r_[values, values[0] + period]
+    else:
+        x = np.clip(x, values[0], values[-1])
+        edges = values
+    gaps = np.diff(edges)
+    if np.all(gaps[:-1] == gaps[0]):
+        # evenly spaced (apart from the last gap): index arithmetic instead of a binary search
+        i0 = ((x - edges[0]) // gaps[0]).astype(np.int64)
+    else:
+        i0 = np.searchsorted(edges, x, side='right') - 1
+    i0 = np.clip(i0, 0, len(gaps) - 1)
+    w = (x - edges[i0]) / gaps[i0]
+    return i0, (i0 + 1) % n if period is not None else i0 + 1, w
+
+
+def _axis_weight(values: list, x: float, period: float = None):
+    """Scalar `_axis_weights` on a Python list."""
+    n = len(values)
+    if n == 1:
+        return 0, 0, 0.0
+    if period is not None:
+        x = values[0] + (x - values[0]) % period
+        i0 = bisect.bisect_right(values, x) - 1
+        upper = values[i0 + 1] if i0 + 1 < n else values[0] + period
+        return i0, (i0 + 1) % n, (x - values[i0]) / (upper - values[i0])
+    if x <= values[0]:
+        return 0, 1, 0.0
+    if x >= values[-1]:
+        return n - 2, n - 1, 1.0
+    i0 = bisect.bisect_right(values, x) - 1
+    return i0, i0 + 1, (x - values[i0]) / (values[i0 + 1] - values[i0])
+
+
+class EnergyAtlas:
+    """Memory-mapped daily energy grid of one site with multilinear lookups.
+
+    Args:
+        energy: array of shape (n_days, n_clouds, n_rh, n_temps) in kWh/m^2.
+        meta: dict with the axes ('day_of_year', 'cloud_type', 'rh_percent',
+            'temperature_c'), 'year' and the build parameters.
+    """
+
+    def __init__(self, energy, meta: dict):
+        self.energy = energy
+        self.meta = meta
+        self.axes = [list(map(float, meta[name])) for name in AXES]
+        if tuple(len(a) for a in self.axes) != energy.shape:
+            raise ValueError(f'Atlas axes {[len(a) for a in self.axes]} do not match the grid shape {energy.shape}')
+        self.period = float(_days_in_year(int(meta['year'])))
+        self._grid = np.asarray(energy)
+
+    @classmethod
+    def load(cls, path: str, model_path: str = None, mmap_mode: str = 'r'):
+        """Open an atlas directory; with `model_path`, refuse an atlas built from a different model."""
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('format_version') != ATLAS_FORMAT_VERSION:
+            raise ValueError(f"Unsupported atlas format {meta.get('format_version')} in {path}")
+        if model_path is not None:
+            digest = model_registry.model_hash(model_path)
+            if digest != meta.get('model_sha256'):
+                raise ValueError(f'Atlas {path} was built from model {meta.get("model_sha256")}, not {model_path} ({digest}); rebuild it')
+        return cls(np.load(os.path.join(path, 'energy.npy'), mmap_mode=mmap_mode), meta)
+
+    @property
+    def error(self) -> dict:
+        """Interpolation error measured at build time (see `interpolation_error`)."""
+        return self.meta.get('error', {})
+
+    def query(self, day_of_year: float, cloud_type: float, rh_percent: float, temperature_c: float) -> float:
+        """Daily kWh/m^2 at one point (day_of_year is 1-based; fractions interpolate between days)."""
+        days, clouds, rhs, temps = self.axes
+        a0, a1, wa = _axis_weight(days, float(day_of_year), self.period)
+        b0, b1, wb = _axis_weight(clouds, float(cloud_type))
+        c0, c1, wc = _axis_weight(rhs, float(rh_percent))
+        d0, d1, wd = _axis_weight(temps, float(temperature_c))
+        item = self._grid.item
+        total = 0.0
+        for a, fa in ((a0, 1.0 - wa), (a1, wa)):
+            if fa == 0.0:
+                continue
+            for b, fb in ((b0, 1.0 - wb), (b1, wb)):
+                if fb == 0.0:
+                    continue
+                for c, fc in ((c0, 1.0 - wc), (c1, wc)):
+                    if fc == 0.0:
+                        continue
+                    f = fa * fb * fc
+                    total += f * ((1.0 - wd) * item(a, b, c, d0) + wd * item(a, b, c, d1))
+        return total
+
+    def query_many(self, day_of_year, cloud_type, rh_percent, temperature_c):
+        """Vectorized `query`; arguments broadcast against each other."""
+        arrays = np.broadcast_arrays(
+            np.asarray(day_of_year, dtype=float), np.asarray(cloud_type, dtype=float),
+            np.asarray(rh_percent, dtype=float), np.asarray(temperature_c, dtype=float),
+        )
+        shape = arrays[0].shape
+        points = [a.ravel() for a in arrays]
+        out = np.empty(len(points[0]))
+        # blocks keep the 16-corner temporaries in cache
+        for start in range(0, len(out), QUERY_BLOCK):
+            block = slice(start, start + QUERY_BLOCK)
+            out[block] = self._interpolate([p[block] for p in points])
+        return out.reshape(shape)
+
+    def _interpolate(self, points):
+        periods = (self.period, None, None, None)
+        flat = self._grid.reshape(-1)
+        strides = np.cumprod((1,) + self._grid.shape[:0:-1])[::-1]
+        # expand the 16 corners axis by axis as (flat offset, weight) pairs
+        corners = [(0, 1.0)]
+        for values, x, period, stride in zip(self.axes, points, periods, strides):
+            i0, i1, w = _axis_weights(values, x, period)
+            corners = [
+                pair
+                for offset, factor in corners
+                for pair in ((offset + i0 * stride, factor * (1.0 - w)), (offset + i1 * stride, factor * w))
+            ]
+        out = np.zeros(len(points[0]))
+        for offset, factor in corners:
+            out += factor * flat[offset]
+        return out
+
+    def query_date(self, dates, cloud_type, rh_percent, temperature_c):
+        """`query_many` for calendar dates of any year (Feb 29 reads Feb 28 of a non-leap atlas year)."""
+        import pandas as pd
+
+        dates = pd.DatetimeIndex(np.atleast_1d(pd.to_datetime(dates)))
+        days = dates.dayofyear.to_numpy()
+        after_feb = days > 59
+        if self.period == 365:
+            days = np.where(dates.is_leap_year & after_feb, days - 1, days)
+        else:
+            days = np.where(~dates.is_leap_year & after_feb, days + 1, days)
+        return self.query_many(days, cloud_type, rh_percent, temperature_c)
+
+
+def _direct_energy(model, days, clouds, rhs, temps, year, freq, latitude, longitude, altitude, timezone):
+    """Daily kWh/m^2 computed by the sweep engine for arbitrary (day, cloud, RH, temperature) points."""
+    out = np.empty(len(days))
+    unique_days = np.unique(days)
+    geometry = DayGeometry(_reference_dates(year, unique_days), freq, latitude, longitude, altitude, timezone)
+    for i, day in enumerate(unique_days):
+        rows = np.flatnonzero(days == day)
+        out[rows] = predict_daily_energy(model, geometry, [i], clouds[rows], rhs[rows], temps[rows], freq)[0]
+    return out
+
+
+def interpolation_error(atlas: EnergyAtlas, model, n_points: int = 500, seed: int = 0) -> dict:
+    """Compare `atlas.query_many` with direct evaluation at random off-grid points.
+
+    Days are random calendar days, cloud types random integers and RH/temperature
+    uniform within the grid's range.
+    """
+    meta = atlas.meta
+    rng = np.random.default_rng(seed)
+    days_axis, clouds_axis, rhs_axis, temps_axis = atlas.axes
+    days = rng.integers(1, int(atlas.period) + 1, n_points)
+    clouds = rng.integers(int(np.ceil(clouds_axis[0])), int(np.floor(clouds_axis[-1])) + 1, n_points).astype(float)
+    rhs = rng.uniform(rhs_axis[0], rhs_axis[-1], n_points)
+    temps = rng.uniform(temps_axis[0], temps_axis[-1], n_points)
+
+    direct = _direct_energy(model, days, clouds, rhs, temps, int(meta['year']), meta['freq'],
+                            meta['latitude'], meta['longitude'], meta['altitude'], meta['timezone'])
+    approx = atlas.query_many(days, clouds, rhs, temps)
+    error = approx - direct
+    scale = np.maximum(np.abs(direct), 1e-9)
+    return {
+        'points': int(n_points),
+        'seed': int(seed),
+        'rmse_kwh_m2': float(np.sqrt(np.mean(error ** 2))),
+        'mean_abs_kwh_m2': float(np.mean(np.abs(error))),
+        'p95_abs_kwh_m2': float(np.percentile(np.abs(error), 95)),
+        'max_abs_kwh_m2': float(np.max(np.abs(error))),
+        'mean_rel': float(np.mean(np.abs(error) / scale)),
+    }
+
+
+def build_energy_atlas(
+    out_dir: str,
+    model_path: str = None,
+    latitude: float = DEFAULT_LATITUDE,
+    longitude: float = DEFAULT_LONGITUDE,
+    altitude: float = DEFAULT_ALTITUDE,
+    timezone: str = DEFAULT_TZ,
+    year: int = DEFAULT_YEAR,
+    day_step: int = 1,
+    cloud_types=DEFAULT_CLOUD_TYPES,
+    rh_values=DEFAULT_RH_VALUES,
+    temperatures=DEFAULT_TEMPERATURES,
+    freq: str = '10T',
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    error_points: int = 500,
+    seed: int = 0,
+    progress=None,
+) -> EnergyAtlas:
+    """Evaluate the RF daily energy over the atlas grid and write it to `out_dir`.
+
+    Args:
+        out_dir: atlas directory (created; an existing atlas is replaced).
+        model_path: RF model (resolved through the model registry); its sha256 is recorded.
+        latitude, longitude, altitude, timezone: the site.
+        year: reference year whose calendar days form the day axis.
+        day_step: spacing of the day axis in days (1 stores every day).
+        cloud_types, rh_values, temperatures: increasing grid values of the other axes.
+        freq: sampling step of the daily integration.
+        chunk_rows: upper bound on feature rows per `predict` call.
+        error_points: random off-grid points compared with direct evaluation (0 skips).
+        seed: seed of those points.
+        progress: optional callable(days_done, days_total).
+
+    Returns:
+        the opened EnergyAtlas.
+    """
+    from aeroaqua.model.registry import resolve_model_path
+
+    axes = [np.arange(1, _days_in_year(year) + 1, day_step, dtype=float)] + [
+        np.asarray(sorted(set(float(v) for v in values))) for values in (cloud_types, rh_values, temperatures)
+    ]
+    model = load_model(model_path)
+    digest = model_registry.model_hash(resolve_model_path(model_path))
+    clouds, rhs, temps = scenario_grid(*axes[1:])
+    geometry = DayGeometry(_reference_dates(year, axes[0]), freq, latitude, longitude, altitude, timezone)
+
+    start = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    tmp_path = os.path.join(out_dir, f'energy.npy.{os.getpid()}.tmp')
+    energy = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32, shape=tuple(len(a) for a in axes))
+    done = 0
+    for group in _chunk_dates(geometry.samples_per_day, len(clouds), chunk_rows):
+        block = predict_daily_energy(model, geometry, group, clouds, rhs, temps, freq)
+        energy[group[0]:group[-1] + 1] = block.reshape((len(group),) + energy.shape[1:])
+        done += len(group)
+        if progress is not None:
+            progress(done, len(axes[0]))
+    energy.flush()
+    del energy
+    os.replace(tmp_path, os.path.join(out_dir, 'energy.npy'))
+
+    meta = {
+        'format_version': ATLAS_FORMAT_VERSION,
+        'model_sha256': digest,
+        'latitude': float(latitude),
+        'longitude': float(longitude),
+        'altitude': float(altitude),
+        'timezone': str(timezone),
+        'year': int(year),
+        'freq': str(freq),
+        'build_seconds': time.perf_counter() - start,
+    }
+    meta.update({name: axis.tolist() for name, axis in zip(AXES, axes)})
+    atlas = EnergyAtlas(np.load(os.path.join(out_dir, 'energy.npy'), mmap_mode='r'), meta)
+    if error_points:
+        meta['error'] = interpolation_error(atlas, model, error_points, seed)
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+    return atlas
@@ -0,0 +1,103 @@
+"""Multi-year (climatology) runs of the RF pipeline.
+
+Solar geometry repeats almost exactly from year to year, so a 30-year daily run
+does not need 30 years of SPA. `run_pipeline_rf_climatology` derives every
+year's solar positions from one reference year (`aeroaqua.solar.climatology`,
+apparent zenith within `ZENITH_ERROR_BOUND_DEG` of full SPA). The time grid
+and calendar features are built directly for each year, and the daily weather
+only enters the feature matrix. Per year only the forest runs: one ``predict``
+over the year's daylight samples.
+"""
+import numpy as np
+
+from aeroaqua.instrumentation import instrumented, span
+from aeroaqua.model import predict_water_yield_array
+from aeroaqua.pipelines.pipeline_rf import _features, _integrate_daily_kwh, _load_model, _per_day_values, daylight_ghi, daylight_mask
+from aeroaqua.solar import DEFAULT_ALTITUDE, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_TZ
+
+
+@instrumented('pipeline.rf_climatology')
+def run_pipeline_rf_climatology(
+    start_date: str = None,
+    end_date: str = None,
+    dates=None,
+    cloud_type=0.0,
+    rh_percent=50.0,
+    temperature_c=20.0,
+    model_path: str = None,
+    freq: str = '10T',
+    latitude: float = DEFAULT_LATITUDE,
+    longitude: float = DEFAULT_LONGITUDE,
+    altitude: float = DEFAULT_ALTITUDE,
+    timezone: str = DEFAULT_TZ,
+    reference_year: int = None,
+):
+    """Run the RF pipeline over many years of dates with solar geometry from one reference year.
+
+    Arguments match `run_pipeline_rf_range`: the inclusive range
+    `start_date`..`end_date` or an explicit list of `dates`, and per-date scalars or
+    sequences for the weather. `reference_year` (default: the middle year of the
+    dates) is the year whose SPA terms are computed. The zenith error bound holds
+    for dates within `MAX_PHASE_YEARS` of it. Each year is evaluated with one
+    forest ``predict``.
+
+    Returns a pandas.DataFrame with the columns of `run_pipeline_rf_range` (one row
+    per date, in input order).
+    """
+    import pandas as pd
+
+    from aeroaqua.solar.climatology import climatology_positions, stacked_day_times
+
+    if dates is None:
+        if start_date is None or end_date is None:
+            raise ValueError('Pass either dates or both start_date and end_date')
+        dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    days = pd.DatetimeIndex(pd.to_datetime(list(dates))).normalize()
+    n_days = len(days)
+    if not n_days:
+        raise ValueError('At least one date is required')
+
+    clouds = _per_day_values(cloud_type, n_days, 'cloud_type')
+    rhs = _per_day_values(rh_percent, n_days, 'rh_percent')
+    temps = _per_day_values(temperature_c, n_days, 'temperature_c')
+    years = days.year.to_numpy()
+    if reference_year is None:
+        reference_year = int(np.median(years))
+
+    with span('rf.model_load'):
+        model = _load_model(model_path)
+
+    daily_kwh = np.empty(n_days)
+    for year in np.unique(years):
+        rows = np.flatnonzero(years == year)
+        with span('rf.solar_positions') as sp:
+            times, day_starts = stacked_day_times(days[rows], freq, timezone)
+            zenith = climatology_positions(times, latitude, longitude, altitude, reference_year)['apparent_zenith'][0]
+            sp.set_rows(len(times))
+        samples_per_day = np.diff(np.r_[day_starts, len(times)])
+        day = daylight_mask(zenith)
+
+        with span('rf.features') as sp:
+            X = _features(
+                times[day],
+                zenith[day],
+                np.repeat(clouds[rows], samples_per_day)[day],
+                np.repeat(rhs[rows], samples_per_day)[day],
+                np.repeat(temps[rows], samples_per_day)[day],
+            )
+            sp.set_rows(len(X))
+        ghi_pred = daylight_ghi(model, X, day)
+        with span('rf.integrate', rows=len(times)):
+            daily_kwh[rows] = _integrate_daily_kwh(ghi_pred, times, day_starts, freq)
+
+    with span('rf.water_yield', rows=n_days):
+        predicted = predict_water_yield_array(daily_kwh, rhs)
+
+    return pd.DataFrame({
+        'date': days.date,
+        'cloud_type': clouds,
+        'rh_percent': rhs,
+        'temperature_c': temps,
+        'solar_energy_kwh_m2': daily_kwh,
+        'predicted_liters_per_day': predicted,
+    })
@@ -0,0 +1,303 @@
+"""Parallel execution of sweeps over a process pool.
+
+`SweepExecutor` runs picklable work units on a `ProcessPoolExecutor` whose
+workers are initialized once (model loaded through the registry, solar cache
+pointed at a shared disk tier) and streams results back in submission order.
+At most `max_pending` units are in flight at a time, which bounds memory when
+results are consumed slower than they are produced.
+
+`iter_parallel_sweep` / `run_parallel_sweep` split a sweep of
+sites x dates x scenarios into (site, date-chunk) units and run each through
+`run_scenario_sweep`. Before the sweep units run, the pool builds the annual
+solar tables of every (site, year) once, one table per task, and the workers
+then memory-map them. The tables go to `solar_cache_dir`, to the process's
+configured solar disk tier, or by default to a temporary directory that is
+removed when the sweep ends. Inline runs (one worker) point the caller's solar
+cache at `solar_cache_dir` only for the duration of the sweep.
+
+The parent only builds the work units and hands results back, so the speedup
+with more workers is bounded by the per-worker startup (process spawn and model
+load, about 1.9 s for the benchmark forest) rather than by serial work here.
+Scaling across cores has not been measured (the development machine has one).
+
+On platforms that spawn worker processes (Windows, macOS) the calling script
+must guard its entry point with ``if __name__ == '__main__':``.
+"""
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from aeroaqua.solar import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
+
+
+DEFAULT_DATES_PER_CHUNK = 8
+
+
+class ProgressReporter:
+    """Callable progress sink printing done/total, rate and ETA at most every `min_interval` seconds."""
+
+    def __init__(self, desc: str = 'Progress', stream=None, min_interval: float = 0.5):
+        self.desc = desc
+        self.stream = stream or sys.stderr
+        self.min_interval = min_interval
+        self._start = time.monotonic()
+        self._last = 0.0
+
+    def __call__(self, done: int, total: int):
+        now = time.monotonic()
+        if done < total and now - self._last < self.min_interval:
+            return
+        self._last = now
+        elapsed = now - self._start
+        rate = done / elapsed if elapsed > 0 else 0.0
+        eta = (total - done) / rate if rate > 0 else float('nan')
+        end = '\n' if done >= total else ''
+        self.stream.write(f'\r{self.desc}: {done}/{total} ({100.0 * done / max(total, 1):5.1f}%) {rate:.1f}/s eta {eta:.0f}s{end}')
+        self.stream.flush()
+
+
+def _init_worker(model_path, mmap_mode, solar_cache_dir):
+    if solar_cache_dir:
+        from aeroaqua.solar import configure_solar_cache
+        configure_solar_cache(disk_dir=solar_cache_dir)
+    if model_path is not None:
+        from aeroaqua.model.registry import load_model
+        load_model(model_path, mmap_mode=mmap_mode)
+
+
+class SweepExecutor:
+    """Process pool that runs work units with once-initialized workers.
+
+    Args:
+        workers: number of worker processes (default: os.cpu_count()). With 0 or 1
+            units run inline in the calling process, which avoids pool overhead.
+        max_pending: maximum units in flight (default: 2 * workers).
+        model_path: model preloaded by every worker through the model registry.
+        mmap_mode: registry mmap mode used for that preload.
+        solar_cache_dir: disk tier of the solar cache shared by all workers.
+        progress: optional callable(done_units, total_units).
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None, model_path: str = None, mmap_mode: str = None, solar_cache_dir: str = None, progress=None):
+        self.workers = (os.cpu_count() or 1) if workers is None else int(workers)
+        self.max_pending = max(1, int(max_pending) if max_pending else 2 * max(self.workers, 1))
+        self.model_path = model_path
+        self.mmap_mode = mmap_mode
+        self.solar_cache_dir = solar_cache_dir
+        self.progress = progress
+        self._pool = None
+
+    def __enter__(self):
+        self._ensure_pool()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _ensure_pool(self):
+        if self._pool is None and self.workers > 1:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.model_path, self.mmap_mode, self.solar_cache_dir),
+            )
+        return self._pool
+
+    def map(self, fn, units, total: int = None):
+        """Yield fn(unit) for every unit, in order, keeping at most `max_pending` in flight.
+
+        `units` is consumed lazily when `total` (the unit count reported to
+        `progress`) is given, so units can be produced on demand.
+        """
+        if total is None:
+            units = list(units)
+            total = len(units)
+        pool = self._ensure_pool()
+        if pool is not None:
+            yield from self._map(pool, fn, units, total)
+            return
+
+        # inline: the caller's process is the worker, so its solar cache is pointed back afterwards
+        from aeroaqua.solar.cache import configure_solar_cache, solar_position_cache
+
+        previous_disk_dir = solar_position_cache.disk_dir
+        _init_worker(self.model_path, self.mmap_mode, self.solar_cache_dir)
+        try:
+            yield from self._map(None, fn, units, total)
+        finally:
+            if self.solar_cache_dir:
+                configure_solar_cache(disk_dir=previous_disk_dir or '')
+
+    def _map(self, pool, fn, units, total: int):
+        pending = deque()
+        done = 0
+        for unit in units:
+            if pool is None:
+                pending.append(fn(unit))
+            else:
+                pending.append(pool.submit(fn, unit))
+            if len(pending) >= self.max_pending:
+                result = self._take(pending)
+                done += 1
+                self._report(done, total)
+                yield result
+        while pending:
+            result = self._take(pending)
+            done += 1
+            self._report(done, total)
+            yield result
+
+    @staticmethod
+    def _take(pending):
+        head = pending.popleft()
+        return head.result() if hasattr(head, 'result') else head
+
+    def _report(self, done: int, total: int):
+        if self.progress is not None:
+            self.progress(done, total)
+
+
+def _run_sweep_unit(unit):
+    from aeroaqua.pipelines.sweep import run_scenario_sweep
+
+    site, dates, kwargs, with_longitude = unit
+    latitude, longitude, altitude, timezone = site
+    frame = run_scenario_sweep(dates, latitude=latitude, longitude=longitude, altitude=altitude, timezone=timezone, **kwargs)
+    if with_longitude:
+        frame.insert(frame.columns.get_loc('latitude') + 1, 'longitude', float(longitude))
+    return frame
+
+
+def _predict_unit(unit):
+    from aeroaqua.model.feature_plan import predict_matrix
+    from aeroaqua.model.registry import load_model
+
+    model_path, X = unit
+    return predict_matrix(load_model(model_path), X)
+
+
+def iter_parallel_predict(model_path: str, chunks, total: int = None, workers: int = None, max_pending: int = None, progress=None):
+    """Predict with a saved model over an iterable of feature chunks on a process pool.
+
+    Yields one prediction array per chunk, in order. Chunks are produced on
+    demand when `total` (the number of chunks) is given, so at most
+    `max_pending` of them are held in memory.
+    """
+    executor = SweepExecutor(workers=workers, max_pending=max_pending, model_path=model_path, progress=progress)
+    with executor:
+        yield from executor.map(_predict_unit, ((model_path, X) for X in chunks), total=total)
+
+
+def parallel_predict(model_path: str, X, workers: int = None, chunk_rows: int = 100_000, max_pending: int = None, progress=None):
+    """Predict with a saved model over row chunks of `X` on a process pool.
+
+    Every worker loads the model once through the registry; predictions are
+    concatenated in row order. `X` may be a DataFrame or a 2-D array.
+    """
+    import numpy as np
+
+    step = max(1, int(chunk_rows))
+    take = X.iloc if hasattr(X, 'iloc') else X
+    chunks = [take[i:i + step] for i in range(0, len(X), step)]
+    return np.concatenate(list(iter_parallel_predict(model_path, chunks, workers=workers, max_pending=max_pending, progress=progress)))
+
+
+def _solar_table_units(sites, dates, freq: str):
+    """One (site, year, freq) unit per annual solar table the sweep reads."""
+    import pandas as pd
+
+    years = sorted({pd.Timestamp(d).year for d in dates})
+    return [(site, year, freq) for site in sites for year in years]
+
+
+def _warm_solar_table(unit):
+    """Build one annual solar table in the process-wide cache (and its disk tier, when configured)."""
+    from aeroaqua.solar.cache import solar_position_cache
+
+    (latitude, longitude, altitude, timezone), year, freq = unit
+    solar_position_cache.get_days([f'{year}-01-01'], freq, latitude, longitude, altitude, timezone)
+
+
+def iter_parallel_sweep(
+    dates,
+    cloud_types=(0.0,),
+    rh_values=(50.0,),
+    temperatures=(20.0,),
+    sites=None,
+    model_path: str = None,
+    freq: str = '10T',
+    latitude: float = DEFAULT_LATITUDE,
+    longitude: float = DEFAULT_LONGITUDE,
+    altitude: float = DEFAULT_ALTITUDE,
+    timezone: str = DEFAULT_TZ,
+    workers: int = None,
+    dates_per_chunk: int = DEFAULT_DATES_PER_CHUNK,
+    max_pending: int = None,
+    chunk_rows: int = None,
+    water_yield_fn=None,
+    solar_cache_dir: str = None,
+    progress=None,
+):
+    """Run a sweep of sites x dates x scenarios in parallel, yielding DataFrames in order.
+
+    Each yielded frame covers one site and up to `dates_per_chunk` dates and has the
+    columns of `run_scenario_sweep`. `sites` is a list of (latitude, longitude,
+    altitude, timezone) tuples, in which case a `longitude` column follows `latitude`;
+    when omitted the single site given by the location arguments is used.
+    `water_yield_fn` must be picklable (a module-level function).
+
+    With more than one worker the solar tables are warmed once on the pool
+    (see the module docstring); `solar_cache_dir` keeps them for later runs
+    instead of a temporary directory.
+    """
+    import pandas as pd
+    from aeroaqua.model.registry import resolve_model_path
+
+    dates = [pd.Timestamp(d).strftime('%Y-%m-%d') for d in dates]
+    with_longitude = sites is not None
+    sites = [tuple(s) for s in sites] if sites is not None else [(latitude, longitude, altitude, timezone)]
+    kwargs = {
+        'cloud_types': list(cloud_types),
+        'rh_values': list(rh_values),
+        'temperatures': list(temperatures),
+        'model_path': resolve_model_path(model_path) or model_path,
+        'freq': freq,
+    }
+    if chunk_rows is not None:
+        kwargs['chunk_rows'] = chunk_rows
+    if water_yield_fn is not None:
+        kwargs['water_yield_fn'] = water_yield_fn
+
+    step = max(1, int(dates_per_chunk))
+    units = [(site, dates[i:i + step], kwargs, with_longitude) for site in sites for i in range(0, len(dates), step)]
+
+    with contextlib.ExitStack() as stack:
+        executor = SweepExecutor(workers=workers, max_pending=max_pending, model_path=kwargs['model_path'], progress=progress)
+        if executor.workers > 1 and not solar_cache_dir:
+            from aeroaqua.solar.cache import solar_position_cache
+            solar_cache_dir = solar_position_cache.disk_dir or stack.enter_context(tempfile.TemporaryDirectory(prefix='aeroaqua-solar-'))
+        executor.solar_cache_dir = solar_cache_dir
+        stack.enter_context(executor)
+        pool = executor._ensure_pool()
+        if pool is not None:
+            # one vectorized SPA pass per (site, year), spread over the pool, beats a cold SPA
+            # call per work unit; units start once every table is on disk
+            for _ in pool.map(_warm_solar_table, _solar_table_units(sites, dates, freq)):
+                pass
+        yield from executor.map(_run_sweep_unit, units)
+
+
+def run_parallel_sweep(*args, **kwargs):
+    """Collect `iter_parallel_sweep` into one DataFrame (same arguments)."""
+    import pandas as pd
+
+    return pd.concat(list(iter_parallel_sweep(*args, **kwargs)), ignore_index=True)
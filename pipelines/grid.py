@@ -0,0 +1,189 @@
+"""N-dimensional evaluation grids.
+
+A `Grid` is an ordered set of named axes, and its points are the Cartesian
+product of the axis values in C order (the first axis varies slowest)::
+
+    grid = Grid({'Season': ['Summer', 'Winter'], 'Solar_Energy_kwh_m2': parse_axis('1:7:0.25'),
+                 'RH_Percent': parse_axis('50:75:1'), 'site': {'latitude': lats, 'longitude': lons}})
+
+An axis is a 1-D sequence (numbers or strings) or a mapping of column name to
+equal-length sequences. The columns of a mapping axis vary together, which
+describes e.g. sites given as latitude/longitude pairs.
+
+`Grid.chunks` walks the grid lazily in blocks of at most `chunk_rows` points.
+A block fixes the leading axes, takes a run of values of one split axis and
+every value of the trailing axes. A `GridChunk` exposes its coordinates as
+sparse, broadcastable arrays (`coords`, like ``np.meshgrid(..., sparse=True)``),
+so vectorized models evaluate the whole block without materializing it. It also
+exposes them as dense flat columns (`columns`) for feature matrices and result
+sinks. Memory is bounded by the chunk size, whatever the grid size.
+"""
+import numpy as np
+
+
+DEFAULT_GRID_CHUNK_ROWS = 1_000_000
+
+
+def parse_axis(text: str) -> np.ndarray:
+    """'start:stop:step' (inclusive) or a comma-separated list of numbers or strings."""
+    if text.count(':') == 2:
+        start, stop, step = (float(v) for v in text.split(':'))
+        if step <= 0:
+            raise ValueError(f'axis step must be positive: {text!r}')
+        return np.round(np.arange(start, stop + step / 2, step), 10)
+    items = [v.strip() for v in text.split(',') if v.strip()]
+    try:
+        return np.array([float(v) for v in items])
+    except ValueError:
+        return np.array(items, dtype=object)
+
+
+def _axis_columns(name: str, values) -> dict:
+    if hasattr(values, 'items') and not hasattr(values, 'dtype'):
+        columns = {str(c): np.asarray(v) for c, v in values.items()}
+    else:
+        columns = {name: np.asarray(values)}
+    lengths = {len(v) if v.ndim == 1 else -1 for v in columns.values()}
+    if len(lengths) != 1 or -1 in lengths:
+        raise ValueError(f'axis {name!r} must hold 1-D values of one length')
+    if not lengths.pop():
+        raise ValueError(f'axis {name!r} is empty')
+    for column, v in columns.items():
+        if v.dtype.kind in 'US':
+            columns[column] = v.astype(object)
+    return columns
+
+
+class GridChunk:
+    """A block of grid points.
+
+    Attributes:
+        shape: block shape (one entry per grid axis; leading axes have length 1).
+        size: number of points.
+        coords: column name -> coordinate array broadcastable to `shape`.
+    """
+
+    def __init__(self, shape: tuple, coords: dict):
+        self.shape = shape
+        self.size = int(np.prod(shape))
+        self.coords = coords
+        self._columns = None
+
+    def __len__(self):
+        return self.size
+
+    def expand(self, values) -> np.ndarray:
+        """Broadcast block-shaped values (e.g. a model evaluated on `coords`) to a flat C-order column."""
+        values = np.asarray(values)
+        if values.size == self.size:
+            return values.reshape(-1)
+        return np.broadcast_to(values, self.shape).reshape(-1)
+
+    def columns(self) -> dict:
+        """Dense flat columns of the block (computed once per chunk)."""
+        if self._columns is None:
+            self._columns = {name: self.expand(values) for name, values in self.coords.items()}
+        return self._columns
+
+
+class Grid:
+    """Cartesian product of named axes, evaluated chunk by chunk.
+
+    Args:
+        axes: ordered mapping of axis name -> values (a 1-D sequence or a mapping
+            of column name -> equal-length 1-D sequences).
+    """
+
+    def __init__(self, axes):
+        self.axes = {str(name): _axis_columns(str(name), values) for name, values in axes.items()}
+        if not self.axes:
+            raise ValueError('a grid needs at least one axis')
+        self.names = list(self.axes)
+        self.shape = tuple(len(next(iter(cols.values()))) for cols in self.axes.values())
+        self.size = int(np.prod(self.shape))
+        self.columns = [column for cols in self.axes.values() for column in cols]
+        if len(set(self.columns)) != len(self.columns):
+            raise ValueError(f'grid columns must be unique: {self.columns}')
+
+    def __len__(self):
+        return self.size
+
+    def schema(self) -> dict:
+        """Column -> dtype, or the axis values for string columns (see `aeroaqua.model.feature_plan`)."""
+        schema = {}
+        for cols in self.axes.values():
+            for column, values in cols.items():
+                schema[column] = values.tolist() if values.dtype == object else values.dtype
+        return schema
+
+    def _split(self, chunk_rows: int):
+        """Split axis k and the run length along it so a block holds at most `chunk_rows` points."""
+        chunk_rows = max(1, int(chunk_rows))
+        inner = 1
+        k = len(self.shape) - 1
+        while k > 0 and inner * self.shape[k] <= chunk_rows:
+            inner *= self.shape[k]
+            k -= 1
+        return k, max(1, min(self.shape[k], chunk_rows // inner))
+
+    def chunk_count(self, chunk_rows: int = DEFAULT_GRID_CHUNK_ROWS) -> int:
+        k, run = self._split(chunk_rows)
+        return int(np.prod(self.shape[:k])) * -(-self.shape[k] // run)
+
+    def chunks(self, chunk_rows: int = DEFAULT_GRID_CHUNK_ROWS):
+        """Yield `GridChunk` blocks of at most `chunk_rows` points, in C order."""
+        k, run = self._split(chunk_rows)
+        ndim = len(self.shape)
+        trailing = {}
+        for axis in range(k + 1, ndim):
+            view = [1] * ndim
+            view[axis] = self.shape[axis]
+            for column, values in self.axes[self.names[axis]].items():
+                trailing[column] = values.reshape(view)
+        split = self.axes[self.names[k]]
+        for lead in np.ndindex(*self.shape[:k]):
+            fixed = {}
+            for axis, i in enumerate(lead):
+                for column, values in self.axes[self.names[axis]].items():
+                    fixed[column] = values[i:i + 1].reshape((1,) * ndim)
+            for start in range(0, self.shape[k], run):
+                stop = min(start + run, self.shape[k])
+                view = [1] * ndim
+                view[k] = stop - start
+                coords = dict(fixed)
+                for column, values in split.items():
+                    coords[column] = values[start:stop].reshape(view)
+                coords.update(trailing)
+                shape = (1,) * k + (stop - start,) + self.shape[k + 1:]
+                yield GridChunk(shape, {column: coords[column] for column in self.columns})
+
+
+def baseline_predictor(solar_column: str = 'solar_energy_kwh_m2', rh_column: str = 'rh_percent'):
+    """Chunk -> liters/day with the baseline linear model, evaluated on the sparse coordinates."""
+    from aeroaqua.model.baselinesorption import predict_water_yield_array
+
+    def predict(chunk: GridChunk):
+        return predict_water_yield_array(chunk.coords[solar_column], chunk.coords[rh_column])
+    return predict
+
+
+def model_predictor(model, features):
+    """Chunk -> ``model.predict(features(chunk.columns()))`` for a fitted (e.g. joblib) model."""
+    def predict(chunk: GridChunk):
+        return model.predict(features(chunk.columns()))
+    return predict
+
+
+def evaluate_grid(grid: Grid, predict, chunk_rows: int = DEFAULT_GRID_CHUNK_ROWS, output_column: str = 'prediction', progress=None):
+    """Evaluate `predict(chunk)` block by block, yielding the dense columns of every chunk plus `output_column`.
+
+    `predict` returns values for the chunk's points: flat, block-shaped or
+    broadcastable to the block. `progress` is an optional callable(chunks_done, chunks_total).
+    """
+    total = grid.chunk_count(chunk_rows) if progress is not None else None
+    for done, chunk in enumerate(grid.chunks(chunk_rows), 1):
+        columns = dict(chunk.columns())
+        columns[output_column] = chunk.expand(predict(chunk))
+        yield columns
+        if progress is not None:
+            progress(done, total)
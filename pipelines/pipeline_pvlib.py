@@ -1,8 +1,12 @@
-from aeroaqua.solar import get_solar_positions_for_date, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
+from aeroaqua.solar import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
 from aeroaqua.energy import compute_daily_energy_from_location_date
 from aeroaqua.model import predict_water_yield
+from aeroaqua.instrumentation import instrumented, span
+from aeroaqua.pipelines.result_cache import cached_result
 
 
+@instrumented('pipeline.pvlib')
+@cached_result('pipeline.pvlib')
 def run_pipeline_pvlib(
     date_str: str = '2025-11-04',
     rh_percent: float = 50.0,
@@ -11,22 +15,28 @@ def run_pipeline_pvlib(
     longitude: float = DEFAULT_LONGITUDE,
     altitude: float = DEFAULT_ALTITUDE,
     timezone: str = DEFAULT_TZ,
+    method: str = 'rectangle',
+    tol_kwh: float = 0.005,
 ):
     """Run the pvlib-based pipeline.
 
     Steps:
-    1. Compute solar position (for traceability).
-    2. Use pvlib clearsky GHI to compute daily solar energy (kWh/m^2).
-    3. Predict water yield via baseline regression using RH and computed solar energy.
+    1. Use pvlib clearsky GHI to compute daily solar energy (kWh/m^2); the solar
+       position table it needs comes from the shared `aeroaqua.solar` cache. `method` / `tol_kwh` select the
+       integration scheme (see `aeroaqua.energy.integration`).
+    2. Predict water yield via baseline regression using RH and computed solar energy.
+
+    Results are served from the result cache when one is configured (see
+    `aeroaqua.pipelines.result_cache`).
 
     Returns a dict with keys: date, solar_energy_kwh_m2, rh_percent, predicted_lpd
     """
-    solpos = get_solar_positions_for_date(date_str=date_str, freq=freq, latitude=latitude, longitude=longitude, altitude=altitude, timezone=timezone)
-
-    energy_df = compute_daily_energy_from_location_date(latitude, longitude, altitude, timezone, date_str, freq=freq)
+    with span('pvlib.daily_energy', rows=1):
+        energy_df = compute_daily_energy_from_location_date(latitude, longitude, altitude, timezone, date_str, freq=freq, method=method, tol_kwh=tol_kwh)
     solar_energy = float(energy_df.iloc[0]['solar_energy_kwh_m2'])
 
-    predicted = predict_water_yield(solar_energy, rh_percent)
+    with span('pvlib.water_yield', rows=1):
+        predicted = predict_water_yield(solar_energy, rh_percent)
 
     return {
         'date': energy_df.iloc[0]['date'],
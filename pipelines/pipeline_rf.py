@@ -1,27 +1,241 @@
+import datetime
 import os
-import joblib
-import pandas as pd
-from aeroaqua.solar import get_solar_positions_for_date, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
-from aeroaqua.model import predict_water_yield
+import threading
+import warnings
 
+import numpy as np
+from aeroaqua.solar import get_solar_positions_for_date, get_solar_positions_for_dates, multisite_positions_for_date, multisite_solar_positions, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
+from aeroaqua.model import predict_water_yield, predict_water_yield_array
+from aeroaqua.model.registry import MODEL_FALLBACK_PATHS, resolve_model_path, load_model
+from aeroaqua.instrumentation import instrumented, span
+from aeroaqua.pipelines.result_cache import active_result_cache, cached_result
 
-MODEL_FALLBACK_PATHS = [
-    os.path.join(os.path.dirname(__file__), '..', 'model', 'solar_predictor_model.joblib'),
-    os.path.join(os.getcwd(), 'solarenergy', 'solar_predictor_model.joblib'),
-    os.path.join(os.getcwd(), 'model', 'solar_predictor_model.joblib')
-]
+INPUT_FEATURES = ['Cloud Type', 'Solar Zenith Angle', 'Relative Humidity', 'Temperature', 'Month', 'Day', 'Hour']
+
+# Samples with an apparent zenith at or above this angle are night: GHI is exactly zero.
+NIGHT_ZENITH = 90.0
+
+# How feature rows are assembled: 'array' fills a reusable float32 matrix in
+# INPUT_FEATURES order; 'frame' builds pandas DataFrames (slower, for debugging).
+FEATURE_PATHS = ('array', 'frame')
+FEATURE_PATH_ENV = 'AEROAQUA_RF_FEATURES'
+
+_feature_path = os.environ.get(FEATURE_PATH_ENV) or 'array'
+_buffers = threading.local()
 
 
 def _find_model(path_hint: str = None):
-    if path_hint and os.path.exists(path_hint):
-        return path_hint
-    for p in MODEL_FALLBACK_PATHS:
-        candidate = os.path.normpath(p)
-        if os.path.exists(candidate):
-            return candidate
-    return None
+    return resolve_model_path(path_hint)
+
+
+def _load_model(model_path: str = None):
+    # served from the process-wide registry: loaded once, reloaded only when the file changes
+    return load_model(model_path)
+
+
+def _zenith_column(solpos):
+    if 'apparent_zenith' in solpos.columns:
+        return solpos['apparent_zenith']
+    if 'zenith' in solpos.columns:
+        return solpos['zenith']
+    raise RuntimeError('Solar position table does not contain zenith columns')
+
+
+def _build_features(times, zenith, cloud_type, rh_percent, temperature_c):
+    """Assemble the RF feature frame; weather inputs are scalars or per-sample arrays.
+
+    Used by the 'frame' feature path (see `set_feature_path`); the default path
+    builds the same rows with `build_feature_matrix`.
+    """
+    import pandas as pd
+
+    df_feat = pd.DataFrame(index=times)
+    df_feat['Solar Zenith Angle'] = zenith
+    df_feat['Cloud Type'] = cloud_type
+    df_feat['Relative Humidity'] = rh_percent
+    df_feat['Temperature'] = temperature_c
+    df_feat['Month'] = df_feat.index.month
+    df_feat['Day'] = df_feat.index.day
+    df_feat['Hour'] = df_feat.index.hour
+    return df_feat[INPUT_FEATURES]
+
+
+def set_feature_path(path: str):
+    """Select the feature assembly used by the RF pipelines: 'array' (default) or 'frame'."""
+    global _feature_path
+    if path not in FEATURE_PATHS:
+        raise ValueError(f'feature path must be one of {FEATURE_PATHS}, got {path!r}')
+    _feature_path = path
+
+
+class FeatureBuffer:
+    """Reusable C-contiguous float32 matrix with one column per INPUT_FEATURES entry.
+
+    `rows(n)` returns a view of the first n rows; the storage grows geometrically
+    and is reused, so the view is only valid until the next `rows` call.
+    """
+
+    def __init__(self, capacity: int = 0):
+        self._data = np.empty((capacity, len(INPUT_FEATURES)), dtype=np.float32)
+
+    def rows(self, n: int) -> np.ndarray:
+        if n > len(self._data):
+            self._data = np.empty((max(n, 2 * len(self._data)), len(INPUT_FEATURES)), dtype=np.float32)
+        return self._data[:n]
+
+
+def feature_buffer() -> FeatureBuffer:
+    """The calling thread's FeatureBuffer."""
+    buf = getattr(_buffers, 'features', None)
+    if buf is None:
+        buf = _buffers.features = FeatureBuffer()
+    return buf
+
+
+def calendar_fields(times):
+    """(month, day, hour) integer arrays of the local wall-clock time of a DatetimeIndex."""
+    local = times.tz_localize(None) if times.tz is not None else times
+    stamps = local.asi8.view('M8[ns]')
+    days = stamps.astype('M8[D]')
+    months = days.astype('M8[M]')
+    return (
+        (months - days.astype('M8[Y]')).astype(np.int64) + 1,
+        (days - months).astype(np.int64) + 1,
+        (stamps - days) // np.timedelta64(1, 'h'),
+    )
+
+
+def fill_features(out, cloud_type, zenith, rh_percent, temperature_c, month, day, hour):
+    """Write feature columns (scalars or per-row arrays) into `out` in INPUT_FEATURES order."""
+    for i, column in enumerate((cloud_type, zenith, rh_percent, temperature_c, month, day, hour)):
+        out[:, i] = column
+    return out
+
+
+def build_feature_matrix(times, zenith, cloud_type, rh_percent, temperature_c, out=None):
+    """Float32 counterpart of `_build_features`: same rows and column order, no pandas objects.
+
+    Fills `out` (default: the calling thread's FeatureBuffer) and returns it.
+    """
+    if out is None:
+        out = feature_buffer().rows(len(times))
+    return fill_features(out, cloud_type, zenith, rh_percent, temperature_c, *calendar_fields(times))
+
+
+def _features(times, zenith, cloud_type, rh_percent, temperature_c):
+    if _feature_path == 'frame':
+        return _build_features(times, zenith, cloud_type, rh_percent, temperature_c)
+    return build_feature_matrix(times, zenith, cloud_type, rh_percent, temperature_c)
+
+
+def _as_model_input(X):
+    """Wrap a feature matrix in a DataFrame when the 'frame' path is selected."""
+    if _feature_path == 'frame':
+        import pandas as pd
+        return pd.DataFrame(X, columns=INPUT_FEATURES)
+    return X
+
+
+def predict_features(model, X):
+    """`model.predict` for a feature DataFrame or a matrix in INPUT_FEATURES column order.
+
+    Forests fitted on named columns accept the matrix once its order is checked
+    against their `feature_names_in_`; sklearn casts inputs to float32 either way,
+    so both inputs give identical predictions.
+    """
+    if not isinstance(X, np.ndarray):
+        return model.predict(X)
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None:
+        return model.predict(X)
+    if list(names) != INPUT_FEATURES:
+        raise ValueError(f'Model features {list(names)} do not match the feature matrix columns {INPUT_FEATURES}')
+    with warnings.catch_warnings():
+        warnings.filterwarnings('ignore', message='X does not have valid feature names')
+        return model.predict(X)
+
+
+def daylight_mask(zenith):
+    """True for samples with the sun above the horizon (apparent zenith < NIGHT_ZENITH)."""
+    return np.asarray(zenith) < NIGHT_ZENITH
+
+
+def daylight_ghi(model, X_day, day_mask):
+    """Predict GHI (W/m^2) for the daylight rows only and expand to the full sample grid.
+
+    `X_day` holds the feature rows of the samples where `day_mask` is True, in order
+    (a DataFrame or a matrix in INPUT_FEATURES order, see `predict_features`).
+    Night samples are exactly zero and negative predictions are clipped to zero; the
+    model is not called at all when no sample is in daylight.
+    """
+    day_mask = np.asarray(day_mask, dtype=bool)
+    ghi = np.zeros(day_mask.shape)
+    if day_mask.any():
+        with span('rf.predict') as sp:
+            pred = np.asarray(predict_features(model, X_day), dtype=float)
+            sp.set_rows(len(pred))
+        pred[pred < 0] = 0
+        ghi[day_mask] = pred
+    return ghi
+
+
+def _integrate_daily_kwh(ghi, times, day_starts, freq: str):
+    """Integrate GHI samples (W/m^2) into kWh/m^2 for each day segment.
+
+    `day_starts` holds the position of the first sample of every day in `times`.
+    Each sample is weighted by the gap to the previous sample of the same day; the
+    first sample of a day is weighted by `freq`.
+    """
+    import pandas as pd
+
+    dt = np.empty(len(times), dtype=float)
+    dt[1:] = np.diff(times.asi8) / 1e9 / 3600
+    dt[day_starts] = pd.Timedelta(freq).total_seconds() / 3600
+    wh_per_sample = np.asarray(ghi, dtype=float) * dt
+
+    bounds = list(day_starts) + [len(times)]
+    return np.array([wh_per_sample[bounds[i]:bounds[i + 1]].sum() / 1000.0 for i in range(len(day_starts))])
+
+
+def rf_ghi_function(model, cloud_type: float, rh_percent: float, temperature_c: float, latitude: float, longitude: float, altitude: float):
+    """Vectorized callable(times) -> RF-predicted GHI (W/m^2) at one site, for `aeroaqua.energy.integration`."""
+
+    def ghi(times):
+        zenith = multisite_solar_positions(times, latitude, longitude, altitude)['apparent_zenith'][0]
+        day = daylight_mask(zenith)
+        X = _features(times[day], zenith[day], float(cloud_type), float(rh_percent), float(temperature_c))
+        return daylight_ghi(model, X, day)
+
+    return ghi
 
 
+def _per_day_values(value, n_days: int, name: str, unit: str = 'date'):
+    arr = np.asarray(value, dtype=float)
+    if arr.ndim == 0:
+        return np.full(n_days, float(arr))
+    if arr.shape != (n_days,):
+        raise ValueError(f'{name} must be a scalar or have one value per {unit} ({n_days}), got shape {arr.shape}')
+    return arr
+
+
+def _sample_values(value, times, freq: str, name: str, how: str = 'mean'):
+    """A weather input as a float scalar or one value per sample of `times`.
+
+    Time-indexed pandas Series are aligned onto `times` (see `aeroaqua.pipelines.weather`).
+    """
+    if hasattr(value, 'index') and hasattr(value.index, 'asi8'):
+        from aeroaqua.pipelines.weather import align_series
+        return align_series(value, times, freq, how=how, name=name)
+    arr = np.asarray(value, dtype=float)
+    if arr.ndim == 0:
+        return float(arr)
+    if arr.shape != (len(times),):
+        raise ValueError(f'{name} must be a scalar, a time-indexed Series or have one value per sample ({len(times)}), got shape {arr.shape}')
+    return arr
+
+
+@instrumented('pipeline.rf')
+@cached_result('pipeline.rf', model_arg='model_path')
 def run_pipeline_rf(
     date_str: str = '2025-11-04',
     cloud_type: float = 0.0,
@@ -33,54 +247,71 @@ def run_pipeline_rf(
     longitude: float = DEFAULT_LONGITUDE,
     altitude: float = DEFAULT_ALTITUDE,
     timezone: str = DEFAULT_TZ,
+    method: str = 'rectangle',
+    tol_kwh: float = 0.005,
 ):
     """Run the RF-based pipeline.
 
     Steps:
     1. Compute solar positions for the date to get Solar Zenith Angle and timestamps.
-    2. Assemble feature dataframe expected by the RF model using provided scalars (cloud_type, RH, temperature)
-       which are broadcast to every time sample.
-    3. Load the trained RandomForest model and predict GHI (W/m^2) per sample.
-    4. Integrate predicted GHI over the day to get daily solar energy (kWh/m^2).
-    5. Feed daily solar energy and RH into baselinesorption.predict_water_yield to get liters/day.
+    2. Assemble the features expected by the RF model for every daylight sample (apparent zenith < 90 degrees).
+       cloud_type, rh_percent and temperature_c are scalars broadcast to every sample, arrays with one value
+       per sample of the day's `freq` grid, or time-indexed pandas Series at any resolution that are aligned
+       onto the grid (see `aeroaqua.pipelines.weather`; cloud type takes the nearest observation).
+    3. Fetch the trained RandomForest model from the process-wide registry and predict GHI (W/m^2) for the
+       daylight samples; night samples contribute zero and negative predictions are clipped to zero.
+    4. Integrate predicted GHI over the day to get daily solar energy (kWh/m^2). The default is a rectangle
+       sum at `freq`; `method` may also be 'trapezoid', 'simpson' or 'adaptive' (error target `tol_kwh`),
+       in which case the model is evaluated at the timestamps the scheme asks for
+       (see `aeroaqua.energy.integration`).
+    5. Feed daily solar energy and RH (the daily mean for per-sample RH) into
+       baselinesorption.predict_water_yield to get liters/day.
+
+    With a result cache configured (`aeroaqua.pipelines.result_cache`), calls with
+    scalar weather inputs are answered from it, keyed on the inputs and the model's sha256.
 
     Returns a dict with keys: date, solar_energy_kwh_m2, rh_percent, predicted_lpd
     """
-    solpos = get_solar_positions_for_date(date_str=date_str, freq=freq, latitude=latitude, longitude=longitude, altitude=altitude, timezone=timezone)
-    times = solpos.index
+    import pandas as pd
 
-    df_feat = pd.DataFrame(index=times)
-    if 'apparent_zenith' in solpos.columns:
-        df_feat['Solar Zenith Angle'] = solpos['apparent_zenith']
-    elif 'zenith' in solpos.columns:
-        df_feat['Solar Zenith Angle'] = solpos['zenith']
-    else:
-        raise RuntimeError('Solar position table does not contain zenith columns')
-
-    df_feat['Cloud Type'] = float(cloud_type)
-    df_feat['Relative Humidity'] = float(rh_percent)
-    df_feat['Temperature'] = float(temperature_c)
-    df_feat['Month'] = df_feat.index.month
-    df_feat['Day'] = df_feat.index.day
-    df_feat['Hour'] = df_feat.index.hour
+    if method != 'rectangle':
+        from aeroaqua.energy.integration import integrate_day
 
-    found = _find_model(model_path)
-    if not found:
-        raise FileNotFoundError('RandomForest model not found. Please run model/train_rf_model.py to create solar_predictor_model.joblib and pass its path via model_path.')
+        if any(np.ndim(v) or hasattr(v, 'index') for v in (cloud_type, rh_percent, temperature_c)):
+            raise ValueError("Per-sample weather inputs need method='rectangle'")
+        ghi_fn = rf_ghi_function(_load_model(model_path), cloud_type, rh_percent, temperature_c, latitude, longitude, altitude)
+        total_kwh = integrate_day(ghi_fn, date_str, timezone, method=method, freq=freq, tol_kwh=tol_kwh)['solar_energy_kwh_m2']
+        return {
+            'date': pd.to_datetime(date_str).date(),
+            'solar_energy_kwh_m2': float(total_kwh),
+            'rh_percent': float(rh_percent),
+            'predicted_liters_per_day': float(predict_water_yield(total_kwh, rh_percent)),
+        }
 
-    model = joblib.load(found)
+    with span('rf.solar_positions') as sp:
+        solpos = get_solar_positions_for_date(date_str=date_str, freq=freq, latitude=latitude, longitude=longitude, altitude=altitude, timezone=timezone)
+        sp.set_rows(len(solpos))
+    times = solpos.index
+    zenith = _zenith_column(solpos).values
+    day = daylight_mask(zenith)
+    cloud_type = _sample_values(cloud_type, times, freq, 'cloud_type', how='nearest')
+    rh_percent = _sample_values(rh_percent, times, freq, 'rh_percent')
+    temperature_c = _sample_values(temperature_c, times, freq, 'temperature_c')
 
-    input_features = ['Cloud Type', 'Solar Zenith Angle', 'Relative Humidity', 'Temperature', 'Month', 'Day', 'Hour']
-    X = df_feat[input_features]
+    with span('rf.features') as sp:
+        X = _features(times[day], zenith[day], *(v[day] if np.ndim(v) else v for v in (cloud_type, rh_percent, temperature_c)))
+        sp.set_rows(len(X))
+    rh_percent = float(np.mean(rh_percent))
 
-    ghi_pred = model.predict(X)
-    ghi_series = pd.Series(ghi_pred, index=times)
+    with span('rf.model_load'):
+        model = _load_model(model_path)
 
-    dt = times.to_series().diff().dt.total_seconds().div(3600).fillna(pd.Timedelta(freq).total_seconds() / 3600)
-    wh_per_sample = ghi_series * dt.values
-    total_kwh = wh_per_sample.sum() / 1000.0
+    ghi_pred = daylight_ghi(model, X, day)
+    with span('rf.integrate', rows=len(times)):
+        total_kwh = _integrate_daily_kwh(ghi_pred, times, [0], freq)[0]
 
-    predicted = predict_water_yield(total_kwh, rh_percent)
+    with span('rf.water_yield', rows=1):
+        predicted = predict_water_yield(total_kwh, rh_percent)
 
     return {
         'date': pd.to_datetime(date_str).date(),
@@ -90,6 +321,212 @@ def run_pipeline_rf(
     }
 
 
+@instrumented('pipeline.rf_range')
+def run_pipeline_rf_range(
+    start_date: str = None,
+    end_date: str = None,
+    dates=None,
+    cloud_type=0.0,
+    rh_percent=50.0,
+    temperature_c=20.0,
+    model_path: str = None,
+    freq: str = '10T',
+    latitude: float = DEFAULT_LATITUDE,
+    longitude: float = DEFAULT_LONGITUDE,
+    altitude: float = DEFAULT_ALTITUDE,
+    timezone: str = DEFAULT_TZ,
+):
+    """Run the RF-based pipeline for many dates in a single batch.
+
+    The dates are either the inclusive range `start_date`..`end_date` or an explicit
+    list passed as `dates`. `cloud_type`, `rh_percent` and `temperature_c` are scalars
+    or sequences with one value per date.
+
+    Solar positions are computed once for the stacked time index of all dates, the
+    model is loaded once and `predict` runs once over the stacked daylight samples.
+    Each day is then integrated separately, so every row matches what
+    `run_pipeline_rf` returns for that date and those inputs. With a result cache
+    configured the rows share `run_pipeline_rf`'s cache entries: all keys are looked
+    up in one batch and only the missing days are computed.
+
+    Returns a pandas.DataFrame with columns: date, cloud_type, rh_percent, temperature_c,
+    solar_energy_kwh_m2, predicted_liters_per_day (one row per date, in input order).
+    """
+    import pandas as pd
+
+    if dates is None:
+        if start_date is None or end_date is None:
+            raise ValueError('Pass either dates or both start_date and end_date')
+        dates = pd.date_range(start=start_date, end=end_date, freq='D')
+    date_strs = [pd.Timestamp(d).strftime('%Y-%m-%d') for d in dates]
+    n_days = len(date_strs)
+
+    clouds = _per_day_values(cloud_type, n_days, 'cloud_type')
+    rhs = _per_day_values(rh_percent, n_days, 'rh_percent')
+    temps = _per_day_values(temperature_c, n_days, 'temperature_c')
+    site = (freq, latitude, longitude, altitude, timezone)
+
+    cache = active_result_cache()
+    if cache is None:
+        return _rf_range_frame(date_strs, clouds, rhs, temps, model_path, *site)
+    return _cached_rf_range(cache, date_strs, clouds, rhs, temps, model_path, *site)
+
+
+def _cached_rf_range(cache, date_strs, clouds, rhs, temps, model_path, *site):
+    """Range rows from the result cache under `run_pipeline_rf`'s keys; the missing days run as one batch."""
+    import pandas as pd
+
+    keys = [run_pipeline_rf.cache_key(d, c, r, t, model_path, *site) for d, c, r, t in zip(date_strs, clouds, rhs, temps)]
+    if None in keys:
+        return _rf_range_frame(date_strs, clouds, rhs, temps, model_path, *site)
+    if len(set(date_strs)) != len(date_strs):
+        raise ValueError('dates must be distinct and every date must produce at least one sample')
+    found = cache.get_many(keys)
+    missing = [i for i, key in enumerate(keys) if key not in found]
+    if missing:
+        computed = _rf_range_frame([date_strs[i] for i in missing], clouds[missing], rhs[missing], temps[missing], model_path, *site)
+        results = {
+            keys[i]: {
+                'date': row.date,
+                'solar_energy_kwh_m2': float(row.solar_energy_kwh_m2),
+                'rh_percent': float(row.rh_percent),
+                'predicted_liters_per_day': float(row.predicted_liters_per_day),
+            }
+            for i, row in zip(missing, computed.itertuples(index=False))
+        }
+        cache.put_many(results)
+        found.update(results)
+    rows = [found[key] for key in keys]
+
+    return pd.DataFrame({
+        'date': [row['date'] for row in rows],
+        'cloud_type': clouds,
+        'rh_percent': rhs,
+        'temperature_c': temps,
+        'solar_energy_kwh_m2': np.array([row['solar_energy_kwh_m2'] for row in rows]),
+        'predicted_liters_per_day': np.array([row['predicted_liters_per_day'] for row in rows]),
+    })
+
+
+def _rf_range_frame(date_strs, clouds, rhs, temps, model_path, freq, latitude, longitude, altitude, timezone):
+    import pandas as pd
+
+    n_days = len(date_strs)
+    with span('rf.solar_positions') as sp:
+        solpos = get_solar_positions_for_dates(date_strs, freq=freq, latitude=latitude, longitude=longitude, altitude=altitude, timezone=timezone)
+        sp.set_rows(len(solpos))
+    times = solpos.index
+
+    # Timestamps are grouped by day in input order, so the local calendar day changes
+    # exactly at each day boundary.
+    local_days = times.normalize().asi8
+    day_starts = np.flatnonzero(np.r_[True, local_days[1:] != local_days[:-1]])
+    if len(day_starts) != n_days:
+        raise ValueError('dates must be distinct and every date must produce at least one sample')
+    samples_per_day = np.diff(np.r_[day_starts, len(times)])
+    zenith = _zenith_column(solpos).values
+    day = daylight_mask(zenith)
+
+    with span('rf.features') as sp:
+        X = _features(
+            times[day],
+            zenith[day],
+            np.repeat(clouds, samples_per_day)[day],
+            np.repeat(rhs, samples_per_day)[day],
+            np.repeat(temps, samples_per_day)[day],
+        )
+        sp.set_rows(len(X))
+    with span('rf.model_load'):
+        model = _load_model(model_path)
+
+    ghi_pred = daylight_ghi(model, X, day)
+    with span('rf.integrate', rows=len(times)):
+        daily_kwh = _integrate_daily_kwh(ghi_pred, times, day_starts, freq)
+
+    with span('rf.water_yield', rows=n_days):
+        predicted = predict_water_yield_array(daily_kwh, rhs)
+
+    return pd.DataFrame({
+        'date': [datetime.date.fromisoformat(d) for d in date_strs],
+        'cloud_type': clouds,
+        'rh_percent': rhs,
+        'temperature_c': temps,
+        'solar_energy_kwh_m2': daily_kwh,
+        'predicted_liters_per_day': predicted,
+    })
+
+
+@instrumented('pipeline.rf_sites')
+def run_pipeline_rf_sites(
+    date_str: str,
+    latitudes,
+    longitudes,
+    altitudes=DEFAULT_ALTITUDE,
+    cloud_type=0.0,
+    rh_percent=50.0,
+    temperature_c=20.0,
+    model_path: str = None,
+    freq: str = '10T',
+    timezone: str = DEFAULT_TZ,
+):
+    """Run the RF-based pipeline for one date at many sites in a single batch.
+
+    All sites share the local time grid of `timezone` (so Month/Day/Hour features are
+    common); their zenith angles come from one vectorized pass of
+    `aeroaqua.solar.multisite_positions_for_date` and `predict` runs once over the
+    daylight samples of all sites. `cloud_type`, `rh_percent` and
+    `temperature_c` are scalars or one value per site. Each row matches
+    `run_pipeline_rf` for that site.
+
+    Returns a pandas.DataFrame with columns: date, latitude, longitude, altitude, cloud_type,
+    rh_percent, temperature_c, solar_energy_kwh_m2, predicted_liters_per_day (one row per site).
+    """
+    import pandas as pd
+
+    with span('rf.solar_positions') as sp:
+        times, positions = multisite_positions_for_date(date_str, latitudes, longitudes, altitudes, freq=freq, timezone=timezone)
+        zenith = positions['apparent_zenith']
+        sp.set_rows(zenith.size)
+    n_sites, n_times = zenith.shape
+
+    clouds = _per_day_values(cloud_type, n_sites, 'cloud_type', 'site')
+    rhs = _per_day_values(rh_percent, n_sites, 'rh_percent', 'site')
+    temps = _per_day_values(temperature_c, n_sites, 'temperature_c', 'site')
+
+    day = daylight_mask(zenith).ravel()
+    with span('rf.features') as sp:
+        month, day_of_month, hour = (np.tile(field, n_sites)[day] for field in calendar_fields(times))
+        X = fill_features(
+            feature_buffer().rows(int(day.sum())),
+            np.repeat(clouds, n_times)[day],
+            zenith.ravel()[day],
+            np.repeat(rhs, n_times)[day],
+            np.repeat(temps, n_times)[day],
+            month, day_of_month, hour,
+        )
+        X = _as_model_input(X)
+        sp.set_rows(len(X))
+    with span('rf.model_load'):
+        model = _load_model(model_path)
+
+    ghi_pred = daylight_ghi(model, X, day).reshape(n_sites, n_times)
+    with span('rf.integrate', rows=ghi_pred.size):
+        daily_kwh = np.array([_integrate_daily_kwh(row, times, [0], freq)[0] for row in ghi_pred])
+
+    lat, lon, alt = np.broadcast_arrays(*(np.atleast_1d(np.asarray(a, dtype=float)) for a in (latitudes, longitudes, altitudes)))
+    return pd.DataFrame({
+        'date': pd.to_datetime(date_str).date(),
+        'latitude': lat,
+        'longitude': lon,
+        'altitude': alt,
+        'cloud_type': clouds,
+        'rh_percent': rhs,
+        'temperature_c': temps,
+        'solar_energy_kwh_m2': daily_kwh,
+        'predicted_liters_per_day': predict_water_yield_array(daily_kwh, rhs),
+    })
+
+
 if __name__ == '__main__':
     try:
         out = run_pipeline_rf(date_str='2025-11-04', cloud_type=0.0, rh_percent=50.0, temperature_c=20.0)
@@ -0,0 +1,451 @@
+"""Persistent, content-addressed cache of pipeline results.
+
+A result is stored under the sha256 of a canonical document holding the
+pipeline name, every input argument (defaults applied, numbers as floats, dates
+in ISO form), the content hash of the model artifact it used and the package
+version (`aeroaqua._version`). Retraining a model changes its hash, so the old
+answers are simply never asked for again and age out; there is nothing to
+invalidate by hand.
+
+Two tiers:
+
+- an in-process LRU of result dicts (a hit costs a few microseconds, most of
+  it hashing the key);
+- an optional SQLite database shared by every process on the machine, so
+  restarted workers and other dashboards reuse earlier answers. Range lookups
+  fetch all their keys with a few ``IN`` queries.
+
+Entries older than `max_age_s` are dropped from both tiers; once the stored
+results exceed `max_bytes` the least recently read ones are deleted.
+
+The cache is off until `configure_result_cache` is called or the
+``AEROAQUA_RESULT_CACHE`` environment variable names the database file
+(``:memory:`` keeps the in-process tier only). Pipelines opt in with the
+`cached_result` decorator; calls with per-sample (array or Series) inputs
+bypass the cache.
+"""
+import contextlib
+import datetime
+import functools
+import hashlib
+import inspect
+import json
+import marshal
+import numbers
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from aeroaqua._version import __version__
+
+
+DEFAULT_MAXSIZE = 4096
+RESULT_CACHE_ENV = 'AEROAQUA_RESULT_CACHE'
+MEMORY_ONLY = ':memory:'
+
+# Size/age eviction runs on open and after this many writes to the database.
+EVICT_EVERY = 256
+
+# Keys per ``IN (...)`` query (SQLite's default host-parameter limit is 999).
+_LOOKUP_BATCH = 500
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS results ('
+    'key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS results_created ON results (created)',
+    'CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)',
+)
+
+
+class _Uncacheable(Exception):
+    pass
+
+
+def _canonical(value):
+    kind = type(value)
+    if kind is float or kind is int:
+        return float(value) + 0.0
+    if value is None or kind is str:
+        return value
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, numbers.Real):
+        return float(value) + 0.0
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    if isinstance(value, str):
+        return str(value)
+    raise _Uncacheable
+
+
+def _iso_date(value):
+    """'YYYY-MM-DD' for any spelling of a calendar day ('2025-6-21', Timestamp, date); other values unchanged."""
+    if isinstance(value, str):
+        try:
+            return datetime.date.fromisoformat(value).isoformat()
+        except ValueError:
+            pass
+    import pandas as pd
+
+    try:
+        day = pd.Timestamp(value)
+    except (TypeError, ValueError):
+        return value
+    # a time of day or time zone makes it a different input, left for the pipeline to accept or reject
+    if day is pd.NaT or day.tzinfo is not None or day != day.normalize():
+        return value
+    return day.date().isoformat()
+
+
+def result_key(name: str, params: dict, model_hash: str = None) -> str:
+    """Cache key of pipeline `name` called with `params` (scalars, strings or dates) and a model content hash.
+
+    The hashed document is the sorted (argument, canonical value) pairs in
+    `marshal` format 2, which writes floats as their 8 bytes and shares no
+    references, so equal inputs always give equal bytes. Raises TypeError for
+    inputs without a canonical form (arrays, Series, ...).
+    """
+    try:
+        inputs = tuple(sorted((str(k), _canonical(v)) for k, v in params.items()))
+    except _Uncacheable:
+        raise TypeError(f'{name} inputs cannot be cached: {sorted(params)}') from None
+    document = marshal.dumps((name, inputs, model_hash, __version__), 2)
+    return hashlib.sha256(document).hexdigest()
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {'__datetime__': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'__date__': value.isoformat()}
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f'cannot store {type(value).__name__} in the result cache')
+
+
+def _decode(obj):
+    if '__date__' in obj:
+        return datetime.date.fromisoformat(obj['__date__'])
+    if '__datetime__' in obj:
+        return datetime.datetime.fromisoformat(obj['__datetime__'])
+    return obj
+
+
+def dumps(value) -> str:
+    return json.dumps(value, default=_encode, separators=(',', ':'))
+
+
+def loads(text: str):
+    return json.loads(text, object_hook=_decode)
+
+
+class ResultCache:
+    """Bounded LRU of pipeline results in front of an optional SQLite store.
+
+    Values are dicts of numbers, strings and dates; reads return shallow copies.
+
+    Args:
+        path: SQLite database file (None or ':memory:' keeps the in-process tier only).
+        maxsize: maximum number of results kept in memory.
+        max_bytes: bound on the encoded size of the stored results (None: unbounded).
+        max_age_s: results older than this many seconds are dropped (None: never).
+    """
+
+    def __init__(self, path: str = None, maxsize: int = DEFAULT_MAXSIZE, max_bytes: int = None, max_age_s: float = None):
+        self.path = None if path in (None, MEMORY_ONLY) else path
+        self.maxsize = int(maxsize)
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._pid = None
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+        self.evictions = 0
+        if self.path:
+            self.evict()
+
+    def get(self, key: str):
+        """The result stored under `key`, or None."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys) -> dict:
+        """key -> result for every key found in either tier (the database is queried once per batch of keys)."""
+        keys = list(keys)
+        now = time.time()
+        expired = self._expired_before(now)
+        found, missing = {}, []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] < expired:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    missing.append(key)
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = dict(entry[0])
+            self.hits += len(found)
+
+        if missing and self.path:
+            rows = self._select(missing, expired, now)
+            for key, value, created in rows:
+                self._remember(key, value, created)
+                found[key] = dict(value)
+            with self._lock:
+                self.disk_hits += len(rows)
+                self.hits += len(rows)
+        with self._lock:
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put(self, key: str, value: dict):
+        self.put_many({key: value})
+
+    def put_many(self, items: dict):
+        """Store key -> result pairs in both tiers (one database transaction)."""
+        now = time.time()
+        for key, value in items.items():
+            self._remember(key, value, now)
+        if not self.path or not items:
+            return
+        rows = [(key, text, len(text), now, now) for key, text in ((k, dumps(v)) for k, v in items.items())]
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.executemany('INSERT OR REPLACE INTO results (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)', rows)
+            self.disk_writes += len(rows)
+            self._writes += len(rows)
+            due = self._writes >= EVICT_EVERY
+        if due:
+            self.evict(now)
+
+    def evict(self, now: float = None) -> int:
+        """Drop expired results and, over `max_bytes`, the least recently read ones; returns database rows deleted."""
+        now = time.time() if now is None else now
+        expired = self._expired_before(now)
+        deleted = 0
+        with self._lock:
+            for key in [k for k, (_, created) in self._entries.items() if created < expired]:
+                del self._entries[key]
+            self._writes = 0
+            if not self.path:
+                return 0
+            conn = self._connection()
+            with conn:
+                if self.max_age_s is not None:
+                    deleted += conn.execute('DELETE FROM results WHERE created < ?', (expired,)).rowcount
+                if self.max_bytes is not None:
+                    excess = conn.execute('SELECT total(size) FROM results').fetchone()[0] - self.max_bytes
+                    if excess > 0:
+                        doomed = []
+                        for key, size in conn.execute('SELECT key, size FROM results ORDER BY accessed'):
+                            doomed.append((key,))
+                            excess -= size
+                            if excess <= 0:
+                                break
+                        conn.executemany('DELETE FROM results WHERE key = ?', doomed)
+                        deleted += len(doomed)
+                        for (key,) in doomed:
+                            self._entries.pop(key, None)
+            self.evictions += deleted
+        return deleted
+
+    def clear(self, disk: bool = False):
+        """Empty the in-memory tier (and the database when ``disk=True``) and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.disk_hits = self.disk_writes = self.evictions = 0
+            if disk and self.path:
+                conn = self._connection()
+                with conn:
+                    conn.execute('DELETE FROM results')
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None and self._pid == os.getpid():
+                self._conn.close()
+            self._conn = None
+
+    def info(self) -> dict:
+        with self._lock:
+            info = {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'disk_writes': self.disk_writes,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'path': self.path,
+            }
+            if self.path:
+                info['disk_entries'], info['disk_bytes'] = self._connection().execute('SELECT count(*), total(size) FROM results').fetchone()
+            return info
+
+    def _expired_before(self, now: float) -> float:
+        return -float('inf') if self.max_age_s is None else now - self.max_age_s
+
+    def _remember(self, key: str, value: dict, created: float):
+        with self._lock:
+            self._entries[key] = (dict(value), created)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _select(self, keys, expired: float, now: float) -> list:
+        rows = []
+        with self._lock:
+            conn = self._connection()
+            for start in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[start:start + _LOOKUP_BATCH]
+                marks = ','.join('?' * len(batch))
+                hits = conn.execute(f'SELECT key, value, created FROM results WHERE key IN ({marks}) AND created >= ?', (*batch, expired)).fetchall()
+                if hits:
+                    with conn:
+                        conn.execute(f'UPDATE results SET accessed = ? WHERE key IN ({",".join("?" * len(hits))})', (now, *(k for k, _, _ in hits)))
+                rows.extend((key, loads(value), created) for key, value, created in hits)
+        return rows
+
+    def _connection(self):
+        # connections do not survive fork: every process opens its own
+        if self._conn is None or self._pid != os.getpid():
+            import sqlite3
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30.0, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in _SCHEMA:
+                    conn.execute(statement)
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+
+_cache = None
+_env_path = os.environ.get(RESULT_CACHE_ENV)
+_config_lock = threading.Lock()
+
+
+def active_result_cache():
+    """The process-wide `ResultCache`, or None while caching is off."""
+    global _cache
+    if _cache is None and _env_path:
+        with _config_lock:
+            if _cache is None:
+                _cache = ResultCache(_env_path)
+    return _cache
+
+
+def configure_result_cache(path: str = None, maxsize: int = DEFAULT_MAXSIZE, max_bytes: int = None, max_age_s: float = None) -> ResultCache:
+    """Turn result caching on with a fresh process-wide cache (see `ResultCache` for the arguments)."""
+    global _cache
+    with _config_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = ResultCache(path, maxsize=maxsize, max_bytes=max_bytes, max_age_s=max_age_s)
+    return _cache
+
+
+def disable_result_cache():
+    """Turn result caching off (the database is kept)."""
+    global _cache, _env_path
+    with _config_lock:
+        if _cache is not None:
+            _cache.close()
+        _cache = _env_path = None
+
+
+@contextlib.contextmanager
+def using_result_cache(cache: ResultCache):
+    """Make `cache` the process-wide result cache inside a ``with`` block (None turns caching off)."""
+    global _cache, _env_path
+    with _config_lock:
+        previous = _cache, _env_path
+        _cache, _env_path = cache, None
+    try:
+        yield cache
+    finally:
+        with _config_lock:
+            _cache, _env_path = previous
+
+
+def result_cache_info():
+    cache = active_result_cache()
+    return None if cache is None else cache.info()
+
+
+def clear_result_cache(disk: bool = False):
+    cache = active_result_cache()
+    if cache is not None:
+        cache.clear(disk=disk)
+
+
+def model_content_hash(path_hint: str = None):
+    """sha256 of the model artifact `path_hint` resolves to (see `resolve_model_path`), or None if there is none."""
+    from aeroaqua.model.registry import model_registry, resolve_model_path
+
+    path = resolve_model_path(path_hint)
+    return None if path is None else model_registry.model_hash(path)
+
+
+def cached_result(name: str, model_arg: str = None):
+    """Decorator serving a pipeline's results from the active result cache.
+
+    The key covers every argument of the call with defaults applied; a
+    ``date_str`` argument is keyed by its ISO date, so '2025-6-21' and
+    ``pd.Timestamp('2025-06-21')`` share '2025-06-21'. `model_arg` names the
+    argument holding the model path, which is keyed by the artifact's content
+    hash (stat-cached, the model is not loaded) instead of its name. The wrapper gains ``cache_key(*args, **kwargs)``
+    (None for uncacheable calls).
+    """
+    def decorate(fn):
+        parameters = inspect.signature(fn).parameters.values()
+        if any(p.kind not in (p.POSITIONAL_OR_KEYWORD, p.KEYWORD_ONLY) for p in parameters):
+            raise TypeError(f'cached_result needs named parameters only: {fn.__qualname__}')
+        names = tuple(p.name for p in parameters)
+        defaults = {p.name: p.default for p in parameters}
+
+        def cache_key(*args, **kwargs):
+            # cheaper than Signature.bind; calls it would reject are not cached (and fail in `fn`)
+            if len(args) > len(names) or not kwargs.keys() <= defaults.keys() or kwargs.keys() & set(names[:len(args)]):
+                return None
+            params = dict(defaults)
+            params.update(zip(names, args))
+            params.update(kwargs)
+            if any(value is inspect.Parameter.empty for value in params.values()):
+                return None
+            if 'date_str' in params:
+                params['date_str'] = _iso_date(params['date_str'])
+            model_hash = None
+            if model_arg is not None:
+                model_hash = model_content_hash(params.pop(model_arg))
+                if model_hash is None:
+                    return None
+            try:
+                return result_key(name, params, model_hash)
+            except TypeError:
+                return None
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            cache = active_result_cache()
+            key = None if cache is None else cache_key(*args, **kwargs)
+            if key is None:
+                return fn(*args, **kwargs)
+            value = cache.get(key)
+            if value is None:
+                value = fn(*args, **kwargs)
+                cache.put(key, value)
+            return value
+        wrapper.cache_key = cache_key
+        return wrapper
+    return decorate
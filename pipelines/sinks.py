@@ -0,0 +1,367 @@
+"""Chunked, columnar writers for sweep and grid results.
+
+A sink receives results as column chunks (a mapping of column name to 1-D array,
+or a DataFrame) and appends every chunk to its output as it arrives, so writing
+10^8 rows needs no more memory than the largest chunk::
+
+    with open_sink('sweep.parquet', partition_by='month') as sink:
+        for frame in iter_parallel_sweep(dates, ...):
+            sink.write(frame)
+
+Formats:
+    csv      one CSV file, formatted like ``DataFrame.to_csv(index=False)``.
+    parquet  one Parquet file with a row group per chunk (requires pyarrow).
+    npy      a directory holding one ``<column>.npy`` file per column (see
+             `npy_file_name`), so readers load only the columns they need
+             (``np.load(path, mmap_mode='r')``).
+
+`open_sink` picks the format from the path suffix (``.csv``, ``.parquet`` /
+``.pq``, ``.npy`` or no suffix for npy) unless `format` is given. The columns
+and their order are fixed by the first chunk. npy column dtypes are fixed when
+a column file is opened: pass `dtypes` (e.g. ``Grid.schema()``) when later
+chunks may hold wider strings than the first one.
+
+When the ``with`` block exits with an exception, the sink removes the files it
+wrote instead of leaving truncated outputs behind.
+
+With `partition_by` the output path is a directory holding one output per
+partition value, named ``<partition>=<value>`` (``month=07.parquet``,
+``season=Winter.csv``, ``season=Winter/<column>.npy``). `partition_by` is either
+a column of the chunks or ``'month'`` / ``'season'`` derived from the date
+column (meteorological seasons: Dec-Feb Winter, Mar-May Spring, Jun-Aug Summer,
+Sep-Nov Fall). Every partition keeps its writer open until the sink is closed.
+"""
+import contextlib
+import datetime
+import os
+import re
+import struct
+
+import numpy as np
+
+
+SINK_FORMATS = ('csv', 'parquet', 'npy')
+
+DATE_PARTITIONS = ('month', 'season')
+
+MONTH_SEASONS = ('Winter', 'Winter', 'Spring', 'Spring', 'Spring', 'Summer', 'Summer', 'Summer', 'Fall', 'Fall', 'Fall', 'Winter')
+
+_SUFFIX_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.pq': 'parquet', '.npy': 'npy', '': 'npy'}
+
+# Every column file gets a fixed-size header so it can be rewritten with the final row count on close.
+_NPY_HEADER_BYTES = 128
+
+
+def sink_format(path: str, format: str = None) -> str:
+    """Output format for `path`: `format` when given, otherwise inferred from the suffix."""
+    if format is not None:
+        if format not in SINK_FORMATS:
+            raise ValueError(f'format must be one of {SINK_FORMATS}, got {format!r}')
+        return format
+    suffix = os.path.splitext(path.rstrip('/\\'))[1].lower()
+    if suffix not in _SUFFIX_FORMATS:
+        raise ValueError(f'cannot infer the output format from {path!r}; pass one of {SINK_FORMATS}')
+    return _SUFFIX_FORMATS[suffix]
+
+
+def as_columns(chunk) -> dict:
+    """Column name -> 1-D array for a DataFrame or a mapping (scalars are broadcast)."""
+    if hasattr(chunk, 'columns') and hasattr(chunk, 'iloc'):
+        return {str(c): chunk[c].to_numpy() for c in chunk.columns}
+    columns = {str(name): np.asarray(values) for name, values in chunk.items()}
+    lengths = {len(v) for v in columns.values() if v.ndim}
+    if len(lengths) > 1:
+        raise ValueError(f'columns have different lengths: {sorted(lengths)}')
+    n = lengths.pop() if lengths else 1
+    for name, values in columns.items():
+        if values.ndim == 0:
+            columns[name] = np.full(n, values[()])
+        elif values.ndim != 1:
+            raise ValueError(f'column {name!r} must be 1-D, got shape {values.shape}')
+    return columns
+
+
+def column_dtype(spec) -> np.dtype:
+    """Storage dtype of a column spec: a dtype, or the sequence of a string column's values (widest string)."""
+    if isinstance(spec, (np.dtype, type, str)):
+        return np.dtype(spec)
+    return _npy_values(np.asarray(list(spec), dtype=object)).dtype
+
+
+def _months(values) -> np.ndarray:
+    return np.asarray(values, dtype='datetime64[D]').astype('datetime64[M]').astype(np.int64) % 12 + 1
+
+
+class ResultSink:
+    """Base class of the sinks: splits chunks by partition and appends them to per-partition writers.
+
+    Attributes:
+        rows: rows written so far.
+        partition_rows: rows written per partition value (key None when unpartitioned).
+    """
+
+    format = None
+    suffix = ''
+
+    def __init__(self, path: str, partition_by: str = None, date_column: str = 'date', dtypes: dict = None):
+        self.path = path
+        self.partition_by = partition_by
+        self.date_column = date_column
+        self.dtypes = {str(name): column_dtype(spec) for name, spec in (dtypes or {}).items()}
+        self.columns = None
+        self.rows = 0
+        self.partition_rows = {}
+        self._writers = {}
+        directory = path if partition_by else os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def write(self, chunk):
+        """Append one chunk (DataFrame or mapping of columns)."""
+        columns = as_columns(chunk)
+        if self.columns is None:
+            self.columns = list(columns)
+        elif list(columns) != self.columns:
+            raise ValueError(f'chunk columns {list(columns)} differ from the first chunk {self.columns}')
+        n = len(next(iter(columns.values()))) if columns else 0
+        if n == 0:
+            return
+        if not self.partition_by:
+            self._append(None, columns, n)
+        else:
+            keys, inverse = np.unique(self._partition_values(columns), return_inverse=True)
+            keys = keys.tolist()
+            if len(keys) == 1:
+                self._append(keys[0], columns, n)
+            else:
+                order = np.argsort(inverse, kind='stable')
+                bounds = np.searchsorted(inverse[order], np.arange(len(keys) + 1))
+                for k, key in enumerate(keys):
+                    take = order[bounds[k]:bounds[k + 1]]
+                    self._append(key, {name: values[take] for name, values in columns.items()}, len(take))
+        self.rows += n
+
+    def close(self):
+        writers, self._writers = self._writers, {}
+        for writer in writers.values():
+            self._close(writer)
+
+    def abort(self):
+        """Close every writer and delete the outputs written so far."""
+        writers, self._writers = self._writers, {}
+        for key, writer in writers.items():
+            with contextlib.suppress(OSError):
+                self._discard(writer, self.target(key))
+        if self.partition_by:
+            with contextlib.suppress(OSError):
+                os.rmdir(self.path)
+
+    def target(self, key=None) -> str:
+        """Output path of partition `key` (the sink path when unpartitioned)."""
+        if key is None:
+            return self.path
+        value = re.sub(r'[^\w.-]', '_', str(key))
+        return os.path.join(self.path, f'{self.partition_by}={value}{self.suffix}')
+
+    def _partition_values(self, columns: dict) -> np.ndarray:
+        by = self.partition_by
+        if by in columns:
+            return columns[by]
+        if by.lower() in DATE_PARTITIONS:
+            match = [c for c in columns if c.lower() == by.lower()]
+            if match:
+                return columns[match[0]]
+            if self.date_column not in columns:
+                raise ValueError(f'partitioning by {by!r} needs a {self.date_column!r} column')
+            months = _months(columns[self.date_column])
+            if by.lower() == 'month':
+                return np.char.zfill(months.astype(str), 2)
+            return np.array(MONTH_SEASONS)[months - 1]
+        raise ValueError(f'partition_by must be a column or one of {DATE_PARTITIONS}, got {by!r}')
+
+    def _append(self, key, columns: dict, n: int):
+        writer = self._writers.get(key)
+        if writer is None:
+            writer = self._writers[key] = self._open(self.target(key), columns)
+        self._write(writer, columns)
+        self.partition_rows[key] = self.partition_rows.get(key, 0) + n
+
+    def _open(self, target: str, columns: dict):
+        raise NotImplementedError
+
+    def _write(self, writer, columns: dict):
+        raise NotImplementedError
+
+    def _close(self, writer):
+        raise NotImplementedError
+
+    def _discard(self, writer, target: str):
+        self._close(writer)
+        os.remove(target)
+
+
+class CSVSink(ResultSink):
+    """Appends chunks to CSV files; the header is written once per file."""
+
+    format = 'csv'
+    suffix = '.csv'
+
+    def __init__(self, path: str, partition_by: str = None, date_column: str = 'date', dtypes: dict = None, **to_csv_kwargs):
+        super().__init__(path, partition_by, date_column, dtypes)
+        self.to_csv_kwargs = to_csv_kwargs
+
+    def _open(self, target, columns):
+        return [open(target, 'w', newline=''), True]
+
+    def _write(self, writer, columns):
+        import pandas as pd
+
+        fh, header = writer
+        pd.DataFrame(columns, copy=False).to_csv(fh, header=header, index=False, **self.to_csv_kwargs)
+        writer[1] = False
+
+    def _close(self, writer):
+        writer[0].close()
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError('Parquet output requires pyarrow (pip install pyarrow)') from e
+    return pa, pq
+
+
+class ParquetSink(ResultSink):
+    """Appends every chunk as a row group of a Parquet file; the schema is fixed by the first chunk."""
+
+    format = 'parquet'
+    suffix = '.parquet'
+
+    def __init__(self, path: str, partition_by: str = None, date_column: str = 'date', dtypes: dict = None, compression: str = 'snappy'):
+        _pyarrow()
+        super().__init__(path, partition_by, date_column, dtypes)
+        self.compression = compression
+
+    def _open(self, target, columns):
+        pa, pq = _pyarrow()
+        schema = pa.table(columns).schema
+        return pq.ParquetWriter(target, schema, compression=self.compression)
+
+    def _write(self, writer, columns):
+        pa, _ = _pyarrow()
+        writer.write_table(pa.Table.from_pydict(columns, schema=writer.schema))
+
+    def _close(self, writer):
+        writer.close()
+
+
+def _npy_values(values: np.ndarray) -> np.ndarray:
+    if values.dtype == object:
+        first = values[0] if len(values) else None
+        if isinstance(first, datetime.date) and not isinstance(first, datetime.datetime):
+            return values.astype('datetime64[D]')
+        return values.astype(str)
+    return values
+
+
+def npy_file_name(column: str) -> str:
+    """File name of a column in npy output (characters not allowed in file names become '_')."""
+    return re.sub(r'[\\/:*?"<>|]', '_', column) + '.npy'
+
+
+def _npy_header(dtype: np.dtype, rows: int) -> bytes:
+    header = repr({'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (rows,)})
+    width = _NPY_HEADER_BYTES - 10
+    if len(header) >= width:
+        raise ValueError(f'dtype {dtype} does not fit the .npy header')
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', width) + (header.ljust(width - 1) + '\n').encode('latin1')
+
+
+class _NpyColumn:
+    __slots__ = ('path', 'fh', 'dtype', 'rows')
+
+    def __init__(self, path: str, dtype: np.dtype):
+        self.path = path
+        self.fh = open(path, 'wb')
+        self.dtype = dtype
+        self.rows = 0
+        self.fh.write(_npy_header(dtype, 0))
+
+    def append(self, name: str, values: np.ndarray):
+        values = _npy_values(values)
+        if values.dtype != self.dtype:
+            if values.dtype.kind in 'SU' and values.dtype.itemsize > self.dtype.itemsize:
+                raise ValueError(f'column {name!r} holds strings wider than its declared width ({self.dtype}); pass its values in the sink dtypes')
+            values = values.astype(self.dtype, casting='same_kind')
+        np.ascontiguousarray(values).tofile(self.fh)
+        self.rows += len(values)
+
+    def close(self):
+        self.fh.seek(0)
+        self.fh.write(_npy_header(self.dtype, self.rows))
+        self.fh.close()
+
+    def discard(self):
+        self.fh.close()
+        os.remove(self.path)
+
+
+class NpySink(ResultSink):
+    """Appends every column to its own ``.npy`` file inside a directory.
+
+    Column dtypes come from `dtypes` when given, otherwise from the first chunk:
+    date objects become ``datetime64[D]``, other object columns fixed-width
+    unicode strings as wide as the first chunk's widest value.
+    """
+
+    format = 'npy'
+
+    def _open(self, target, columns):
+        os.makedirs(target, exist_ok=True)
+        writer = {}
+        for name, values in columns.items():
+            dtype = self.dtypes[name] if name in self.dtypes else _npy_values(values).dtype
+            writer[name] = _NpyColumn(os.path.join(target, npy_file_name(name)), dtype)
+        return writer
+
+    def _write(self, writer, columns):
+        for name, values in columns.items():
+            writer[name].append(name, values)
+
+    def _close(self, writer):
+        for column in writer.values():
+            column.close()
+
+    def _discard(self, writer, target):
+        for column in writer.values():
+            with contextlib.suppress(OSError):
+                column.discard()
+        os.rmdir(target)
+
+
+_SINKS = {'csv': CSVSink, 'parquet': ParquetSink, 'npy': NpySink}
+
+
+def open_sink(path: str, format: str = None, partition_by: str = None, date_column: str = 'date', dtypes: dict = None, **options) -> ResultSink:
+    """Open a result sink at `path` (format inferred from the suffix unless given).
+
+    Args:
+        path: output file (csv, parquet) or directory (npy, or any format when partitioned).
+        format: one of SINK_FORMATS.
+        partition_by: column name, or 'month' / 'season' derived from `date_column`.
+        date_column: date column used for derived partitions.
+        dtypes: column -> dtype, or the sequence of a string column's values
+            (``Grid.schema()``); fixes npy column dtypes and string widths up front.
+        options: format-specific options (``to_csv`` keywords for csv, `compression` for parquet).
+    """
+    return _SINKS[sink_format(path, format)](path, partition_by=partition_by, date_column=date_column, dtypes=dtypes, **options)
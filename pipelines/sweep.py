@@ -0,0 +1,194 @@
+"""Scenario sweep engine for the RF pipeline.
+
+A sweep evaluates every combination of dates x cloud types x RH values x
+temperatures for one site. Solar geometry is computed once per date (through the
+`aeroaqua.solar` cache), the scenario variables are broadcast against it into one
+stacked feature matrix per chunk and the forest runs a single `predict` per chunk.
+
+Per-scenario results follow `pipeline_functions.run_prediction_pipeline`: the
+zenith feature is clipped to [0, 90] degrees, only daylight samples are sent to
+the forest (night GHI is exactly zero), predictions are clipped at zero, and the
+day is integrated as a rectangle sum at `freq`. Dates are
+sampled as local calendar days (like `aeroaqua.solar`); on DST transition dates
+the legacy function samples 24 elapsed hours instead, which only adds or drops
+night samples, so energies agree to floating-point rounding.
+"""
+import itertools
+
+import numpy as np
+
+from aeroaqua.solar import get_solar_positions_for_dates, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
+from aeroaqua.model import predict_water_yield_array
+from aeroaqua.model.registry import load_model
+from aeroaqua.pipelines.pipeline_rf import _as_model_input, daylight_ghi, daylight_mask, feature_buffer, fill_features
+
+
+SWEEP_COLUMNS = ['date', 'latitude', 'cloud_type', 'rh_percent', 'temperature_c', 'solar_energy_kwh_m2', 'predicted_liters_per_day']
+
+DEFAULT_CHUNK_ROWS = 1_000_000
+
+
+class DayGeometry:
+    """Per-day solar inputs of the RF model for a list of dates at one site.
+
+    Attributes:
+        dates: list of 'YYYY-MM-DD' strings.
+        zenith, month, day, hour: stacked per-sample arrays for all dates.
+        daylight: per-sample mask of samples with the sun above the horizon.
+        day_starts: position of the first sample of each date in the stacked arrays.
+        samples_per_day: number of samples of each date.
+    """
+
+    def __init__(self, dates, freq: str, latitude: float, longitude: float, altitude: float, timezone: str):
+        import pandas as pd
+
+        self.dates = [pd.Timestamp(d).strftime('%Y-%m-%d') for d in dates]
+        solpos = get_solar_positions_for_dates(self.dates, freq=freq, latitude=latitude, longitude=longitude, altitude=altitude, timezone=timezone)
+        times = solpos.index
+
+        self.zenith = solpos['apparent_zenith'].to_numpy().clip(0, 90)
+        self.month = times.month.to_numpy()
+        self.day = times.day.to_numpy()
+        self.hour = times.hour.to_numpy()
+        self.daylight = daylight_mask(solpos['apparent_zenith'].to_numpy())
+
+        local_days = times.normalize().asi8
+        self.day_starts = np.flatnonzero(np.r_[True, local_days[1:] != local_days[:-1]])
+        if len(self.day_starts) != len(self.dates):
+            raise ValueError('dates must be distinct and every date must produce at least one sample')
+        self.samples_per_day = np.diff(np.r_[self.day_starts, len(times)])
+
+    def day_slice(self, i: int):
+        start = self.day_starts[i]
+        return slice(start, start + self.samples_per_day[i])
+
+
+def scenario_grid(cloud_types, rh_values, temperatures):
+    """Cartesian product of the scenario variables as three flat arrays (cloud-major order)."""
+    combos = np.array(list(itertools.product(cloud_types, rh_values, temperatures)), dtype=float).reshape(-1, 3)
+    return combos[:, 0], combos[:, 1], combos[:, 2]
+
+
+def _chunk_dates(samples_per_day, n_scenarios: int, chunk_rows: int):
+    """Group consecutive dates so each group's feature matrix stays under `chunk_rows` (at least one date per group)."""
+    group, rows = [], 0
+    for i, n in enumerate(samples_per_day):
+        block = int(n) * n_scenarios
+        if group and rows + block > chunk_rows:
+            yield group
+            group, rows = [], 0
+        group.append(i)
+        rows += block
+    if group:
+        yield group
+
+
+def predict_daily_energy(model, geometry: DayGeometry, day_indices, clouds, rhs, temps, freq: str):
+    """Daily kWh/m^2 for every (date, scenario) pair of one chunk, with a single `predict`.
+
+    Only daylight samples become feature rows; night samples are zero.
+
+    Returns an array of shape (len(day_indices), n_scenarios).
+    """
+    import pandas as pd
+
+    n_s = len(clouds)
+    n_rows = n_s * sum(int(geometry.daylight[geometry.day_slice(i)].sum()) for i in day_indices)
+    X = feature_buffer().rows(n_rows)
+    masks = []
+    start = 0
+    for i in day_indices:
+        sl = geometry.day_slice(i)
+        day = geometry.daylight[sl]
+        n_day = int(day.sum())
+        # rows are ordered date -> scenario -> sample so every (date, scenario) block is contiguous
+        stop = start + n_s * n_day
+        fill_features(
+            X[start:stop],
+            np.repeat(clouds, n_day),
+            np.tile(geometry.zenith[sl][day], n_s),
+            np.repeat(rhs, n_day),
+            np.repeat(temps, n_day),
+            np.tile(geometry.month[sl][day], n_s),
+            np.tile(geometry.day[sl][day], n_s),
+            np.tile(geometry.hour[sl][day], n_s),
+        )
+        masks.append(np.tile(day, n_s))
+        start = stop
+    X = _as_model_input(X)
+
+    # full (date, scenario, sample) grid with zeros at night, summed exactly as before
+    ghi = daylight_ghi(model, X, np.concatenate(masks))
+
+    freq_in_hours = pd.to_timedelta(freq).total_seconds() / 3600.0
+    out = np.empty((len(day_indices), n_s))
+    start = 0
+    for row, i in enumerate(day_indices):
+        n_d = geometry.samples_per_day[i]
+        block = ghi[start:start + n_s * n_d].reshape(n_s, n_d)
+        # 1-D sums per scenario keep numpy's pairwise summation identical to the single-call pipeline
+        out[row] = [scenario.sum() * freq_in_hours / 1000.0 for scenario in block]
+        start += n_s * n_d
+    return out
+
+
+def run_scenario_sweep(
+    dates,
+    cloud_types=(0.0,),
+    rh_values=(50.0,),
+    temperatures=(20.0,),
+    model_path: str = None,
+    freq: str = '10T',
+    latitude: float = DEFAULT_LATITUDE,
+    longitude: float = DEFAULT_LONGITUDE,
+    altitude: float = DEFAULT_ALTITUDE,
+    timezone: str = DEFAULT_TZ,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    water_yield_fn=None,
+    progress=None,
+):
+    """Evaluate the RF pipeline over dates x cloud types x RH values x temperatures.
+
+    Args:
+        dates: iterable of dates (strings or timestamps).
+        cloud_types, rh_values, temperatures: iterables of scenario values.
+        model_path: RF model path (resolved through the model registry).
+        freq, latitude, longitude, altitude, timezone: sampling and location parameters.
+        chunk_rows: upper bound on feature rows per `predict` call (a single date
+            always forms at least one chunk).
+        water_yield_fn: vectorized f(solar_energy_kwh_m2, rh_percent) -> liters/day;
+            defaults to `aeroaqua.model.predict_water_yield_array`.
+        progress: optional callable(dates_done, dates_total) invoked after each chunk.
+
+    Returns:
+        pandas.DataFrame with columns SWEEP_COLUMNS, ordered by date, then cloud type,
+        RH and temperature.
+    """
+    import pandas as pd
+
+    water_yield_fn = water_yield_fn or predict_water_yield_array
+    clouds, rhs, temps = scenario_grid(cloud_types, rh_values, temperatures)
+    geometry = DayGeometry(dates, freq, latitude, longitude, altitude, timezone)
+    model = load_model(model_path)
+
+    n_dates = len(geometry.dates)
+    energy = np.empty((n_dates, len(clouds)))
+    done = 0
+    for group in _chunk_dates(geometry.samples_per_day, len(clouds), chunk_rows):
+        energy[group] = predict_daily_energy(model, geometry, group, clouds, rhs, temps, freq)
+        done += len(group)
+        if progress is not None:
+            progress(done, n_dates)
+
+    n_s = len(clouds)
+    energy = energy.ravel()
+    rh_col = np.tile(rhs, n_dates)
+    return pd.DataFrame({
+        'date': np.repeat([pd.Timestamp(d).date() for d in geometry.dates], n_s),
+        'latitude': float(latitude),
+        'cloud_type': np.tile(clouds, n_dates),
+        'rh_percent': rh_col,
+        'temperature_c': np.tile(temps, n_dates),
+        'solar_energy_kwh_m2': energy,
+        'predicted_liters_per_day': water_yield_fn(energy, rh_col),
+    }, columns=SWEEP_COLUMNS)
@@ -0,0 +1,319 @@
+"""Per-timestep weather inputs for the RF pipeline.
+
+Observations or forecasts of cloud type, relative humidity and temperature at
+any resolution are aligned onto the pipeline's solar time grid (one sample per
+`freq` step of each local day):
+
+- RH and temperature take the mean of the observations inside each grid
+  sample's window (``[t - freq/2, t + freq/2)``) when there are any, and are
+  linearly interpolated in time otherwise, so 1-minute data is averaged down and
+  hourly forecasts are interpolated up;
+- cloud type is a category code, so it takes the nearest observation.
+
+A grid sample farther than `max_gap` from every observation is a gap: the day
+raises ValueError, or is skipped with ``on_gap='skip'``. The partially covered
+first and last local days of an input are left out.
+
+`iter_daily_rf` streams a weather CSV (or DataFrames) through the forest in
+bounded memory. Observations are read in chunks and a day is evaluated as soon
+as the data covers its last grid sample; all days completed by one chunk share
+one solar-position call and one forest ``predict``. Each day is yielded as
+soon as it completes, and only the observations still needed for the following
+days are kept between chunks.
+
+Weather files have a time column (default ``time``) and the columns
+``cloud_type``, ``rh_percent`` and ``temperature_c`` (the training names
+``Cloud Type``, ``Relative Humidity`` and ``Temperature`` are accepted too).
+Timestamps with a UTC offset are used as is. Naive ones are local times of
+`timezone`; ambiguous or non-existent local times (DST changes) are dropped.
+Rows with a missing value are dropped.
+"""
+import re
+
+import numpy as np
+
+from aeroaqua.solar import get_solar_positions_for_dates, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
+from aeroaqua.model import predict_water_yield_array
+from aeroaqua.pipelines.pipeline_rf import (
+    _as_model_input, _integrate_daily_kwh, _load_model, _zenith_column, build_feature_matrix, daylight_ghi, daylight_mask,
+)
+
+
+WEATHER_COLUMNS = ('cloud_type', 'rh_percent', 'temperature_c')
+COLUMN_ALIASES = {'Cloud Type': 'cloud_type', 'Relative Humidity': 'rh_percent', 'Temperature': 'temperature_c'}
+DEFAULT_MAX_GAP = '2H'
+DEFAULT_WEATHER_CHUNK_ROWS = 100_000
+
+_UTC_OFFSET = re.compile(r'(Z|[+-]\d\d:?\d\d)$')
+
+
+def _ns(delta) -> int:
+    import pandas as pd
+    return int(pd.Timedelta(delta).value)
+
+
+def align_to_grid(obs_ns, values, grid_ns, step_ns: int, how: str = 'mean'):
+    """Values of an observation series at the grid timestamps (all times as int64 UTC nanoseconds).
+
+    Args:
+        obs_ns: sorted observation times.
+        values: observed values, same length.
+        grid_ns: target sample times.
+        step_ns: grid spacing; each sample averages the observations within half a step.
+        how: 'mean' (window mean, else linear interpolation) or 'nearest'.
+    """
+    obs_ns = np.asarray(obs_ns, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    grid_ns = np.asarray(grid_ns, dtype=np.int64)
+    if how == 'nearest':
+        i = np.clip(np.searchsorted(obs_ns, grid_ns), 1, len(obs_ns) - 1) if len(obs_ns) > 1 else np.zeros(len(grid_ns), dtype=np.int64)
+        if len(obs_ns) > 1:
+            i -= (grid_ns - obs_ns[i - 1]) <= (obs_ns[i] - grid_ns)
+        return values[i]
+    if how != 'mean':
+        raise ValueError(f"how must be 'mean' or 'nearest', got {how!r}")
+    half = step_ns // 2
+    lo = np.searchsorted(obs_ns, grid_ns - half, side='left')
+    hi = np.searchsorted(obs_ns, grid_ns + (step_ns - half), side='left')
+    inside = hi > lo
+    out = np.interp(grid_ns.astype(float), obs_ns.astype(float), values)
+    if inside.any():
+        # window sums taken in observation order, independent of what else is buffered
+        bounds = np.column_stack([lo[inside], hi[inside]]).ravel()
+        sums = np.add.reduceat(np.append(values, 0.0), bounds)[::2]
+        out[inside] = sums / (hi - lo)[inside]
+    return out
+
+
+def gap_mask(obs_ns, grid_ns, max_gap_ns: int):
+    """True for grid samples farther than `max_gap_ns` from every observation."""
+    obs_ns = np.asarray(obs_ns, dtype=np.int64)
+    grid_ns = np.asarray(grid_ns, dtype=np.int64)
+    if len(obs_ns) == 0:
+        return np.ones(len(grid_ns), dtype=bool)
+    i = np.searchsorted(obs_ns, grid_ns)
+    before = np.where(i > 0, grid_ns - obs_ns[np.maximum(i - 1, 0)], np.iinfo(np.int64).max)
+    after = np.where(i < len(obs_ns), obs_ns[np.minimum(i, len(obs_ns) - 1)] - grid_ns, np.iinfo(np.int64).max)
+    return np.minimum(before, after) > max_gap_ns
+
+
+def align_series(series, times, freq: str, how: str = 'mean', max_gap: str = DEFAULT_MAX_GAP, name: str = 'series'):
+    """Align a time-indexed pandas Series onto the sample timestamps `times` (see `align_to_grid`).
+
+    Naive timestamps are taken in the timezone of `times`.
+
+    Raises:
+        ValueError: if a sample is farther than `max_gap` from every observation.
+    """
+    series = series.dropna().sort_index()
+    obs_ns, valid = _utc_ns(series.index, str(times.tz) if times.tz is not None else 'UTC')
+    obs_ns, values = obs_ns[valid], series.to_numpy(dtype=float)[valid]
+    if gap_mask(obs_ns, times.asi8, _ns(max_gap)).any():
+        raise ValueError(f'{name} leaves samples more than {max_gap} from any observation')
+    return align_to_grid(obs_ns, values, times.asi8, _ns(freq), how=how)
+
+
+def align_weather(obs_ns, obs, grid_ns, step_ns: int):
+    """Dict of per-sample cloud_type / rh_percent / temperature_c arrays on the grid."""
+    return {
+        'cloud_type': align_to_grid(obs_ns, obs['cloud_type'], grid_ns, step_ns, how='nearest'),
+        'rh_percent': align_to_grid(obs_ns, obs['rh_percent'], grid_ns, step_ns),
+        'temperature_c': align_to_grid(obs_ns, obs['temperature_c'], grid_ns, step_ns),
+    }
+
+
+def _utc_ns(times, timezone: str):
+    """int64 UTC nanoseconds and a validity mask for parsed timestamps (naive ones are local to `timezone`)."""
+    import pandas as pd
+
+    times = pd.DatetimeIndex(times)
+    if times.tz is None:
+        times = times.tz_localize(timezone, ambiguous='NaT', nonexistent='NaT')
+    valid = ~np.asarray(times.isna())
+    return times.asi8, valid
+
+
+def _frame_to_arrays(frame, time_column: str, timezone: str):
+    import pandas as pd
+
+    frame = frame.rename(columns=COLUMN_ALIASES)
+    missing = [c for c in (time_column,) + WEATHER_COLUMNS if c not in frame.columns]
+    if missing:
+        raise ValueError(f'Weather data is missing columns {missing}; expected {time_column!r} and {list(WEATHER_COLUMNS)}')
+    stamps = frame[time_column]
+    if stamps.dtype == object and len(stamps) and _UTC_OFFSET.search(str(stamps.iloc[0]).strip()):
+        parsed = pd.to_datetime(stamps, utc=True, format='ISO8601')
+    else:
+        parsed = pd.to_datetime(stamps, format='ISO8601')
+    ns, valid = _utc_ns(parsed, timezone)
+    values = {c: pd.to_numeric(frame[c], errors='coerce').to_numpy(dtype=float) for c in WEATHER_COLUMNS}
+    for v in values.values():
+        valid &= ~np.isnan(v)
+    return ns[valid], {c: v[valid] for c, v in values.items()}
+
+
+def iter_weather_chunks(weather, time_column: str = 'time', timezone: str = DEFAULT_TZ, chunk_rows: int = DEFAULT_WEATHER_CHUNK_ROWS):
+    """Yield (utc_ns, {column: values}) chunks from a weather CSV path, a DataFrame or an iterable of DataFrames.
+
+    Raises:
+        ValueError: if columns are missing or timestamps go backwards.
+    """
+    import pandas as pd
+
+    if isinstance(weather, str):
+        usecols = lambda c: c in (time_column,) + WEATHER_COLUMNS or c in COLUMN_ALIASES
+        frames = pd.read_csv(weather, usecols=usecols, chunksize=chunk_rows)
+    elif isinstance(weather, pd.DataFrame):
+        frames = [weather if time_column in weather.columns else weather.rename_axis(time_column).reset_index()]
+    else:
+        frames = weather
+    last = None
+    for frame in frames:
+        ns, values = _frame_to_arrays(frame, time_column, timezone)
+        if len(ns) == 0:
+            continue
+        if np.any(np.diff(ns) < 0) or (last is not None and ns[0] < last):
+            raise ValueError('Weather timestamps must be in increasing order')
+        last = ns[-1]
+        yield ns, values
+
+
+def _day_bounds_ns(day, timezone: str):
+    """UTC nanoseconds of local midnight at the start and end of calendar day `day` (numpy datetime64[D])."""
+    import pandas as pd
+
+    start = pd.Timestamp(day).tz_localize(timezone)
+    end = (pd.Timestamp(day) + pd.Timedelta(days=1)).tz_localize(timezone)
+    return start.value, end.value
+
+
+def _local_day(ns: int, timezone: str):
+    import pandas as pd
+    return np.datetime64(pd.Timestamp(ns, tz='UTC').tz_convert(timezone).tz_localize(None).date(), 'D')
+
+
+def _evaluate_days(days, obs_ns, obs, model, freq, step_ns, max_gap_ns, on_gap, latitude, longitude, altitude, timezone):
+    date_strs = [str(d) for d in days]
+    solpos = get_solar_positions_for_dates(date_strs, freq=freq, latitude=latitude, longitude=longitude, altitude=altitude, timezone=timezone)
+    times = solpos.index
+    grid_ns = times.asi8
+    local_days = times.normalize().asi8
+    day_starts = np.flatnonzero(np.r_[True, local_days[1:] != local_days[:-1]])
+    bounds = np.r_[day_starts, len(times)]
+
+    gaps = gap_mask(obs_ns, grid_ns, max_gap_ns)
+    keep = np.ones(len(days), dtype=bool)
+    for k in range(len(days)):
+        if gaps[bounds[k]:bounds[k + 1]].any():
+            if on_gap != 'skip':
+                raise ValueError(f'Weather data leaves a gap of more than {max_gap_ns / 3.6e12:g} h on {date_strs[k]}; '
+                                 "pass on_gap='skip' to skip such days")
+            keep[k] = False
+
+    weather = align_weather(obs_ns, obs, grid_ns, step_ns)
+    zenith = _zenith_column(solpos).values
+    day = daylight_mask(zenith)
+    X = build_feature_matrix(times[day], zenith[day], weather['cloud_type'][day], weather['rh_percent'][day], weather['temperature_c'][day])
+    ghi = daylight_ghi(model, _as_model_input(X), day)
+    daily_kwh = _integrate_daily_kwh(ghi, times, day_starts, freq)
+
+    means = {c: np.add.reduceat(weather[c], day_starts) / np.diff(bounds) for c in WEATHER_COLUMNS}
+    liters = predict_water_yield_array(daily_kwh, means['rh_percent'])
+    for k in np.flatnonzero(keep):
+        yield {
+            'date': days[k].astype(object),
+            'cloud_type': float(means['cloud_type'][k]),
+            'rh_percent': float(means['rh_percent'][k]),
+            'temperature_c': float(means['temperature_c'][k]),
+            'solar_energy_kwh_m2': float(daily_kwh[k]),
+            'predicted_liters_per_day': float(liters[k]),
+        }
+
+
+def iter_daily_rf(
+    weather,
+    model_path: str = None,
+    freq: str = '10T',
+    latitude: float = DEFAULT_LATITUDE,
+    longitude: float = DEFAULT_LONGITUDE,
+    altitude: float = DEFAULT_ALTITUDE,
+    timezone: str = DEFAULT_TZ,
+    time_column: str = 'time',
+    chunk_rows: int = DEFAULT_WEATHER_CHUNK_ROWS,
+    max_gap: str = DEFAULT_MAX_GAP,
+    on_gap: str = 'raise',
+):
+    """Yield one result dict per local day covered by `weather`, as soon as the day is complete.
+
+    Args:
+        weather: CSV path, DataFrame, or iterable of DataFrames (see the module docstring).
+        model_path: RF model path (resolved through the model registry).
+        freq, latitude, longitude, altitude, timezone: solar grid and site, as in `run_pipeline_rf`.
+        time_column: name of the timestamp column.
+        chunk_rows: CSV rows read per chunk.
+        max_gap: largest allowed distance from a grid sample to the nearest observation.
+        on_gap: 'raise' (default) or 'skip' for days with a larger gap.
+
+    Yields:
+        dicts with keys date, cloud_type, rh_percent, temperature_c (daily means of the
+        aligned inputs), solar_energy_kwh_m2 and predicted_liters_per_day (from the daily mean RH).
+    """
+    if on_gap not in ('raise', 'skip'):
+        raise ValueError(f"on_gap must be 'raise' or 'skip', got {on_gap!r}")
+    model = _load_model(model_path)
+    step_ns = _ns(freq)
+    max_gap_ns = _ns(max_gap)
+
+    buf_ns = np.empty(0, dtype=np.int64)
+    buf = {c: np.empty(0) for c in WEATHER_COLUMNS}
+    next_day = None
+    chunks = iter_weather_chunks(weather, time_column, timezone, chunk_rows)
+    finished = False
+    while not finished:
+        try:
+            ns, values = next(chunks)
+            buf_ns = np.concatenate([buf_ns, ns])
+            buf = {c: np.concatenate([buf[c], values[c]]) for c in WEATHER_COLUMNS}
+        except StopIteration:
+            finished = True
+        if len(buf_ns) == 0:
+            continue
+        if next_day is None:
+            next_day = _local_day(int(buf_ns[0]), timezone)
+            start, _ = _day_bounds_ns(next_day, timezone)
+            if buf_ns[0] - start > max_gap_ns:
+                next_day = next_day + 1
+
+        # a day is complete once the data reaches its last grid sample (or the input has ended)
+        last_day = _local_day(int(buf_ns[-1]), timezone)
+        if finished:
+            _, end = _day_bounds_ns(last_day, timezone)
+            if end - step_ns - buf_ns[-1] > max_gap_ns:
+                last_day = last_day - 1
+        days = []
+        day = next_day
+        while day <= last_day:
+            _, end = _day_bounds_ns(day, timezone)
+            if not finished and buf_ns[-1] < end - step_ns:
+                break
+            days.append(day)
+            day = day + 1
+        if days:
+            yield from _evaluate_days(days, buf_ns, buf, model, freq, step_ns, max_gap_ns, on_gap,
+                                      latitude, longitude, altitude, timezone)
+            next_day = day
+
+        # keep what the following days still need: the observations within max_gap of
+        # the next day's start and one before them (for interpolation)
+        start, _ = _day_bounds_ns(next_day, timezone)
+        first = max(0, int(np.searchsorted(buf_ns, start - max(step_ns, max_gap_ns))) - 1)
+        buf_ns = buf_ns[first:]
+        buf = {c: v[first:] for c, v in buf.items()}
+
+
+def run_pipeline_rf_weather(weather, **kwargs):
+    """Collect `iter_daily_rf` into a pandas.DataFrame (one row per day)."""
+    import pandas as pd
+
+    columns = ['date', 'cloud_type', 'rh_percent', 'temperature_c', 'solar_energy_kwh_m2', 'predicted_liters_per_day']
+    return pd.DataFrame(list(iter_daily_rf(weather, **kwargs)), columns=columns)
@@ -0,0 +1,123 @@
+"""
+Compare scikit-learn's RandomForest predict with the array-compiled engine.
+
+For every batch size the script checks that both give bit-identical GHI (against
+the single-threaded sklearn predict), times the best of --repeat runs of each and
+reports the speedup and the crossover (the sizes at which sklearn is faster).
+With --shapes it trains synthetic forests of several (trees, depth) shapes
+instead and ends with the crossover of each.
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.scripts.benchmark_compiled_forest --model path/to/solar_predictor_model.joblib
+  python -m aeroaqua.scripts.benchmark_compiled_forest --model m.joblib --sizes 1,144,10000,100000 --repeat 5
+  python -m aeroaqua.scripts.benchmark_compiled_forest --shapes 5x12,20x8,20x12,20x15,50x12,100x8,100x15
+"""
+import argparse
+import time
+
+import numpy as np
+
+from aeroaqua.model.compiled_forest import CompiledForest
+from aeroaqua.model.registry import load_model
+
+
+def synthetic_features(n: int, seed: int = 0):
+    """Random rows spanning the ranges of the RF training features."""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Cloud Type': rng.integers(0, 11, n).astype(float),
+        'Solar Zenith Angle': rng.uniform(0, 180, n),
+        'Relative Humidity': rng.uniform(5, 100, n),
+        'Temperature': rng.uniform(-25, 40, n),
+        'Month': rng.integers(1, 13, n),
+        'Day': rng.integers(1, 29, n),
+        'Hour': rng.integers(0, 24, n),
+    })
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def train_shape(n_trees: int, max_depth: int, seed: int = 0, n_rows: int = 20_000):
+    """A single-threaded forest of the given shape fitted on synthetic rows (see `run_benchmarks.synthetic_ghi`)."""
+    from sklearn.ensemble import RandomForestRegressor
+
+    from aeroaqua.scripts.run_benchmarks import synthetic_ghi
+
+    X = synthetic_features(n_rows, seed)
+    return RandomForestRegressor(n_estimators=n_trees, max_depth=max_depth, n_jobs=1, random_state=seed).fit(X, synthetic_ghi(X))
+
+
+def compare_sizes(model, sizes, repeat: int, sklearn_jobs: int = None):
+    """Time sklearn and the compiled engine at every batch size; returns the sizes where sklearn is faster."""
+    start = time.perf_counter()
+    forest = CompiledForest.from_sklearn(model)
+    forest.predict(synthetic_features(1))  # build the traversal tables outside the timings
+    print(f'compiled {forest.n_trees} trees (max depth {forest.max_depth}, {forest.layout()} layout) in {time.perf_counter() - start:.2f}s')
+
+    X_all = synthetic_features(max(sizes))
+    jobs = model.n_jobs if sklearn_jobs is None else sklearn_jobs
+
+    print(f"{'rows':>8} {'sklearn ms':>12} {'compiled ms':>12} {'speedup':>8}  identical")
+    slower = []
+    original_jobs = model.n_jobs
+    try:
+        for n in sizes:
+            X = X_all.iloc[:n]
+            model.n_jobs = 1
+            identical = np.array_equal(model.predict(X), forest.predict(X))
+            model.n_jobs = jobs
+            t_sklearn = best_time(lambda: model.predict(X), repeat)
+            t_compiled = best_time(lambda: forest.predict(X), repeat)
+            if t_compiled > t_sklearn:
+                slower.append(n)
+            print(f'{n:8d} {t_sklearn * 1e3:12.2f} {t_compiled * 1e3:12.2f} {t_sklearn / t_compiled:7.2f}x  {identical}')
+    finally:
+        model.n_jobs = original_jobs
+
+    if slower:
+        print(f"crossover: sklearn is faster at {', '.join(str(n) for n in slower)} rows")
+    else:
+        print('crossover: none, the compiled engine is faster at every size measured')
+    return slower
+
+
+def _shape(text: str):
+    trees, _, depth = text.partition('x')
+    return int(trees), int(depth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark sklearn vs compiled RandomForest inference')
+    parser.add_argument('--model', default=None, help='Path to the joblib RF model (default: registry fallback paths)')
+    parser.add_argument('--shapes', default=None, help="Comma-separated TREESxDEPTH synthetic forests to compare instead of --model, e.g. '20x12,100x15'")
+    parser.add_argument('--sizes', default='1,10,144,1000,10000,100000', help='Comma-separated batch sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the best is kept')
+    parser.add_argument('--sklearn-jobs', type=int, default=None, help='Override the model n_jobs for the timed sklearn runs')
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    if not args.shapes:
+        compare_sizes(load_model(args.model), sizes, args.repeat, args.sklearn_jobs)
+        return
+
+    summary = []
+    for n_trees, max_depth in (_shape(s) for s in args.shapes.split(',') if s.strip()):
+        print(f'\n{n_trees} trees, max_depth={max_depth}:')
+        slower = compare_sizes(train_shape(n_trees, max_depth), sizes, args.repeat, args.sklearn_jobs)
+        summary.append((n_trees, max_depth, slower))
+    print(f"\n{'shape':>8}  sklearn faster at")
+    for n_trees, max_depth, slower in summary:
+        print(f"{n_trees:>4}x{max_depth:<3}  {', '.join(str(n) for n in slower) or '-'}")
+
+
+if __name__ == '__main__':
+    main()
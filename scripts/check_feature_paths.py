@@ -0,0 +1,118 @@
+"""
+Check that the 'array' and 'frame' RF feature paths give identical predictions.
+
+Runs `run_pipeline_rf`, `run_pipeline_rf_range`, `run_scenario_sweep` and the
+service's `run_rf_batch` once with `set_feature_path('array')` and once with
+`set_feature_path('frame')`, over dates that include both DST transitions of
+the default time zone, and compares the results for exact equality. The result
+cache is switched off so every call is evaluated.
+
+Without --model-path the benchmark suite's synthetic forest is trained into a
+temporary directory (see `aeroaqua.scripts.run_benchmarks`).
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.scripts.check_feature_paths
+  python -m aeroaqua.scripts.check_feature_paths --model-path path/to/model.joblib
+
+Exits with status 1 if any pipeline differs between the two paths.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+
+# Spring-forward and fall-back days of America/Toronto, a day next to each and two ordinary days.
+PARITY_DATES = ['2025-03-08', '2025-03-09', '2025-06-21', '2025-11-02', '2025-11-03', '2025-12-21']
+
+SCENARIOS = [
+    {'cloud_type': 0.0, 'rh_percent': 50.0, 'temperature_c': 20.0},
+    {'cloud_type': 3.0, 'rh_percent': 72.5, 'temperature_c': -4.0},
+]
+
+
+def _frame_equal(a, b) -> bool:
+    return list(a.columns) == list(b.columns) and a.equals(b)
+
+
+def _rf(model_path):
+    from aeroaqua.pipelines.pipeline_rf import run_pipeline_rf
+
+    return [run_pipeline_rf(date_str=d, model_path=model_path, **s) for d in PARITY_DATES for s in SCENARIOS]
+
+
+def _rf_range(model_path):
+    from aeroaqua.pipelines.pipeline_rf import run_pipeline_rf_range
+
+    return [run_pipeline_rf_range(dates=PARITY_DATES, model_path=model_path, **s) for s in SCENARIOS]
+
+
+def _sweep(model_path):
+    from aeroaqua.pipelines.sweep import run_scenario_sweep
+
+    return [run_scenario_sweep(
+        PARITY_DATES, cloud_types=(0.0, 3.0), rh_values=(50.0, 72.5), temperatures=(-4.0, 20.0),
+        model_path=model_path, chunk_rows=500,
+    )]
+
+
+def _rf_batch(model_path):
+    from aeroaqua.service.batch import run_rf_batch
+
+    return run_rf_batch([dict(s, date_str=d) for d in PARITY_DATES for s in SCENARIOS], model_path=model_path)
+
+
+CHECKS = {
+    'run_pipeline_rf': _rf,
+    'run_pipeline_rf_range': _rf_range,
+    'run_scenario_sweep': _sweep,
+    'run_rf_batch': _rf_batch,
+}
+
+
+def compare(name: str, model_path: str) -> bool:
+    """Run check `name` on both feature paths; True when every result is exactly equal."""
+    from aeroaqua.pipelines.pipeline_rf import set_feature_path
+
+    results = {}
+    try:
+        for path in ('array', 'frame'):
+            set_feature_path(path)
+            results[path] = CHECKS[name](model_path)
+    finally:
+        set_feature_path('array')
+    array, frame = results['array'], results['frame']
+    if len(array) != len(frame):
+        return False
+    for a, b in zip(array, frame):
+        if isinstance(a, Exception) or isinstance(b, Exception):
+            return False
+        if not (_frame_equal(a, b) if hasattr(a, 'columns') else a == b):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the 'array' and 'frame' RF feature paths")
+    parser.add_argument('--model-path', help='RF model (default: a synthetic forest trained in a temporary directory)')
+    args = parser.parse_args()
+
+    from aeroaqua.pipelines.result_cache import using_result_cache
+
+    with tempfile.TemporaryDirectory() as workdir, using_result_cache(None):
+        model_path = args.model_path
+        if model_path is None:
+            from aeroaqua.scripts.run_benchmarks import train_synthetic_forest
+            model_path = train_synthetic_forest(os.path.join(workdir, 'synthetic_forest.joblib'))
+
+        failed = False
+        for name in CHECKS:
+            ok = compare(name, model_path)
+            failed |= not ok
+            print(f"{'ok  ' if ok else 'FAIL'} {name}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Check package import times against the tracked budget.
+
+Each module is imported in a fresh interpreter with `python -X importtime`; the
+cumulative time reported for the module is compared with IMPORT_BUDGET_US, and
+the heavy dependencies in DEFERRED_MODULES must not have been imported yet.
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.scripts.check_import_time
+  python -m aeroaqua.scripts.check_import_time --repeat 5
+
+Exits with status 1 if any module is over budget or imports a deferred dependency.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+
+# Cumulative import time budget per module, in microseconds (best of --repeat runs).
+# Measured at ~1 ms for the package roots and ~110 ms (mostly numpy) for the
+# pipeline modules; budgets leave headroom for slower machines.
+IMPORT_BUDGET_US = {
+    'aeroaqua.solar': 50_000,
+    'aeroaqua.energy': 50_000,
+    'aeroaqua.model': 50_000,
+    'aeroaqua.pipelines': 50_000,
+    'aeroaqua.model.baselinesorption': 300_000,
+    'aeroaqua.pipelines.pipeline_rf': 300_000,
+    'aeroaqua.pipelines.pipeline_pvlib': 300_000,
+}
+
+# Dependencies that must only load when the stage that needs them runs.
+DEFERRED_MODULES = ['pandas', 'pvlib', 'sklearn', 'joblib']
+
+_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+(.+)$')
+
+
+def measure(module: str, env=None):
+    """Return (cumulative_us, loaded_deferred_modules) for importing `module` in a fresh interpreter."""
+    code = (
+        f'import {module}, sys; '
+        f'print(",".join(m for m in {DEFERRED_MODULES!r} if m in sys.modules))'
+    )
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f'Importing {module} failed:\n{proc.stderr}')
+
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        m = _LINE.match(line)
+        if m and m.group(3).strip() == module:
+            cumulative = int(m.group(2))
+    loaded = [m for m in proc.stdout.strip().split(',') if m]
+    return cumulative, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check import times against the tracked budget')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per module; the best time is kept')
+    args = parser.parse_args()
+
+    # make `import aeroaqua` resolve to this checkout in the child interpreters
+    package_parent = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in [package_parent, env.get('PYTHONPATH')] if p)
+
+    failed = False
+    for module, budget in IMPORT_BUDGET_US.items():
+        runs = [measure(module, env) for _ in range(max(1, args.repeat))]
+        best = min(r[0] for r in runs)
+        loaded = sorted(set(m for r in runs for m in r[1]))
+        ok = best <= budget and not loaded
+        failed |= not ok
+        note = f' deferred modules imported: {", ".join(loaded)}' if loaded else ''
+        print(f"{'ok  ' if ok else 'FAIL'} {module:40s} {best / 1000:8.1f} ms (budget {budget / 1000:.0f} ms){note}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
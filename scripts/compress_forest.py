@@ -0,0 +1,161 @@
+"""
+Search for a smaller GHI forest within an error budget.
+
+Candidates combine tree-count pruning (greedy tree order, see
+`aeroaqua.model.compress`), depth / minimum-leaf pruning and float32 / float16
+quantization. Every candidate is written as a compiled ``.npz`` and reported
+with file size, load time, predict latency (one day of 10-minute daylight rows
+and the whole evaluation batch) and RMSE against the original forest.
+
+Evaluation rows are daylight rows (zenith < 90 degrees, the only ones the
+pipelines predict) sampled from --csv, or synthetic rows without it. Half of
+them rank the trees, the other half measure the RMSE. The smallest candidate
+within --budget (RMSE in W/m^2) is written to --out; pass that path as
+`model_path` (or to `load_model`) and the registry loads it as a compiled forest.
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.scripts.compress_forest --model path/to/solar_predictor_model.joblib --csv data.csv
+  python -m aeroaqua.scripts.compress_forest --model m.joblib --budget 2 --trees 100,40,20 --depths none,12,10 --dtypes float32,float16
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from aeroaqua.model.compiled_forest import CompiledForest
+from aeroaqua.model.compress import QUANTIZE_DTYPES, compress_forest, greedy_tree_order
+from aeroaqua.model.ingest import INPUT_FEATURES
+from aeroaqua.model.registry import resolve_model_path
+from aeroaqua.model.train_rf_model import forest_to_arrays
+from aeroaqua.pipelines.pipeline_rf import NIGHT_ZENITH
+
+
+DAY_ROWS = 144
+
+
+def evaluation_rows(csv_path: str, n: int, seed: int):
+    """(n, 7) float32 daylight feature rows from the training CSV, or synthetic ones."""
+    if csv_path:
+        from aeroaqua.model.ingest import load_training_arrays
+        X, _ = load_training_arrays(csv_path, max_rows=4 * n, sample='reservoir', seed=seed)
+    else:
+        from aeroaqua.scripts.benchmark_compiled_forest import synthetic_features
+        X = synthetic_features(4 * n, seed)[INPUT_FEATURES].to_numpy(dtype=np.float32)
+    X = X[X[:, INPUT_FEATURES.index('Solar Zenith Angle')] < NIGHT_ZENITH]
+    return np.ascontiguousarray(X[:n])
+
+
+def best_time(fn, repeat: int) -> float:
+    best = float('inf')
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure(path: str, X_report, reference, repeat: int) -> dict:
+    load_s = best_time(lambda: CompiledForest.load(path), repeat)
+    forest = CompiledForest.load(path)
+    prediction = forest.predict(X_report)  # also builds the traversal tables
+    return {
+        'file_bytes': os.path.getsize(path),
+        'load_ms': load_s * 1e3,
+        'day_ms': best_time(lambda: forest.predict(X_report[:DAY_ROWS]), repeat) * 1e3,
+        'batch_ms': best_time(lambda: forest.predict(X_report), repeat) * 1e3,
+        'rmse': float(np.sqrt(np.mean((prediction - reference) ** 2))),
+        'n_trees': forest.n_trees,
+        'max_depth': forest.max_depth,
+        'nodes': len(forest.feature),
+    }
+
+
+def _parse_list(text: str, cast):
+    return [None if s.strip().lower() in ('none', '0') else cast(s) for s in text.split(',') if s.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compress the GHI forest against an RMSE budget')
+    parser.add_argument('--model', default=None, help='joblib model or compiled .npz (default: registry fallback paths)')
+    parser.add_argument('--csv', default=None, help='Training CSV to sample evaluation rows from (default: synthetic rows)')
+    parser.add_argument('--rows', type=int, default=20000, help='Evaluation rows (half rank the trees, half measure RMSE)')
+    parser.add_argument('--budget', type=float, default=5.0, help='Largest acceptable RMSE vs the original forest, W/m^2')
+    parser.add_argument('--trees', default='100,50,25,10', help='Tree counts to try')
+    parser.add_argument('--depths', default='none,12,10,8', help="Depth limits to try ('none' keeps the trees whole)")
+    parser.add_argument('--min-leaf', default='none', help='Minimum training samples per leaf to try (needs an export with sample counts)')
+    parser.add_argument('--dtypes', default=','.join(QUANTIZE_DTYPES), help='Threshold/value storage dtypes to try')
+    parser.add_argument('--repeat', type=int, default=3, help='Timing runs per measurement; the best is kept')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help='Path for the chosen artifact (default: <model>_compact.npz)')
+    args = parser.parse_args()
+
+    import pandas as pd
+
+    model_path = resolve_model_path(args.model)
+    if not model_path:
+        raise SystemExit('Model not found; pass --model')
+    if model_path.endswith('.npz'):
+        with np.load(model_path, allow_pickle=False) as data:
+            arrays = {k: data[k] for k in data.files}
+        original_load_s = best_time(lambda: CompiledForest.load(model_path), args.repeat)
+        original = CompiledForest.from_arrays(arrays)
+        model = original
+    else:
+        import joblib
+
+        original_load_s = best_time(lambda: joblib.load(model_path), args.repeat)
+        model = joblib.load(model_path)
+        arrays = forest_to_arrays(model)
+        original = CompiledForest.from_arrays(arrays)
+
+    X = evaluation_rows(args.csv, args.rows, args.seed)
+    X_rank, X_report = X[:len(X) // 2], X[len(X) // 2:]
+    reference = original.predict(X_report)
+    X_frame = pd.DataFrame(X_report, columns=INPUT_FEATURES)
+    original_day_s = best_time(lambda: model.predict(X_frame.iloc[:DAY_ROWS]), args.repeat)
+    original_batch_s = best_time(lambda: model.predict(X_frame), args.repeat)
+    order = greedy_tree_order(original.apply(X_rank), original.predict(X_rank))
+    n_trees = original.n_trees
+    print(f'{model_path}: {n_trees} trees, max depth {original.max_depth}, {len(original.feature)} nodes, '
+          f'{os.path.getsize(model_path) / 2**20:.1f} MiB, load {original_load_s * 1e3:.0f} ms, '
+          f'predict {original_day_s * 1e3:.2f} ms per day / {original_batch_s * 1e3:.0f} ms per batch; '
+          f'{len(X_rank)} ranking / {len(X_report)} report rows')
+
+    candidates = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for trees in _parse_list(args.trees, int):
+            trees = min(trees or n_trees, n_trees)
+            for depth in _parse_list(args.depths, int):
+                for min_leaf in _parse_list(args.min_leaf, int):
+                    for dtype in [d.strip() for d in args.dtypes.split(',') if d.strip()]:
+                        compact = compress_forest(arrays, order[:trees] if trees < n_trees else None, depth, min_leaf, dtype)
+                        path = os.path.join(workdir, f'candidate_{len(candidates)}.npz')
+                        np.savez(path, **compact)
+                        row = measure(path, X_report, reference, args.repeat)
+                        row.update({'trees': trees, 'depth': depth, 'min_leaf': min_leaf, 'dtype': dtype, 'path': path})
+                        candidates.append(row)
+
+        print(f"\n{'trees':>5} {'depth':>5} {'minleaf':>7} {'dtype':>7} {'nodes':>9} {'MiB':>7} {'load ms':>8} "
+              f"{'day ms':>7} {'batch ms':>8} {'RMSE W/m2':>10}")
+        for row in candidates:
+            print(f"{row['trees']:5d} {str(row['depth'] or '-'):>5} {str(row['min_leaf'] or '-'):>7} {row['dtype']:>7} "
+                  f"{row['nodes']:9d} {row['file_bytes'] / 2**20:7.2f} {row['load_ms']:8.1f} {row['day_ms']:7.2f} "
+                  f"{row['batch_ms']:8.1f} {row['rmse']:10.3f}")
+
+        within = [row for row in candidates if row['rmse'] <= args.budget]
+        if not within:
+            print(f'\nNo candidate within an RMSE of {args.budget} W/m^2; nothing written.')
+            return
+        chosen = min(within, key=lambda row: (row['file_bytes'], row['day_ms']))
+        out = args.out or os.path.splitext(model_path)[0] + '_compact.npz'
+        shutil.copyfile(chosen['path'], out)
+
+    print(f"\nChosen: {chosen['trees']} trees, depth {chosen['depth'] or 'full'}, min leaf {chosen['min_leaf'] or '-'}, "
+          f"{chosen['dtype']}: {chosen['file_bytes'] / 2**20:.2f} MiB, RMSE {chosen['rmse']:.3f} W/m^2 -> {out}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,12 @@
 """
 Generate a grid of model inputs (Season, Solar Energy, RH) and predict water yield.
 
-Creates a CSV file `model_grid_predictions.csv` with columns:
+Writes `model_grid_predictions.csv` (or Parquet / per-column .npy output, see
+`aeroaqua.pipelines.sinks`) with columns:
   - Season
   - Solar_Energy_kwh_m2
   - RH_Percent
+  - any extra axes (--axis NAME=SPEC, --site LAT,LON adds latitude/longitude)
   - Predicted Water (L/day)
 
 Usage examples:
@@ -14,158 +16,170 @@ Usage examples:
   # Use a scikit-learn joblib model that accepts feature columns (attempts to align columns):
   python -m aeroaqua.scripts.generate_model_grid_predictions --model-path path/to/my_model.joblib --output model_grid_predictions.csv
 
+  # Spread joblib-model predictions over 4 worker processes, 50k rows per work unit:
+  python -m aeroaqua.scripts.generate_model_grid_predictions --model-path path/to/my_model.joblib --workers 4 --chunk-rows 50000
+
+  # One Parquet file per season:
+  python -m aeroaqua.scripts.generate_model_grid_predictions --output grid_parquet --format parquet --partition season
+
+  # A finer grid with temperature and two sites (42 million points, per-column .npy output):
+  python -m aeroaqua.scripts.generate_model_grid_predictions --solar 0:10:0.01 --rh 0:100:0.5 --axis Temperature=-10:40:2 \
+      --site 43.65,-79.38 --site 45.50,-73.57 --output grid_npy --chunk-rows 4000000
+
 Notes:
-  - If you pass a joblib model the script will try to align feature names using
-    the model's `feature_names_in_` attribute if present. It will also one-hot encode
-    the `Season` column (prefix 'Season_') when needed.
+  - Axis specs are 'start:stop:step' (inclusive) or comma-separated values. Points
+    are ordered like nested loops over the axes in command-line order (Season,
+    solar, RH, then --axis and --site axes), the first axis varying slowest.
+  - If you pass a joblib model, its `feature_names_in_` are resolved once against
+    the grid columns into a feature plan (`aeroaqua.model.feature_plan`): exact and
+    case-insensitive names, solar/RH name variants and one-hot `Season_<value>`
+    columns. Features no grid column provides are reported and the script stops;
+    give them a value with --feature NAME=VALUE or add them as an --axis. This
+    includes one-hot columns for seasons left out of --seasons: pass e.g.
+    --feature Season_Winter=0 to keep them as all-zero indicators.
   - If no model is provided the script uses the project's baseline linear regression
-    implemented in `aeroaqua.model.baselinesorption.predict_water_yield`.
+    implemented in `aeroaqua.model.baselinesorption`, evaluated on broadcast
+    coordinate blocks (see `aeroaqua.pipelines.grid`).
+  - The grid is generated, predicted and written in chunks of at most `--chunk-rows`
+    points, so memory use does not depend on the grid size.
 """
 from __future__ import annotations
 
 import argparse
-import itertools
 import os
 from typing import List
 
 import numpy as np
 import pandas as pd
 
+from aeroaqua.model.feature_plan import UnresolvedFeaturesError, get_feature_plan, schema_of
+from aeroaqua.pipelines.grid import Grid, baseline_predictor, evaluate_grid, parse_axis
+from aeroaqua.pipelines.sinks import SINK_FORMATS, open_sink
 
-def build_grid(solar_min=1.0, solar_max=7.0, solar_step=0.25, rh_min=50, rh_max=75):
-    solar_vals = np.round(np.arange(solar_min, solar_max + 1e-12, solar_step), 6)
-    rh_vals = np.arange(rh_min, rh_max + 1)
-    seasons = ['Summer', 'Spring', 'Fall', 'Winter']
 
-    rows = []
-    for season, s, rh in itertools.product(seasons, solar_vals, rh_vals):
-        rows.append({'Season': season, 'Solar_Energy_kwh_m2': float(s), 'RH_Percent': float(rh)})
+SEASONS = ['Summer', 'Spring', 'Fall', 'Winter']
 
-    df = pd.DataFrame(rows)
-    return df
+OUTPUT_COLUMN = 'Predicted Water (L/day)'
 
 
-def prepare_features_for_model(df: pd.DataFrame, feature_names: List[str]) -> pd.DataFrame:
-    """Attempt to produce a DataFrame with columns in feature_names from the base df.
+def build_axes(seasons=SEASONS, solar: str = '1:7:0.25', rh: str = '50:75:1', extra_axes: dict = None, sites=None) -> dict:
+    """Ordered grid axes: Season, solar energy, RH, then `extra_axes` and an optional (latitude, longitude) site axis."""
+    axes = {
+        'Season': list(seasons),
+        'Solar_Energy_kwh_m2': parse_axis(solar),
+        'RH_Percent': parse_axis(rh),
+    }
+    axes.update(extra_axes or {})
+    if sites:
+        axes['site'] = {'latitude': [float(lat) for lat, _ in sites], 'longitude': [float(lon) for _, lon in sites]}
+    return axes
+
 
-    This will:
-      - create one-hot columns for Season (prefix 'Season_')
-      - try to map common name variants for solar energy and RH
-      - fill missing feature columns with zeros
+def build_grid(**axes_kwargs) -> pd.DataFrame:
+    """The whole grid as one DataFrame (see `build_axes`); use `Grid.chunks` for large grids."""
+    grid = Grid(build_axes(**axes_kwargs))
+    return pd.DataFrame(next(grid.chunks(grid.size)).columns())
+
+
+def prepare_features_for_model(df: pd.DataFrame, feature_names: List[str], constants: dict = None) -> pd.DataFrame:
+    """Build a DataFrame with columns `feature_names` from the base df through a feature plan.
+
+    See `aeroaqua.model.feature_plan` for the resolution rules (exact and
+    case-insensitive names, solar/RH name variants, 'Season_<value>' one-hot
+    columns, explicit `constants`); unresolved features raise
+    `UnresolvedFeaturesError` instead of being filled with zeros.
     """
-    df2 = df.copy()
+    plan = get_feature_plan(feature_names, schema_of(df), constants=constants)
+    return pd.DataFrame(plan.apply({c: df[c].to_numpy() for c in df.columns}), columns=list(plan.feature_names), index=df.index)
 
-    # create one-hot Season columns
-    season_dummies = pd.get_dummies(df2['Season'], prefix='Season')
-    df2 = pd.concat([df2, season_dummies], axis=1)
 
-    # potential name variants mapping
-    col_mapping = {
-        'solar_energy_kwh_m2': ['Solar_Energy_kwh_m2', 'Solar_Energy_kWhr_m2', 'Solar_Energy_kWh_m2', 'solar_energy_kwh_m2', 'SolarEnergy_kwh_m2'],
-        'rh_percent': ['RH_Percent', 'Relative Humidity', 'rh_percent', 'RH']
-    }
+def model_feature_names(model) -> List[str]:
+    """The model's `feature_names_in_`, or the standard two-feature ordering (Solar_Energy_kwh_m2, RH_Percent)."""
+    if hasattr(model, 'feature_names_in_'):
+        return [str(name) for name in model.feature_names_in_]
+    n_features = getattr(model, 'n_features_in_', 2)
+    if n_features != 2:
+        raise ValueError(f'the model has {n_features} unnamed features; only two-feature (solar energy, RH) models can be mapped without feature names')
+    return ['Solar_Energy_kwh_m2', 'RH_Percent']
 
-    available_cols = {c.lower(): c for c in df2.columns}
-
-    out = {}
-    for fname in feature_names:
-        # exact match
-        if fname in df2.columns:
-            out[fname] = df2[fname]
-            continue
-
-        # case-insensitive match
-        if fname.lower() in available_cols:
-            out[fname] = df2[available_cols[fname.lower()]]
-            continue
-
-        # season one-hot pattern
-        if fname.startswith('Season') and fname in df2.columns:
-            out[fname] = df2[fname]
-            continue
-
-        # map common solar/rh variants
-        mapped = None
-        for key, variants in col_mapping.items():
-            for v in variants:
-                if v == fname or v.lower() == fname.lower():
-                    # pick the canonical column from df2 if present
-                    for cand in variants:
-                        if cand in df2.columns:
-                            mapped = cand
-                            break
-                    if mapped:
-                        break
-            if mapped:
-                out[fname] = df2[mapped]
-                break
-
-        if mapped:
-            continue
-
-        # As a last resort, if feature expects Season_* but column missing, create zeros
-        if fname.startswith('Season_'):
-            out[fname] = pd.Series(0, index=df2.index)
-            continue
-
-        # Missing numeric feature -> fill with zeros and warn
-        out[fname] = pd.Series(0.0, index=df2.index)
-
-    X = pd.DataFrame(out)
-    # Ensure numeric dtype for prediction
-    for c in X.columns:
-        if X[c].dtype == object:
-            try:
-                X[c] = pd.to_numeric(X[c])
-            except Exception:
-                # leave as-is; some models may accept categorical strings (rare)
-                pass
-    return X
+
+def _named_axis(text: str):
+    name, sep, spec = text.partition('=')
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f'expected NAME=SPEC, got {text!r}')
+    return name.strip(), parse_axis(spec)
+
+
+def _constant(text: str):
+    name, sep, value = text.partition('=')
+    try:
+        return name.strip(), float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected NAME=VALUE with a numeric value, got {text!r}')
+
+
+def _site(text: str):
+    try:
+        lat, lon = (float(v) for v in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'expected LAT,LON, got {text!r}')
+    return lat, lon
 
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--model-path', help='Path to joblib model (optional). If omitted, uses internal baseline predictor.')
-    parser.add_argument('--output', default='model_grid_predictions.csv', help='Output CSV file path')
+    parser.add_argument('--output', default='model_grid_predictions.csv', help='Output file (csv, parquet) or directory (npy, partitioned output)')
+    parser.add_argument('--format', choices=SINK_FORMATS, default=None, help='Output format (default: from the --output suffix)')
+    parser.add_argument('--partition', choices=['season'], default=None, help='Write one output per season into the --output directory')
+    parser.add_argument('--seasons', default=','.join(SEASONS), help='Comma-separated seasons')
+    parser.add_argument('--solar', default='1:7:0.25', help="Solar energy axis in kWh/m^2 ('start:stop:step' or list)")
+    parser.add_argument('--rh', default='50:75:1', help="RH axis in percent ('start:stop:step' or list)")
+    parser.add_argument('--axis', type=_named_axis, action='append', default=[], metavar='NAME=SPEC', help='Extra grid axis, e.g. Temperature=-10:40:5 (repeatable)')
+    parser.add_argument('--site', type=_site, action='append', default=[], metavar='LAT,LON', help='Add a site axis with latitude/longitude columns (repeatable)')
+    parser.add_argument('--feature', type=_constant, action='append', default=[], metavar='NAME=VALUE', help='Constant value for a model feature that no grid column provides (repeatable)')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for joblib-model predictions (default: 1, inline)')
+    parser.add_argument('--chunk-rows', type=int, default=100_000, help='Grid points generated, predicted and written at a time')
     args = parser.parse_args()
 
-    df = build_grid()
+    grid = Grid(build_axes([s.strip() for s in args.seasons.split(',') if s.strip()], args.solar, args.rh, dict(args.axis), args.site))
+    chunk_rows = args.chunk_rows
 
     if args.model_path:
-        # try to load joblib model and predict
+        from aeroaqua.model.registry import load_model, model_registry
+
+        model = load_model(args.model_path)
+        # resolved once per (model, grid schema) into a column-index plan applied to every chunk
         try:
-            import joblib
-        except Exception as e:
-            raise RuntimeError('joblib is required to load a saved model. Install scikit-learn/joblib.') from e
-
-        model = joblib.load(args.model_path)
-        # try to infer feature names
-        feature_names = None
-        if hasattr(model, 'feature_names_in_'):
-            feature_names = list(model.feature_names_in_)
-        elif hasattr(model, 'n_features_in_') and model.n_features_in_ == 2:
-            # assume standard two-feature ordering: Solar_Energy_kwh_m2, RH_Percent
-            feature_names = ['Solar_Energy_kwh_m2', 'RH_Percent']
+            plan = get_feature_plan(model_feature_names(model), grid.schema(), model_key=model_registry.model_hash(args.model_path), constants=dict(args.feature))
+        except UnresolvedFeaturesError as e:
+            raise SystemExit(str(e))
+        print('Model features:\n  ' + '\n  '.join(plan.describe()))
+
+        if args.workers > 1:
+            from aeroaqua.pipelines.executor import ProgressReporter, iter_parallel_predict
+            # chunks are walked twice (features here, output columns in evaluate_grid), in the same order
+            predictions = iter_parallel_predict(
+                args.model_path, (plan.apply(chunk.coords, shape=chunk.shape) for chunk in grid.chunks(chunk_rows)), total=grid.chunk_count(chunk_rows),
+                workers=args.workers, progress=ProgressReporter('Predicting chunks'),
+            )
+            predict = lambda chunk: next(predictions)
         else:
-            # fallback: attempt common names
-            feature_names = ['Solar_Energy_kwh_m2', 'RH_Percent']
-
-        X = prepare_features_for_model(df, feature_names)
-        preds = model.predict(X)
-        df['Predicted Water (L/day)'] = preds
+            predict = lambda chunk: plan.predict(model, chunk.coords, shape=chunk.shape)
     else:
         # use baseline predictor
         try:
-            from aeroaqua.model.baselinesorption import predict_water_yield
+            predict = baseline_predictor('Solar_Energy_kwh_m2', 'RH_Percent')
         except Exception as e:
             raise RuntimeError('Could not import baseline predictor from aeroaqua.model.baselinesorption') from e
 
-        df['Predicted Water (L/day)'] = df.apply(lambda r: predict_water_yield(r['Solar_Energy_kwh_m2'], r['RH_Percent']), axis=1)
-
-    # Persist CSV
+    # Persist each chunk as soon as it is predicted
     out_path = args.output
-    df.to_csv(out_path, index=False)
-    print(f'Wrote predictions to: {os.path.abspath(out_path)} (rows={len(df)})')
+    # axis values are known up front, so string columns get their final width before the first chunk
+    with open_sink(out_path, format=args.format, partition_by=args.partition, dtypes=grid.schema()) as sink:
+        for columns in evaluate_grid(grid, predict, chunk_rows, output_column=OUTPUT_COLUMN):
+            sink.write(columns)
+    print(f'Wrote predictions to: {os.path.abspath(out_path)} (rows={sink.rows})')
 
 
 if __name__ == '__main__':
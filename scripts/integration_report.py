@@ -0,0 +1,125 @@
+"""
+Accuracy-versus-cost report for the daily energy integration schemes.
+
+For representative Toronto days the script computes a 1-minute rectangle
+reference and reports, for every scheme, how many GHI evaluations (SPA +
+model calls) it needs to stay within --budget (default 0.5%) of it:
+
+- fixed-step schemes (rectangle, trapezoid, simpson): the coarsest step in
+  --freqs that meets the budget;
+- adaptive: one run with a relative tolerance of half the budget. The script
+  exits with status 1 if any day misses that tolerance.
+
+Clear-sky GHI is always reported; RF-predicted GHI is added when a model is
+found (--model or the registry fallback paths).
+
+The fixed-step cells are chosen against the reference, which no production run
+has, so they are a lower bound on the evaluations a fixed step needs. The
+adaptive scheme picks its samples without it and bounds its own error, which
+costs more evaluations than that lower bound (measured costs in
+`aeroaqua.energy.integration`).
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.scripts.integration_report
+  python -m aeroaqua.scripts.integration_report --model path/to/solar_predictor_model.joblib --dates 2025-06-21,2025-12-21
+"""
+import argparse
+
+from aeroaqua.solar import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
+from aeroaqua.energy.integration import clearsky_ghi_function, integrate_day
+
+
+REPORT_DATES = ['2025-03-20', '2025-06-21', '2025-09-22', '2025-11-04', '2025-12-21', '2025-03-09']
+FIXED_FREQS = ['120T', '60T', '30T', '20T', '15T', '10T', '5T', '2T', '1T']
+
+
+def coarsest_within(ghi_fn, date_str: str, method: str, reference: float, budget: float, freqs):
+    """Cheapest `freqs` entry whose result is within `budget` of `reference` (None if none is)."""
+    for freq in freqs:
+        result = integrate_day(ghi_fn, date_str, DEFAULT_TZ, method=method, freq=freq)
+        error = result['solar_energy_kwh_m2'] / reference - 1 if reference else 0.0
+        if abs(error) <= budget:
+            return freq, result['evaluations'], error
+    return None, None, None
+
+
+def report_rows(name: str, ghi_fn, dates, budget: float, freqs):
+    rows = []
+    for date_str in dates:
+        reference = integrate_day(ghi_fn, date_str, DEFAULT_TZ, method='rectangle', freq='1T')
+        ref_kwh = reference['solar_energy_kwh_m2']
+        row = {'source': name, 'date': date_str, 'reference_kwh_m2': ref_kwh, 'reference_evals': reference['evaluations']}
+
+        default = integrate_day(ghi_fn, date_str, DEFAULT_TZ, method='rectangle', freq='10T')
+        row['rectangle_10T'] = (default['evaluations'], default['solar_energy_kwh_m2'] / ref_kwh - 1 if ref_kwh else 0.0)
+
+        for method in ('rectangle', 'trapezoid', 'simpson'):
+            freq, evals, error = coarsest_within(ghi_fn, date_str, method, ref_kwh, budget, freqs)
+            row[method] = (evals, error, freq)
+
+        adaptive = integrate_day(ghi_fn, date_str, DEFAULT_TZ, method='adaptive', tol_kwh=None, rel_tol=budget / 2)
+        row['adaptive'] = (adaptive['evaluations'], adaptive['solar_energy_kwh_m2'] / ref_kwh - 1 if ref_kwh else 0.0, None)
+        rows.append(row)
+    return rows
+
+
+def _cell(entry) -> str:
+    evals, error = entry[0], entry[1]
+    if evals is None:
+        return 'not met'
+    step = f' @{entry[2]}' if len(entry) > 2 and entry[2] else ''
+    return f'{evals}{step} ({error * 100:+.3f}%)'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluations needed per integration scheme to stay within a budget of a 1-minute reference')
+    parser.add_argument('--dates', default=','.join(REPORT_DATES), help='Comma-separated dates (Toronto local days)')
+    parser.add_argument('--budget', type=float, default=0.005, help='Relative error budget (default: 0.005 = 0.5%%)')
+    parser.add_argument('--freqs', default=','.join(FIXED_FREQS), help='Candidate steps for the fixed schemes, coarsest first')
+    parser.add_argument('--model', default=None, help='RF model path (default: registry fallback paths)')
+    parser.add_argument('--cloud', type=float, default=0.0)
+    parser.add_argument('--rh', type=float, default=50.0)
+    parser.add_argument('--temp', type=float, default=20.0)
+    args = parser.parse_args()
+
+    dates = [d.strip() for d in args.dates.split(',') if d.strip()]
+    freqs = [f.strip() for f in args.freqs.split(',') if f.strip()]
+
+    sources = [('clear-sky', clearsky_ghi_function(DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ))]
+    try:
+        from aeroaqua.model.registry import load_model
+        from aeroaqua.pipelines.pipeline_rf import rf_ghi_function
+
+        model = load_model(args.model)
+        sources.append(('rf', rf_ghi_function(model, args.cloud, args.rh, args.temp, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE)))
+    except FileNotFoundError:
+        print('RF model not found; reporting clear-sky GHI only.\n')
+
+    print(f'Evaluations needed to stay within {args.budget * 100:.2f}% of a 1-minute rectangle reference')
+    print('(cells: evaluations [@step] (error vs reference); fixed-step cells are the coarsest step that met the')
+    print(' budget for that day, chosen against the reference, while adaptive picks its samples without it)\n')
+    print('| source | date | reference kWh/m^2 | rectangle 10T (current) | rectangle | trapezoid | simpson | adaptive |')
+    print('|---|---|---|---|---|---|---|---|')
+    totals = {}
+    missed = []
+    for name, ghi_fn in sources:
+        for row in report_rows(name, ghi_fn, dates, args.budget, freqs):
+            if abs(row['adaptive'][1]) > args.budget / 2:
+                missed.append(f"{row['source']} {row['date']}")
+            print(f"| {row['source']} | {row['date']} | {row['reference_kwh_m2']:.4f} | {_cell(row['rectangle_10T'])} | "
+                  f"{_cell(row['rectangle'])} | {_cell(row['trapezoid'])} | {_cell(row['simpson'])} | {_cell(row['adaptive'])} |")
+            for key in ('rectangle_10T', 'rectangle', 'trapezoid', 'simpson', 'adaptive'):
+                evals = row[key][0]
+                if evals is not None:
+                    totals.setdefault((name, key), []).append(evals)
+
+    print('\nMean evaluations per day:')
+    for (name, key), evals in totals.items():
+        print(f'  {name:10s} {key:14s} {sum(evals) / len(evals):8.1f}')
+
+    if missed:
+        raise SystemExit(f'adaptive missed its {args.budget / 2 * 100:.3f}% tolerance on: ' + ', '.join(missed))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,410 @@
+"""
+Benchmark every stage and both pipelines against a stored baseline.
+
+The suite needs no external data: the RF benchmarks use a small forest trained
+on synthetic rows with a fixed seed (written to a temporary directory), and all
+inputs are fixed. Each benchmark is timed --repeat times; every timed run
+repeats the call enough times to last at least --min-time seconds. The median
+and best per-call times are recorded and the best is compared, being the least
+sensitive to other load on the machine. Benchmarks named ``*.cold`` clear the
+solar position cache before each call; the on-disk solar tier is always off.
+
+Results are written as JSON (--out) and compared with the baseline (--baseline,
+default `scripts/benchmark_baseline.json` next to this script). A benchmark
+whose best time is more than --threshold slower than its baseline is reported
+as a regression and the script exits with status 1. The default threshold (40%)
+sits above the run-to-run spread seen on shared single-core machines; lower it
+on a quiet, dedicated one. Refresh the baseline after an intended change with
+--update-baseline. Baselines are machine-specific, so compare runs from the
+same machine.
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.scripts.run_benchmarks
+  python -m aeroaqua.scripts.run_benchmarks --filter rf. --repeat 9 --threshold 0.15 --out bench.json
+  python -m aeroaqua.scripts.run_benchmarks --update-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+DEFAULT_THRESHOLD = 0.4
+PREDICT_SIZES = (1, 144, 10_000, 100_000)
+BULK_ROWS = 100_000
+BENCH_DATE = '2025-06-21'
+
+BENCHMARKS = {}
+
+
+def benchmark(name: str):
+    """Register `setup(ctx) -> callable` under `name`; the returned callable is what gets timed."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+class Context:
+    """Shared fixtures: a temporary directory and the synthetic forest saved in it."""
+
+    def __init__(self, workdir: str, seed: int = 0):
+        self.workdir = workdir
+        self.seed = seed
+        self._model_path = None
+
+    @property
+    def model_path(self) -> str:
+        if self._model_path is None:
+            self._model_path = train_synthetic_forest(os.path.join(self.workdir, 'synthetic_forest.joblib'), self.seed)
+        return self._model_path
+
+
+def synthetic_ghi(X) -> np.ndarray:
+    """Plausible GHI for synthetic rows: a clear-sky shape dimmed by cloud type and humidity."""
+    cos_zenith = np.clip(np.cos(np.radians(X['Solar Zenith Angle'].to_numpy())), 0.0, None)
+    clouds = 1.0 - 0.07 * X['Cloud Type'].to_numpy()
+    humidity = 1.0 - 0.002 * X['Relative Humidity'].to_numpy()
+    return 1000.0 * cos_zenith ** 1.15 * clouds * humidity
+
+
+def train_synthetic_forest(path: str, seed: int = 0, n_rows: int = 20_000) -> str:
+    """Fit a 20-tree, depth-12 forest on synthetic rows and save it with joblib."""
+    import joblib
+    from sklearn.ensemble import RandomForestRegressor
+
+    from aeroaqua.scripts.benchmark_compiled_forest import synthetic_features
+
+    X = synthetic_features(n_rows, seed)
+    model = RandomForestRegressor(n_estimators=20, max_depth=12, n_jobs=1, random_state=seed)
+    model.fit(X, synthetic_ghi(X))
+    joblib.dump(model, path)
+    return path
+
+
+def _run_script(ctx: Context, module: str, *args):
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, PYTHONPATH=root + os.pathsep + os.environ.get('PYTHONPATH', ''), PYTHONWARNINGS='ignore')
+    env.pop('AEROAQUA_SOLAR_CACHE_DIR', None)
+    command = [sys.executable, '-m', module, *args]
+
+    def run():
+        proc = subprocess.run(command, cwd=ctx.workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        if proc.returncode != 0:
+            raise RuntimeError(f'{module} failed:\n{proc.stderr}')
+    return run
+
+
+@benchmark('solar.positions.cold')
+def _solar_cold(ctx):
+    from aeroaqua.solar import clear_solar_cache, get_solar_positions_for_date
+
+    def run():
+        clear_solar_cache()
+        get_solar_positions_for_date(date_str=BENCH_DATE)
+    return run
+
+
+@benchmark('solar.positions.cached')
+def _solar_cached(ctx):
+    from aeroaqua.solar import get_solar_positions_for_date
+
+    get_solar_positions_for_date(date_str=BENCH_DATE)
+    return lambda: get_solar_positions_for_date(date_str=BENCH_DATE)
+
+
+@benchmark('energy.daily_clearsky')
+def _daily_energy(ctx):
+    from aeroaqua.energy.solarenergy import compute_daily_energy_from_location_date
+    from aeroaqua.solar import DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
+
+    return lambda: compute_daily_energy_from_location_date(DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ, BENCH_DATE)
+
+
+@benchmark('water_yield.scalar_x1000')
+def _water_scalar(ctx):
+    from aeroaqua.model.baselinesorption import predict_water_yield
+
+    rng = np.random.default_rng(ctx.seed)
+    inputs = list(zip(rng.uniform(1, 8, 1000).tolist(), rng.uniform(30, 95, 1000).tolist()))
+
+    def run():
+        for solar, rh in inputs:
+            predict_water_yield(solar, rh)
+    return run
+
+
+@benchmark('water_yield.bulk_100k')
+def _water_bulk(ctx):
+    from aeroaqua.model.baselinesorption import predict_water_yield_array
+
+    rng = np.random.default_rng(ctx.seed)
+    solar, rh = rng.uniform(1, 8, BULK_ROWS), rng.uniform(30, 95, BULK_ROWS)
+    return lambda: predict_water_yield_array(solar, rh)
+
+
+@benchmark('grid.baseline_1m')
+def _grid_baseline(ctx):
+    from aeroaqua.pipelines.grid import Grid, baseline_predictor, evaluate_grid
+
+    grid = Grid({'solar': np.linspace(0, 10, 100), 'rh': np.linspace(0, 100, 100), 'temp': np.linspace(-10, 40, 100)})
+    predict = baseline_predictor('solar', 'rh')
+
+    def run():
+        for _ in evaluate_grid(grid, predict, chunk_rows=250_000):
+            pass
+    return run
+
+
+@benchmark('model.load')
+def _model_load(ctx):
+    from aeroaqua.model.registry import ModelRegistry
+
+    path = ctx.model_path
+    return lambda: ModelRegistry().get(path)
+
+
+def _predict_setup(n: int):
+    def setup(ctx):
+        from aeroaqua.model.registry import load_model
+        from aeroaqua.scripts.benchmark_compiled_forest import synthetic_features
+
+        model = load_model(ctx.model_path)
+        X = synthetic_features(n, ctx.seed + 1)
+        return lambda: model.predict(X)
+    return setup
+
+
+for _n in PREDICT_SIZES:
+    benchmark(f'rf.predict.{_n}')(_predict_setup(_n))
+
+
+@benchmark('pipeline.rf.cold')
+def _pipeline_rf(ctx):
+    from aeroaqua.pipelines.pipeline_rf import run_pipeline_rf
+    from aeroaqua.solar import clear_solar_cache
+
+    path = ctx.model_path
+    run_pipeline_rf(date_str=BENCH_DATE, model_path=path)
+
+    def run():
+        clear_solar_cache()
+        run_pipeline_rf(date_str=BENCH_DATE, cloud_type=2.0, rh_percent=65.0, temperature_c=18.0, model_path=path)
+    return run
+
+
+@benchmark('pipeline.pvlib.cold')
+def _pipeline_pvlib(ctx):
+    from aeroaqua.pipelines.pipeline_pvlib import run_pipeline_pvlib
+    from aeroaqua.solar import clear_solar_cache
+
+    def run():
+        clear_solar_cache()
+        run_pipeline_pvlib(date_str=BENCH_DATE, rh_percent=65.0)
+    return run
+
+
+@benchmark('pipeline.result_cache.hits')
+def _result_cache_hits(ctx):
+    from aeroaqua.pipelines.pipeline_rf import run_pipeline_rf
+    from aeroaqua.pipelines.result_cache import ResultCache, using_result_cache
+
+    path = ctx.model_path
+    cache = ResultCache(os.path.join(ctx.workdir, 'results.sqlite'))
+    with using_result_cache(cache):
+        run_pipeline_rf(date_str=BENCH_DATE, cloud_type=2.0, rh_percent=65.0, temperature_c=18.0, model_path=path)
+
+    def run():
+        # 1000 in-memory hits (key hashing, model hash check, LRU lookup)
+        with using_result_cache(cache):
+            for _ in range(1000):
+                run_pipeline_rf(date_str=BENCH_DATE, cloud_type=2.0, rh_percent=65.0, temperature_c=18.0, model_path=path)
+    return run
+
+
+@benchmark('pipeline.rf_climatology.5y')
+def _pipeline_rf_climatology(ctx):
+    from aeroaqua.pipelines.climatology import run_pipeline_rf_climatology
+
+    path = ctx.model_path
+
+    def run():
+        run_pipeline_rf_climatology('2021-01-01', '2025-12-31', cloud_type=2.0, rh_percent=65.0, temperature_c=18.0, model_path=path)
+    return run
+
+
+@benchmark('sweep.scenarios.cold')
+def _sweep(ctx):
+    import pandas as pd
+
+    from aeroaqua.pipelines.sweep import run_scenario_sweep
+    from aeroaqua.solar import clear_solar_cache
+
+    path = ctx.model_path
+    dates = [d.strftime('%Y-%m-%d') for d in pd.date_range('2025-01-01', periods=30, freq='12D')]
+
+    def run():
+        clear_solar_cache()
+        run_scenario_sweep(dates, (0.0, 3.0, 7.0), (40.0, 60.0, 80.0), (0.0, 15.0, 30.0), model_path=path)
+    return run
+
+
+@benchmark('script.generate_model_grid_predictions')
+def _grid_script(ctx):
+    return _run_script(ctx, 'aeroaqua.scripts.generate_model_grid_predictions', '--output', 'model_grid.csv')
+
+
+@benchmark('script.standalone_grid_predictions')
+def _standalone_script(ctx):
+    return _run_script(ctx, 'aeroaqua.scripts.standalone_grid_predictions', '--output', 'standalone_grid.csv')
+
+
+@benchmark('script.generate_plot_data')
+def _plot_data_script(ctx):
+    return _run_script(ctx, 'aeroaqua.generate_plot_data', '--workers', '1', '--output', 'plot_data.csv', '--model-path', ctx.model_path)
+
+
+@benchmark('script.build_energy_atlas')
+def _atlas_script(ctx):
+    return _run_script(ctx, 'aeroaqua.scripts.build_energy_atlas', '--out', 'atlas', '--model', ctx.model_path,
+                       '--day-step', '7', '--cloud', '0,5,10', '--rh', '20,60,100', '--temp=-10,15,40', '--error-points', '50')
+
+
+def time_call(fn, repeat: int, min_time: float) -> dict:
+    """Median and best per-call seconds over `repeat` runs of an auto-sized loop."""
+    fn()  # warm-up (imports, first-call caches)
+    start = time.perf_counter()
+    fn()
+    once = time.perf_counter() - start
+    number = max(1, int(min_time / once) if once > 0 else 1)
+    per_call = []
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+    return {
+        'median_s': statistics.median(per_call),
+        'min_s': min(per_call),
+        'number': number,
+        'repeat': len(per_call),
+    }
+
+
+def environment() -> dict:
+    versions = {'python': platform.python_version(), 'numpy': np.__version__}
+    for name in ('pandas', 'pvlib', 'sklearn', 'joblib'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'versions': versions,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+    }
+
+
+def run_suite(names, repeat: int, min_time: float, seed: int = 0, log=print) -> dict:
+    from aeroaqua.solar import configure_solar_cache
+
+    configure_solar_cache(disk_dir='')
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        ctx = Context(workdir, seed)
+        for name in names:
+            result = time_call(BENCHMARKS[name](ctx), repeat, min_time)
+            results[name] = result
+            log(f"{name:42s} {_format_seconds(result['median_s']):>10} (best {_format_seconds(result['min_s'])}, "
+                f"{result['number']} x {result['repeat']})")
+    return {'environment': environment(), 'settings': {'repeat': repeat, 'min_time': min_time, 'seed': seed}, 'results': results}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """Rows (name, baseline_s, current_s, ratio, status) comparing best per-call times; 'new' if not in the baseline."""
+    rows = []
+    for name, result in current['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if reference is None:
+            rows.append((name, None, result['min_s'], None, 'new'))
+            continue
+        ratio = result['min_s'] / reference['min_s']
+        status = 'REGRESSION' if ratio > 1.0 + threshold else 'faster' if ratio < 1.0 / (1.0 + threshold) else 'ok'
+        rows.append((name, reference['min_s'], result['min_s'], ratio, status))
+    return rows
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds < 1e-3:
+        return f'{seconds * 1e6:.1f} us'
+    if seconds < 1.0:
+        return f'{seconds * 1e3:.2f} ms'
+    return f'{seconds:.2f} s'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the aeroaqua benchmark suite and compare it with a baseline')
+    parser.add_argument('--filter', default=None, help='Only run benchmarks whose name contains this text')
+    parser.add_argument('--list', action='store_true', help='List benchmark names and exit')
+    parser.add_argument('--repeat', type=int, default=7, help='Timed runs per benchmark (the best is compared)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='Minimum seconds per timed run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default=None, help='Write results JSON to this path')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='Allowed slowdown before a regression is reported (0.25 = 25%%)')
+    parser.add_argument('--update-baseline', action='store_true', help='Write the results to --baseline instead of comparing')
+    args = parser.parse_args()
+
+    names = [n for n in BENCHMARKS if not args.filter or args.filter in n]
+    if args.list:
+        print('\n'.join(names))
+        return
+    if not names:
+        raise SystemExit(f'No benchmark matches {args.filter!r}')
+
+    current = run_suite(names, args.repeat, args.min_time, args.seed)
+    if args.out:
+        with open(args.out, 'w') as fh:
+            json.dump(current, fh, indent=2)
+
+    if args.update_baseline:
+        baseline = {}
+        if args.filter and os.path.exists(args.baseline):
+            with open(args.baseline) as fh:
+                baseline = json.load(fh)
+        merged = dict(current, results={**baseline.get('results', {}), **current['results']})
+        with open(args.baseline, 'w') as fh:
+            json.dump(merged, fh, indent=2)
+            fh.write('\n')
+        print(f'\nBaseline written to {args.baseline}')
+        return
+    if not os.path.exists(args.baseline):
+        print(f'\nNo baseline at {args.baseline}; run with --update-baseline to create one.')
+        return
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    rows = compare(current, baseline, args.threshold)
+    print(f"\n{'benchmark':42s} {'baseline':>10} {'current':>10} {'ratio':>7}  status (threshold {args.threshold:.0%})")
+    for name, before, after, ratio, status in rows:
+        print(f"{name:42s} {_format_seconds(before) if before else '-':>10} {_format_seconds(after):>10} "
+              f"{f'{ratio:.2f}' if ratio else '-':>7}  {status}")
+    regressions = [row[0] for row in rows if row[4] == 'REGRESSION']
+    if regressions:
+        print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        sys.exit(1)
+    print('\nNo regressions.')
+
+
+if __name__ == '__main__':
+    main()
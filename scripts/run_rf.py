@@ -1,4 +1,13 @@
-"""Simple CLI wrapper to run the RF pipeline."""
+"""Simple CLI wrapper to run the RF pipeline.
+
+With --weather the pipeline streams a weather CSV (time, cloud_type, rh_percent,
+temperature_c at any resolution, see `aeroaqua.pipelines.weather`) and prints
+one line per day as soon as the day is complete.
+
+With --years START:END the pipeline runs every day of those years with the
+scalar --cloud/--rh/--temp inputs in climatology mode (solar geometry derived
+from one reference year, see `aeroaqua.pipelines.climatology`) and prints CSV.
+"""
 from aeroaqua.pipelines.pipeline_rf import run_pipeline_rf
 import argparse
 
@@ -10,6 +19,26 @@ if __name__ == '__main__':
     p.add_argument('--rh', type=float, default=50.0)
     p.add_argument('--temp', type=float, default=20.0)
     p.add_argument('--model', type=str, default=None, help='Path to trained RF model')
+    p.add_argument('--weather', type=str, default=None, help='Weather CSV with per-timestep inputs (replaces --date/--cloud/--rh/--temp)')
+    p.add_argument('--max-gap', default='2H', help='Largest distance from a solar sample to the nearest weather observation')
+    p.add_argument('--skip-gaps', action='store_true', help='Skip days with larger gaps instead of failing')
+    p.add_argument('--years', default=None, metavar='START:END', help='Run every day of these years (inclusive) in climatology mode')
+    p.add_argument('--reference-year', type=int, default=None, help='Reference year of the climatology geometry (default: middle year)')
     args = p.parse_args()
-    out = run_pipeline_rf(date_str=args.date, cloud_type=args.cloud, rh_percent=args.rh, temperature_c=args.temp, model_path=args.model)
-    print(out)
+    if args.years:
+        from aeroaqua.pipelines.climatology import run_pipeline_rf_climatology
+
+        start, _, end = args.years.partition(':')
+        out = run_pipeline_rf_climatology(f'{start}-01-01', f'{end or start}-12-31', cloud_type=args.cloud, rh_percent=args.rh,
+                                          temperature_c=args.temp, model_path=args.model, reference_year=args.reference_year)
+        print(out.to_csv(index=False), end='')
+    elif args.weather:
+        from aeroaqua.pipelines.weather import iter_daily_rf
+
+        print('date,cloud_type,rh_percent,temperature_c,solar_energy_kwh_m2,predicted_liters_per_day')
+        for row in iter_daily_rf(args.weather, model_path=args.model, max_gap=args.max_gap, on_gap='skip' if args.skip_gaps else 'raise'):
+            print(f"{row['date']},{row['cloud_type']:.3f},{row['rh_percent']:.3f},{row['temperature_c']:.3f},"
+                  f"{row['solar_energy_kwh_m2']:.6f},{row['predicted_liters_per_day']:.6f}", flush=True)
+    else:
+        out = run_pipeline_rf(date_str=args.date, cloud_type=args.cloud, rh_percent=args.rh, temperature_c=args.temp, model_path=args.model)
+        print(out)
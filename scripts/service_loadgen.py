@@ -0,0 +1,158 @@
+"""
+Load generator for the prediction service (`aeroaqua.service`).
+
+Opens --clients keep-alive connections that each send --requests POST /predict
+calls back to back (random dates and weather), then reports throughput and the
+p50 / p99 / max latency. Without --url the script starts an in-process service
+for every --max-batch value given, so batching can be compared directly
+(max batch 1 is the unbatched baseline), and checks that batched RF results
+equal `run_pipeline_rf` for a few requests.
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.scripts.service_loadgen --model path/to/solar_predictor_model.joblib --max-batch 1,64
+  python -m aeroaqua.scripts.service_loadgen --url http://127.0.0.1:8080 --clients 64 --requests 50
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+
+def random_requests(n: int, kind: str, seed: int) -> list:
+    rng = np.random.default_rng(seed)
+    days = rng.integers(0, 365, n)
+    out = []
+    for i in range(n):
+        request = {
+            'kind': kind,
+            'date': str(np.datetime64('2025-01-01') + int(days[i])),
+            'rh_percent': round(float(rng.uniform(20, 95)), 1),
+        }
+        if kind == 'rf':
+            request['cloud_type'] = int(rng.integers(0, 11))
+            request['temperature_c'] = round(float(rng.uniform(-10, 35)), 1)
+        out.append(request)
+    return out
+
+
+async def _client(host: str, port: int, requests: list, latencies: list):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for request in requests:
+            body = json.dumps(request).encode('utf-8')
+            start = time.perf_counter()
+            writer.write(f'POST /predict HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n'
+                         f'Content-Length: {len(body)}\r\n\r\n'.encode('latin-1') + body)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                if name.strip().lower() == 'content-length':
+                    length = int(value)
+            payload = json.loads(await reader.readexactly(length))
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                raise RuntimeError(f'HTTP {status}: {payload}')
+    finally:
+        writer.close()
+        await writer.wait_closed()
+
+
+async def run_load(host: str, port: int, clients: int, per_client: int, kind: str, seed: int) -> dict:
+    requests = random_requests(clients * per_client, kind, seed)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, requests[i * per_client:(i + 1) * per_client], latencies) for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - start
+    ms = np.array(latencies) * 1e3
+    return {
+        'requests': len(latencies),
+        'seconds': elapsed,
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(ms, 50)),
+        'p99_ms': float(np.percentile(ms, 99)),
+        'max_ms': float(ms.max()),
+    }
+
+
+async def _local(args, max_batch: int) -> tuple:
+    from aeroaqua.service.server import PredictionService, serve
+
+    service = PredictionService(args.model, max_batch, args.max_wait_ms, args.concurrency, args.executor)
+    service.warm_up()
+    server = await serve(service, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        await run_load('127.0.0.1', port, min(args.clients, 4), 2, args.kind, args.seed + 1)  # warm-up
+        result = await run_load('127.0.0.1', port, args.clients, args.requests, args.kind, args.seed)
+        stats = service.stats()[args.kind]
+        if args.kind == 'rf':
+            await _check_parity(service, args.model, args.seed)
+    finally:
+        server.close()
+        await server.wait_closed()
+        await service.close()
+    return result, stats
+
+
+async def _check_parity(service, model_path: str, seed: int):
+    from aeroaqua.pipelines.pipeline_rf import run_pipeline_rf
+
+    requests = random_requests(8, 'rf', seed + 2)
+    batched = await asyncio.gather(*(service.predict(r) for r in requests))
+    for request, got in zip(requests, batched):
+        kwargs = {k: v for k, v in request.items() if k not in ('kind', 'date')}
+        expected = run_pipeline_rf(date_str=request['date'], model_path=model_path, **kwargs)
+        if not np.isclose(got['solar_energy_kwh_m2'], expected['solar_energy_kwh_m2'], rtol=1e-12, atol=0):
+            raise AssertionError(f'batched result {got} differs from run_pipeline_rf {expected}')
+
+
+def _report(label: str, result: dict, stats: dict = None):
+    line = (f"{label:>12} {result['requests']:8d} {result['throughput']:10.1f} {result['p50_ms']:8.2f} "
+            f"{result['p99_ms']:8.2f} {result['max_ms']:8.2f}")
+    if stats:
+        line += f" {stats['mean_batch_size']:10.1f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure prediction service throughput and latency')
+    parser.add_argument('--url', default=None, help='Running service to load (default: start one in-process)')
+    parser.add_argument('--model', default=None, help='RF model path for the in-process service')
+    parser.add_argument('--kind', choices=['rf', 'pvlib'], default='rf')
+    parser.add_argument('--clients', type=int, default=32, help='Concurrent keep-alive connections')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per client')
+    parser.add_argument('--max-batch', default='1,64', help='In-process service: max batch sizes to compare')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--concurrency', type=int, default=2)
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    header = f"{'max batch':>12} {'requests':>8} {'req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    if args.url:
+        url = urlparse(args.url)
+        result = asyncio.run(run_load(url.hostname, url.port or 80, args.clients, args.requests, args.kind, args.seed))
+        print(header)
+        _report('remote', result)
+        return
+
+    print(f'{args.clients} clients x {args.requests} {args.kind} requests, max wait {args.max_wait_ms} ms, '
+          f'concurrency {args.concurrency}, {args.executor} executor')
+    print(header + f" {'mean batch':>10}")
+    for max_batch in [int(s) for s in args.max_batch.split(',') if s.strip()]:
+        result, stats = asyncio.run(_local(args, max_batch))
+        _report(str(max_batch), result, stats)
+
+
+if __name__ == '__main__':
+    main()
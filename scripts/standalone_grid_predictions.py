@@ -2,21 +2,28 @@
 Standalone script to generate a grid of (Season, Solar Energy, RH) and predict water yield
 using a hard-coded linear model approximation if aeroaqua package import fails.
 
-Output: model_grid_predictions.csv in the current working directory.
+Output: model_grid_predictions.csv in the current working directory (Parquet or
+per-column .npy output through `aeroaqua.pipelines.sinks` when aeroaqua is importable).
 
-Grid definition:
+Grid definition (ranges can be changed with --solar / --rh 'start:stop:step'):
   Solar Energy (kWh/m^2): 1.0 .. 7.0 step 0.25
   RH (%): 50 .. 75 step 1
   Seasons: Summer, Spring, Fall, Winter
 
 Prediction sources (fallback order):
-  1. aeroaqua.model.baselinesorption.predict_water_yield
+  1. aeroaqua.model.baselinesorption.predict_water_yield_array
   2. Hard-coded coefficients derived from the embedded dataset (approximation)
 
+Predictions are evaluated and written in chunks: blocks of the grid engine
+`aeroaqua.pipelines.grid` when aeroaqua is importable, one season at a time with
+plain lists otherwise.
+
 Usage (PowerShell):
   python standalone_grid_predictions.py
   # or specify output
   python standalone_grid_predictions.py --output my_grid.csv
+  python standalone_grid_predictions.py --output my_grid.parquet
+  python standalone_grid_predictions.py --solar 0:10:0.05 --rh 20:100:0.5 --output fine_grid.csv
 
 You can later post-process the CSV or load it into pandas.
 """
@@ -33,10 +40,25 @@ except Exception:
     pd = None
 
 try:
-    from aeroaqua.model.baselinesorption import predict_water_yield as baseline_predict
+    import numpy as np
+except Exception:
+    np = None
+
+try:
+    from aeroaqua.model.baselinesorption import predict_water_yield_array as baseline_predict
 except Exception:
     baseline_predict = None
 
+try:
+    from aeroaqua.pipelines.sinks import open_sink
+except Exception:
+    open_sink = None
+
+try:
+    from aeroaqua.pipelines.grid import Grid
+except Exception:
+    Grid = None
+
 
 # Hard-coded linear model coefficients (approximation) used only if import fails.
 # Obtained from fitting to the embedded dataset; formula:
@@ -46,24 +68,62 @@ HARDCODED_RH_COEF = 0.0605
 HARDCODED_SOLAR_COEF = 0.4883
 
 
-def fallback_predict(solar_energy_kwh_m2: float, rh_percent: float) -> float:
+def fallback_predict(solar_energy_kwh_m2, rh_percent):
+    # works elementwise on numpy arrays as well as on floats
     return HARDCODED_INTERCEPT + HARDCODED_RH_COEF * rh_percent + HARDCODED_SOLAR_COEF * solar_energy_kwh_m2
 
 
 def get_predict_fn():
+    """Return a function mapping (solar column, RH column) to predictions (an array, or a list without numpy)."""
     if baseline_predict is not None:
-        return baseline_predict
-    return fallback_predict
+        return lambda se, rh: baseline_predict(np.asarray(se), np.asarray(rh))
+    if np is not None:
+        return lambda se, rh: fallback_predict(np.asarray(se, dtype=float), np.asarray(rh, dtype=float))
+    return lambda se, rh: [fallback_predict(s, r) for s, r in zip(se, rh)]
+
+
+def predict_chunk(predict_fn, columns):
+    """Predictions for one chunk rounded to 4 decimals, with their (min, max, sum)."""
+    preds = predict_fn(columns['Solar_Energy_kwh_m2'], columns['RH_Percent'])
+    if np is not None:
+        preds = np.round(np.asarray(preds, dtype=float), 4)
+        return preds, (preds.min(), preds.max(), preds.sum())
+    preds = [round(float(p), 4) for p in preds]
+    return preds, (min(preds), max(preds), sum(preds))
+
 
+SEASONS = ['Summer', 'Spring', 'Fall', 'Winter']
 
-def build_grid():
-    seasons = ['Summer', 'Spring', 'Fall', 'Winter']
-    solar_vals = [round(x, 2) for x in frange(1.0, 7.0, 0.25)]
-    rh_vals = list(range(50, 76))
-    for season, se, rh in itertools.product(seasons, solar_vals, rh_vals):
+
+def parse_range(text):
+    """'start:stop:step' (inclusive) -> list of values (ints when start and step are whole numbers)."""
+    start, stop, step = (float(v) for v in text.split(':'))
+    if step <= 0:
+        raise ValueError(f'step must be positive: {text!r}')
+    values = [round(x, 6) for x in frange(start, stop, step)]
+    if start.is_integer() and step.is_integer():
+        values = [int(v) for v in values]
+    return values
+
+
+def build_grid(solar='1:7:0.25', rh='50:75:1'):
+    for season, se, rh in itertools.product(SEASONS, parse_range(solar), parse_range(rh)):
         yield season, se, rh
 
 
+def iter_grid_chunks(solar='1:7:0.25', rh='50:75:1', chunk_rows=1_000_000):
+    """Yield the grid in `build_grid` order as dicts of Season / solar / RH columns."""
+    solar_vals, rh_vals = parse_range(solar), parse_range(rh)
+    if Grid is not None:
+        grid = Grid({'Season': SEASONS, 'Solar_Energy_kwh_m2': solar_vals, 'RH_Percent': rh_vals})
+        for chunk in grid.chunks(chunk_rows):
+            yield chunk.columns()
+        return
+    for season in SEASONS:
+        solar_col, rh_col = zip(*itertools.product(solar_vals, rh_vals))
+        yield {'Season': [season] * len(solar_col), 'Solar_Energy_kwh_m2': solar_col, 'RH_Percent': rh_col}
+
+
 def frange(start, stop, step):
     x = start
     # ensure floating point rounding issues don't overshoot
@@ -72,39 +132,59 @@ def frange(start, stop, step):
         x += step
 
 
+class CSVColumnWriter:
+    """Stand-in for an aeroaqua result sink when the package is not importable (CSV only)."""
+
+    def __init__(self, path):
+        self.fh = open(path, 'w', newline='')
+        self.writer = csv.writer(self.fh)
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fh.close()
+
+    def write(self, columns):
+        if self.rows == 0:
+            self.writer.writerow(list(columns))
+        rows = list(zip(*columns.values()))
+        self.writer.writerows(rows)
+        self.rows += len(rows)
+
+
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument('--output', default='model_grid_predictions.csv', help='Output CSV filename')
+    parser.add_argument('--output', default='model_grid_predictions.csv', help='Output filename (.csv, .parquet, or a directory for .npy columns)')
+    parser.add_argument('--solar', default='1:7:0.25', help="Solar energy range in kWh/m^2, 'start:stop:step'")
+    parser.add_argument('--rh', default='50:75:1', help="RH range in percent, 'start:stop:step'")
+    parser.add_argument('--chunk-rows', type=int, default=1_000_000, help='Grid rows predicted and written at a time')
     args = parser.parse_args()
 
     predict_fn = get_predict_fn()
-
-    rows = []
-    for season, se, rh in build_grid():
-        pred = predict_fn(se, rh)
-        rows.append({
-            'Season': season,
-            'Solar_Energy_kwh_m2': se,
-            'RH_Percent': rh,
-            'Predicted Water (L/day)': round(float(pred), 4)
-        })
-
-    # Write CSV manually (works without pandas). Use pandas if available for convenience.
     out_path = os.path.abspath(args.output)
-    fieldnames = ['Season', 'Solar_Energy_kwh_m2', 'RH_Percent', 'Predicted Water (L/day)']
 
     try:
-        with open(out_path, 'w', newline='') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(rows)
+        if open_sink is not None:
+            sink = open_sink(out_path, dtypes={'Season': SEASONS})
+        elif out_path.lower().endswith('.csv'):
+            sink = CSVColumnWriter(out_path)
+        else:
+            raise ValueError('only .csv output is available without the aeroaqua package')
+        # Predict and write one chunk at a time so memory does not grow with the grid
+        pred_min, pred_max, pred_sum = math.inf, -math.inf, 0.0
+        with sink:
+            for columns in iter_grid_chunks(args.solar, args.rh, args.chunk_rows):
+                preds, (chunk_min, chunk_max, chunk_sum) = predict_chunk(predict_fn, columns)
+                sink.write(dict(columns, **{'Predicted Water (L/day)': preds}))
+                pred_min, pred_max, pred_sum = min(pred_min, chunk_min), max(pred_max, chunk_max), pred_sum + chunk_sum
     except Exception as e:
-        raise SystemExit(f"Failed to write CSV: {e}")
+        raise SystemExit(f"Failed to write {out_path}: {e}")
 
-    print(f"Wrote {len(rows)} rows to {out_path}")
+    print(f"Wrote {sink.rows} rows to {out_path}")
     # Basic summary
-    preds = [r['Predicted Water (L/day)'] for r in rows]
-    print(f"Predicted min={min(preds):.3f}, max={max(preds):.3f}, mean={sum(preds)/len(preds):.3f}")
+    print(f"Predicted min={pred_min:.3f}, max={pred_max:.3f}, mean={pred_sum / sink.rows:.3f}")
 
 
 if __name__ == '__main__':
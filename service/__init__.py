@@ -0,0 +1,16 @@
+"""Local prediction service with request micro-batching."""
+from aeroaqua._lazy import lazy_module
+
+_LAZY = {
+    'MicroBatcher': '.server',
+    'PredictionService': '.server',
+    'serve': '.server',
+    'RequestError': '.batch',
+    'normalize_request': '.batch',
+    'run_rf_batch': '.batch',
+    'run_pvlib_batch': '.batch',
+}
+
+__all__ = list(_LAZY)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY)
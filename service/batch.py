@@ -0,0 +1,135 @@
+"""Batched evaluation of prediction requests (runs in the service's worker threads or processes).
+
+A request is a JSON object with ``kind`` ('rf' or 'pvlib', default 'rf') and
+the keyword arguments of `run_pipeline_rf` / `run_pipeline_pvlib`: date (or
+date_str), cloud_type, rh_percent, temperature_c, latitude, longitude,
+altitude, timezone and freq; missing fields take the pipelines' defaults.
+
+`run_rf_batch` writes the daylight feature rows of every request into one
+float32 matrix (the worker thread's `FeatureBuffer`), calls the forest's
+``predict`` once and integrates each request's slice separately, so every
+result equals `run_pipeline_rf` for that request.
+"""
+import functools
+import inspect
+
+import numpy as np
+
+
+REQUEST_FIELDS = {
+    'rf': ('date_str', 'cloud_type', 'rh_percent', 'temperature_c', 'freq', 'latitude', 'longitude', 'altitude', 'timezone'),
+    'pvlib': ('date_str', 'rh_percent', 'freq', 'latitude', 'longitude', 'altitude', 'timezone'),
+}
+
+
+class RequestError(ValueError):
+    """A request that cannot be evaluated (reported back to its client only)."""
+
+
+def normalize_request(request) -> tuple:
+    """Validate one JSON request; returns (kind, keyword arguments)."""
+    if not isinstance(request, dict):
+        raise RequestError('request must be a JSON object')
+    request = dict(request)
+    kind = request.pop('kind', 'rf')
+    if kind not in REQUEST_FIELDS:
+        raise RequestError(f"unknown kind {kind!r}; expected one of {sorted(REQUEST_FIELDS)}")
+    if 'date' in request:
+        request['date_str'] = request.pop('date')
+    unknown = sorted(set(request) - set(REQUEST_FIELDS[kind]))
+    if unknown:
+        raise RequestError(f'unknown fields for {kind}: {unknown}')
+    for name, value in request.items():
+        if name in ('date_str', 'freq', 'timezone'):
+            if not isinstance(value, str):
+                raise RequestError(f'{name} must be a string')
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise RequestError(f'{name} must be a number')
+    return kind, request
+
+
+def _result(date, total_kwh: float, rh_percent: float, predicted: float) -> dict:
+    return {
+        'date': str(date),
+        'solar_energy_kwh_m2': float(total_kwh),
+        'rh_percent': float(rh_percent),
+        'predicted_liters_per_day': float(predicted),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def rf_request_defaults() -> dict:
+    """`run_pipeline_rf`'s defaults for the RF request fields, read from its signature."""
+    from aeroaqua.pipelines.pipeline_rf import run_pipeline_rf
+
+    parameters = inspect.signature(run_pipeline_rf).parameters
+    return {name: parameters[name].default for name in REQUEST_FIELDS['rf']}
+
+
+def run_rf_batch(requests, model_path: str = None) -> list:
+    """Evaluate RF requests (keyword dicts) with a single `predict`; failed requests yield their exception."""
+    import pandas as pd
+
+    from aeroaqua.model import predict_water_yield
+    from aeroaqua.pipelines.pipeline_rf import (
+        _as_model_input, _integrate_daily_kwh, _load_model, _zenith_column, build_feature_matrix, daylight_ghi,
+        daylight_mask, feature_buffer,
+    )
+    from aeroaqua.solar import get_solar_positions_for_date
+
+    defaults = rf_request_defaults()
+    prepared = []
+    for kwargs in requests:
+        try:
+            p = dict(defaults, **kwargs)
+            for name in ('cloud_type', 'rh_percent', 'temperature_c'):
+                p[name] = float(p[name])
+            solpos = get_solar_positions_for_date(
+                date_str=p['date_str'], freq=p['freq'],
+                latitude=p['latitude'], longitude=p['longitude'], altitude=p['altitude'], timezone=p['timezone'],
+            )
+            p['times'] = solpos.index
+            p['zenith'] = _zenith_column(solpos).values
+            p['day'] = daylight_mask(p['zenith'])
+            prepared.append(p)
+        except Exception as e:
+            prepared.append(RequestError(f'{type(e).__name__}: {e}'))
+
+    valid = [p for p in prepared if not isinstance(p, Exception)]
+    if not valid:
+        return prepared
+    X = feature_buffer().rows(sum(int(p['day'].sum()) for p in valid))
+    start = 0
+    for p in valid:
+        day = p['day']
+        stop = start + int(day.sum())
+        build_feature_matrix(p['times'][day], p['zenith'][day], p['cloud_type'], p['rh_percent'], p['temperature_c'], out=X[start:stop])
+        start = stop
+    ghi = daylight_ghi(_load_model(model_path), _as_model_input(X), np.concatenate([p['day'] for p in valid]))
+
+    results = []
+    start = 0
+    for p in prepared:
+        if isinstance(p, Exception):
+            results.append(p)
+            continue
+        n = len(p['times'])
+        total_kwh = _integrate_daily_kwh(ghi[start:start + n], p['times'], [0], p['freq'])[0]
+        start += n
+        results.append(_result(pd.to_datetime(p['date_str']).date(), total_kwh, p['rh_percent'],
+                               predict_water_yield(total_kwh, p['rh_percent'])))
+    return results
+
+
+def run_pvlib_batch(requests) -> list:
+    """Evaluate clear-sky requests one by one (the solar cache is shared); failed requests yield their exception."""
+    from aeroaqua.pipelines.pipeline_pvlib import run_pipeline_pvlib
+
+    results = []
+    for kwargs in requests:
+        try:
+            out = run_pipeline_pvlib(**kwargs)
+            results.append(_result(out['date'], out['solar_energy_kwh_m2'], out['rh_percent'], out['predicted_liters_per_day']))
+        except Exception as e:
+            results.append(RequestError(f'{type(e).__name__}: {e}'))
+    return results
@@ -0,0 +1,321 @@
+"""Local asyncio prediction service with request micro-batching.
+
+Concurrent requests are queued per pipeline kind; a `MicroBatcher` collects
+them until `max_batch` requests are waiting or `max_wait_ms` has passed since
+the first one, then evaluates the whole batch in a worker (one forest
+``predict`` for all RF requests, see `aeroaqua.service.batch`) and resolves
+every caller's future with its own result. At most `concurrency` batches run at
+once; the event loop itself never computes.
+
+The HTTP front end is a small HTTP/1.1 server on `asyncio.start_server`
+(keep-alive, Content-Length bodies):
+
+- ``POST /predict``: a JSON request object, or a list of them, answered with
+  the result object(s); failed items come back as ``{"error": ...}``;
+- ``GET /health`` and ``GET /stats`` (request/batch counters and the batch size
+  histogram);
+- ``GET /metrics``: pipeline stage spans in the Prometheus text format (enable
+  them with `aeroaqua.instrumentation.enable` or ``AEROAQUA_INSTRUMENT=1``).
+
+Usage (from the directory containing the `aeroaqua` package):
+  python -m aeroaqua.service --model path/to/solar_predictor_model.joblib --port 8080
+  curl -s localhost:8080/predict -d '{"date": "2025-06-21", "cloud_type": 0, "rh_percent": 60, "temperature_c": 22}'
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+
+from .batch import RequestError, normalize_request, run_pvlib_batch, run_rf_batch
+
+
+DEFAULT_MAX_BATCH = 64
+DEFAULT_MAX_WAIT_MS = 5.0
+DEFAULT_CONCURRENCY = 2
+MAX_BODY_BYTES = 1 << 20
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class MicroBatcher:
+    """Coalesces concurrent `submit` calls into batches evaluated by `handler` in an executor.
+
+    Args:
+        handler: callable(list of items) -> list of results (same order); a result
+            that is an exception is raised to that item's caller only.
+        executor: concurrent.futures executor the handler runs in.
+        max_batch: largest batch passed to the handler.
+        max_wait_ms: how long the first item of a batch waits for company.
+        concurrency: batches evaluated at the same time.
+    """
+
+    def __init__(self, handler, executor, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS, concurrency: int = DEFAULT_CONCURRENCY):
+        self.handler = handler
+        self.executor = executor
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.concurrency = max(1, int(concurrency))
+        self.batch_sizes = Counter()
+        self.items = 0
+        self._queue = None
+        self._slots = None
+        self._task = None
+        self._running = set()
+
+    async def submit(self, item):
+        """Queue one item and wait for its result."""
+        if self._task is None:
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._task = asyncio.get_running_loop().create_task(self._collect())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            await self._slots.acquire()
+            task = loop.create_task(self._run(batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+
+    async def _run(self, batch):
+        try:
+            self.batch_sizes[len(batch)] += 1
+            self.items += len(batch)
+            items = [item for item, _ in batch]
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(self.executor, self.handler, items)
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._slots.release()
+
+    def stats(self) -> dict:
+        batches = sum(self.batch_sizes.values())
+        return {
+            'items': self.items,
+            'batches': batches,
+            'mean_batch_size': self.items / batches if batches else 0.0,
+            'batch_size_histogram': {str(k): v for k, v in sorted(self.batch_sizes.items())},
+        }
+
+
+class PredictionService:
+    """RF and clear-sky request batchers sharing one executor.
+
+    Args:
+        model_path: RF model (resolved through the model registry, loaded once per worker).
+        max_batch, max_wait_ms, concurrency: batching parameters (see `MicroBatcher`).
+        executor: 'thread' (default) or 'process'; with processes each worker holds its own model.
+        workers: executor size (default: `concurrency`).
+    """
+
+    def __init__(self, model_path: str = None, max_batch: int = DEFAULT_MAX_BATCH, max_wait_ms: float = DEFAULT_MAX_WAIT_MS,
+                 concurrency: int = DEFAULT_CONCURRENCY, executor: str = 'thread', workers: int = None):
+        workers = max(1, int(workers or concurrency))
+        if executor == 'process':
+            from aeroaqua.pipelines.executor import _init_worker
+            self.executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path, None, None))
+        elif executor == 'thread':
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='aeroaqua-predict')
+        else:
+            raise ValueError(f"executor must be 'thread' or 'process', got {executor!r}")
+        self.model_path = model_path
+        self.batchers = {
+            'rf': MicroBatcher(partial(run_rf_batch, model_path=model_path), self.executor, max_batch, max_wait_ms, concurrency),
+            'pvlib': MicroBatcher(run_pvlib_batch, self.executor, max_batch, max_wait_ms, concurrency),
+        }
+        self.started = time.time()
+        self.errors = 0
+
+    def warm_up(self):
+        """Load the model before the first request (in the workers too, for processes)."""
+        if isinstance(self.executor, ThreadPoolExecutor):
+            from aeroaqua.model.registry import load_model
+            load_model(self.model_path)
+
+    async def predict(self, request) -> dict:
+        """Evaluate one JSON request object through its kind's batcher."""
+        kind, kwargs = normalize_request(request)
+        return await self.batchers[kind].submit(kwargs)
+
+    async def predict_many(self, requests) -> list:
+        """Evaluate a list of requests concurrently; failed items become {'error': message}."""
+        results = await asyncio.gather(*(self.predict(r) for r in requests), return_exceptions=True)
+        out = []
+        for result in results:
+            if isinstance(result, Exception):
+                self.errors += 1
+                out.append({'error': str(result)})
+            else:
+                out.append(result)
+        return out
+
+    def stats(self) -> dict:
+        return {
+            'uptime_s': time.time() - self.started,
+            'errors': self.errors,
+            **{kind: batcher.stats() for kind, batcher in self.batchers.items()},
+        }
+
+    async def close(self):
+        for batcher in self.batchers.values():
+            await batcher.close()
+        self.executor.shutdown(wait=False)
+
+    # --- HTTP front end ---------------------------------------------------
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await _respond(writer, 400, {'error': 'malformed request line'}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await _respond(writer, 400, {'error': 'invalid Content-Length'}, keep_alive=False)
+                    break
+                if length > MAX_BODY_BYTES:
+                    await _respond(writer, 413, {'error': 'request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                status, payload = await self._route(method, path.split('?', 1)[0], body)
+                await _respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass  # client went away, or the server is shutting down
+        finally:
+            writer.close()
+
+    async def _route(self, method: str, path: str, body: bytes):
+        if path == '/health':
+            return 200, {'status': 'ok'}
+        if path == '/stats':
+            return 200, self.stats()
+        if path == '/metrics':
+            from aeroaqua.instrumentation import prometheus_text
+            return 200, prometheus_text()
+        if path != '/predict':
+            return 404, {'error': f'no route {path}'}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        try:
+            request = json.loads(body or b'null')
+        except ValueError as e:
+            return 400, {'error': f'invalid JSON: {e}'}
+        if isinstance(request, list):
+            return 200, await self.predict_many(request)
+        try:
+            return 200, await self.predict(request)
+        except RequestError as e:
+            self.errors += 1
+            return 400, {'error': str(e)}
+        except Exception as e:
+            self.errors += 1
+            return 500, {'error': f'{type(e).__name__}: {e}'}
+
+
+async def _respond(writer, status: int, payload, keep_alive: bool = True):
+    if isinstance(payload, str):
+        body, content_type = payload.encode('utf-8'), 'text/plain; version=0.0.4'
+    else:
+        body, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+    head = (
+        f'HTTP/1.1 {status} {_REASONS.get(status, "")}\r\n'
+        f'Content-Type: {content_type}\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'
+    )
+    writer.write(head.encode('latin-1') + body)
+    await writer.drain()
+
+
+async def serve(service: PredictionService, host: str = '127.0.0.1', port: int = 8080):
+    """Start the HTTP server; returns the asyncio Server (use `async with` or `serve_forever`)."""
+    return await asyncio.start_server(service.handle_connection, host, port)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve RF / clear-sky predictions over HTTP with request micro-batching')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--model', default=None, help='RF model path (default: registry fallback paths)')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help='Largest batch per predict')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT_MS, help='How long a request waits for a batch to fill')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Batches evaluated at the same time')
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--instrument', action='store_true', help='Record pipeline stage spans for GET /metrics (thread executor)')
+    args = parser.parse_args(argv)
+    if args.instrument:
+        from aeroaqua.instrumentation import enable
+        enable()
+
+    async def run():
+        service = PredictionService(args.model, args.max_batch, args.max_wait_ms, args.concurrency, args.executor)
+        service.warm_up()
+        server = await serve(service, args.host, args.port)
+        print(f'Serving on http://{args.host}:{args.port} (max batch {args.max_batch}, max wait {args.max_wait_ms} ms, '
+              f'concurrency {args.concurrency}, {args.executor} executor)')
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await service.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
@@ -1,9 +1,29 @@
-from .solar_toronto_spa import get_solar_positions_for_date, DEFAULT_LATITUDE, DEFAULT_LONGITUDE, DEFAULT_ALTITUDE, DEFAULT_TZ
-
-__all__ = [
-    'get_solar_positions_for_date',
-    'DEFAULT_LATITUDE',
-    'DEFAULT_LONGITUDE',
-    'DEFAULT_ALTITUDE',
-    'DEFAULT_TZ',
-]
+"""Solar geometry helpers.
+
+Names are resolved lazily (see `aeroaqua._lazy`), so importing the package does
+not pull in pandas or pvlib until a function that needs them is called.
+"""
+from aeroaqua._lazy import lazy_module
+
+_LAZY = {
+    'get_solar_positions_for_date': '.solar_toronto_spa',
+    'get_solar_positions_for_dates': '.solar_toronto_spa',
+    'DEFAULT_LATITUDE': '.solar_toronto_spa',
+    'DEFAULT_LONGITUDE': '.solar_toronto_spa',
+    'DEFAULT_ALTITUDE': '.solar_toronto_spa',
+    'DEFAULT_TZ': '.solar_toronto_spa',
+    'SolarPositionCache': '.cache',
+    'configure_solar_cache': '.cache',
+    'solar_cache_info': '.cache',
+    'clear_solar_cache': '.cache',
+    'invalidate_solar_cache': '.cache',
+    'multisite_solar_positions': '.multisite',
+    'multisite_zenith': '.multisite',
+    'multisite_positions_for_date': '.multisite',
+    'climatology_positions': '.climatology',
+    'reference_geometry': '.climatology',
+}
+
+__all__ = list(_LAZY)
+
+__getattr__, __dir__ = lazy_module(__name__, _LAZY)
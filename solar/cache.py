@@ -0,0 +1,267 @@
+"""Caching layer for solar position tables.
+
+Two tiers sit in front of pvlib's SPA:
+
+- an in-process LRU of per-day DataFrames keyed on
+  (latitude, longitude, altitude, timezone, date, freq);
+- an optional on-disk store of per-site annual tables (one structured ``.npy``
+  file per site/freq/year) that is memory-mapped on read, so restarted workers
+  reuse geometry computed by earlier runs.
+
+The on-disk tier is enabled with `configure_solar_cache(disk_dir=...)` or the
+``AEROAQUA_SOLAR_CACHE_DIR`` environment variable.
+"""
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .solar_toronto_spa import _compute_positions, _day_times
+
+
+DEFAULT_MAXSIZE = 512
+DISK_DIR_ENV = 'AEROAQUA_SOLAR_CACHE_DIR'
+
+
+def _site_key(latitude: float, longitude: float, altitude: float, timezone: str, freq: str):
+    return (round(float(latitude), 6), round(float(longitude), 6), float(altitude), str(timezone), str(freq))
+
+
+def _site_hash(site) -> str:
+    return hashlib.sha1(repr(site).encode('utf-8')).hexdigest()[:16]
+
+
+class SolarPositionCache:
+    """Bounded LRU of per-day solar position tables with an optional disk tier.
+
+    Args:
+        maxsize: maximum number of per-day tables kept in memory.
+        disk_dir: directory for the persistent annual tables (None disables the tier).
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE, disk_dir: str = None):
+        self.maxsize = int(maxsize)
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._tables = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self.disk_writes = 0
+
+    def get_days(self, date_strs, freq: str, latitude: float, longitude: float, altitude: float, timezone: str):
+        """Return a list of per-day solar position DataFrames, one per date.
+
+        Days missing from both tiers are computed together in a single SPA call.
+        """
+        import pandas as pd
+
+        site = _site_key(latitude, longitude, altitude, timezone, freq)
+        days = [pd.Timestamp(d).strftime('%Y-%m-%d') for d in date_strs]
+        out = [None] * len(days)
+        missing = []
+        with self._lock:
+            for i, day in enumerate(days):
+                frame = self._entries.get((site, day))
+                if frame is None:
+                    missing.append(i)
+                    continue
+                self._entries.move_to_end((site, day))
+                self.hits += 1
+                out[i] = frame
+
+        if missing and self.disk_dir:
+            still_missing = []
+            for i in missing:
+                frame = self._read_disk_day(site, days[i])
+                if frame is None:
+                    still_missing.append(i)
+                else:
+                    out[i] = frame
+                    self._store(site, days[i], frame)
+                    with self._lock:
+                        self.disk_hits += 1
+            missing = still_missing
+
+        if missing:
+            day_times = [_day_times(days[i], freq, timezone) for i in missing]
+            times = day_times[0].append(day_times[1:]) if len(day_times) > 1 else day_times[0]
+            solpos = _compute_positions(times, latitude, longitude, altitude, timezone)
+            start = 0
+            for i, t in zip(missing, day_times):
+                frame = solpos.iloc[start:start + len(t)]
+                start += len(t)
+                out[i] = frame
+                self._store(site, days[i], frame)
+            with self._lock:
+                self.misses += len(missing)
+
+        return [frame.copy() for frame in out]
+
+    def invalidate(
+        self,
+        latitude: float = None,
+        longitude: float = None,
+        altitude: float = None,
+        timezone: str = None,
+        freq: str = None,
+        date_str: str = None,
+        disk: bool = False,
+    ) -> int:
+        """Drop cached entries matching every given criterion (None matches anything).
+
+        With ``disk=True`` the matching annual tables are deleted as well; disk tables
+        are addressed per site, so all five site parameters are required in that case.
+
+        Returns:
+            number of in-memory entries removed.
+        """
+        import pandas as pd
+
+        wanted = (
+            None if latitude is None else round(float(latitude), 6),
+            None if longitude is None else round(float(longitude), 6),
+            None if altitude is None else float(altitude),
+            timezone,
+            freq,
+        )
+        day = None if date_str is None else pd.Timestamp(date_str).strftime('%Y-%m-%d')
+
+        def matches(site, entry_day):
+            if day is not None and entry_day != day:
+                return False
+            return all(w is None or w == s for w, s in zip(wanted, site))
+
+        with self._lock:
+            doomed = [k for k in self._entries if matches(*k)]
+            for k in doomed:
+                del self._entries[k]
+
+        if disk and self.disk_dir:
+            if any(w is None for w in wanted):
+                raise ValueError('Disk invalidation needs latitude, longitude, altitude, timezone and freq')
+            site_hash = _site_hash(wanted)
+            year = '*' if day is None else day[:4]
+            with self._lock:
+                for key in [k for k in self._tables if k[0] == wanted and (day is None or k[1] == int(year))]:
+                    del self._tables[key]
+            for path in glob.glob(os.path.join(self.disk_dir, f'solpos_{site_hash}_{year}.npy')):
+                os.remove(path)
+        return len(doomed)
+
+    def clear(self, disk: bool = False):
+        """Empty the in-memory tier (and the on-disk tier when ``disk=True``) and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._tables.clear()
+            self.hits = self.misses = self.disk_hits = self.disk_writes = 0
+        if disk and self.disk_dir:
+            for path in glob.glob(os.path.join(self.disk_dir, 'solpos_*.npy')):
+                os.remove(path)
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'disk_hits': self.disk_hits,
+                'disk_writes': self.disk_writes,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'disk_dir': self.disk_dir,
+            }
+
+    def _store(self, site, day: str, frame):
+        with self._lock:
+            self._entries[(site, day)] = frame
+            self._entries.move_to_end((site, day))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _table_path(self, site, year: int) -> str:
+        return os.path.join(self.disk_dir, f'solpos_{_site_hash(site)}_{year}.npy')
+
+    def _annual_table(self, site, year: int):
+        with self._lock:
+            table = self._tables.get((site, year))
+        if table is not None:
+            return table
+
+        path = self._table_path(site, year)
+        if not os.path.exists(path):
+            self._write_annual_table(site, year, path)
+        table = np.load(path, mmap_mode='r')
+        with self._lock:
+            self._tables[(site, year)] = table
+        return table
+
+    def _write_annual_table(self, site, year: int, path: str):
+        import pandas as pd
+
+        latitude, longitude, altitude, timezone, freq = site
+        dates = pd.date_range(f'{year}-01-01', f'{year}-12-31', freq='D').strftime('%Y-%m-%d')
+        day_times = [_day_times(d, freq, timezone) for d in dates]
+        times = day_times[0].append(day_times[1:])
+        solpos = _compute_positions(times, latitude, longitude, altitude, timezone)
+
+        dtype = [('time', 'i8')] + [(c, 'f8') for c in solpos.columns]
+        table = np.empty(len(solpos), dtype=dtype)
+        table['time'] = times.asi8
+        for c in solpos.columns:
+            table[c] = solpos[c].to_numpy()
+
+        os.makedirs(self.disk_dir, exist_ok=True)
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'wb') as f:
+            np.save(f, table)
+        os.replace(tmp, path)
+        with self._lock:
+            self.disk_writes += 1
+
+    def _read_disk_day(self, site, day: str):
+        import pandas as pd
+
+        timezone, freq = site[3], site[4]
+        table = self._annual_table(site, int(day[:4]))
+        times = _day_times(day, freq, timezone)
+        if len(times) == 0:
+            return None
+        lo, hi = np.searchsorted(table['time'], [times.asi8[0], times.asi8[-1]])
+        rows = table[lo:hi + 1]
+        if len(rows) != len(times) or not np.array_equal(rows['time'], times.asi8):
+            return None
+        columns = [c for c in table.dtype.names if c != 'time']
+        return pd.DataFrame({c: np.array(rows[c]) for c in columns}, index=times)
+
+
+solar_position_cache = SolarPositionCache(disk_dir=os.environ.get(DISK_DIR_ENV) or None)
+
+
+def configure_solar_cache(maxsize: int = None, disk_dir: str = None):
+    """Resize the process-wide cache and/or point its disk tier at ``disk_dir``."""
+    if maxsize is not None:
+        solar_position_cache.maxsize = int(maxsize)
+    if disk_dir is not None:
+        solar_position_cache.disk_dir = disk_dir or None
+        with solar_position_cache._lock:
+            solar_position_cache._tables.clear()
+    return solar_position_cache.info()
+
+
+def solar_cache_info() -> dict:
+    """Hit/miss counters and sizes of the process-wide solar position cache."""
+    return solar_position_cache.info()
+
+
+def clear_solar_cache(disk: bool = False):
+    """Empty the process-wide solar position cache."""
+    solar_position_cache.clear(disk=disk)
+
+
+def invalidate_solar_cache(**criteria) -> int:
+    """Drop matching entries from the process-wide cache; see `SolarPositionCache.invalidate`."""
+    return solar_position_cache.invalidate(**criteria)
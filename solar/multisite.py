@@ -0,0 +1,166 @@
+"""Vectorized solar geometry for many sites sharing one time grid.
+
+pvlib's NREL SPA splits into terms that depend on time only (Earth's orbit,
+nutation, sidereal time, the Sun's geocentric right ascension and declination,
+the equation of time) and terms that also depend on the observer (hour angle,
+parallax, refraction). `multisite_solar_positions` evaluates the time-only
+terms once for the shared grid and broadcasts the site terms over a
+(sites, 1) axis, so N sites cost one SPA pass instead of N.
+
+The arithmetic is pvlib's own (`pvlib.spa` with the numpy backend and the
+parameters `pvlib.location.Location.get_solarposition` uses), so every row
+equals the single-site result for that location.
+"""
+import numpy as np
+
+from .solar_toronto_spa import DEFAULT_TZ, _day_times
+
+
+SPA_TEMPERATURE = 12.0
+SPA_DELTA_T = 67.0
+SPA_ATMOS_REFRACT = 0.5667
+
+
+def _unixtime(times):
+    """Seconds since the epoch for a DatetimeIndex (any tz) or an array of unix seconds."""
+    if hasattr(times, 'asi8'):
+        # naive times are UTC, as in pvlib
+        utc = times.tz_convert(None) if times.tz is not None else times
+        return utc.values.astype('datetime64[ns]').astype(np.int64) / 1e9
+    return np.asarray(times, dtype=float)
+
+
+def _site_arrays(latitudes, longitudes, altitudes):
+    lat, lon, alt = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(latitudes, dtype=float)),
+        np.atleast_1d(np.asarray(longitudes, dtype=float)),
+        np.atleast_1d(np.asarray(altitudes, dtype=float)),
+    )
+    if lat.ndim != 1:
+        raise ValueError('latitudes, longitudes and altitudes must be scalars or 1-D arrays')
+    return lat, lon, alt
+
+
+def time_terms(times, delta_t: float = SPA_DELTA_T) -> dict:
+    """Site-independent SPA terms for a time grid.
+
+    Returns:
+        dict of 1-D arrays: v (apparent sidereal time), alpha / delta (geocentric
+        right ascension / declination), xi (equatorial horizontal parallax),
+        equation_of_time (minutes), and lamd / beta / delta_psi (apparent solar
+        longitude, geocentric latitude and nutation in longitude, all in degrees).
+    """
+    from pvlib import spa
+
+    jd = spa.julian_day(_unixtime(times))
+    jde = spa.julian_ephemeris_day(jd, delta_t)
+    jc = spa.julian_century(jd)
+    jce = spa.julian_ephemeris_century(jde)
+    jme = spa.julian_ephemeris_millennium(jce)
+    R = spa.heliocentric_radius_vector(jme)
+    L = spa.heliocentric_longitude(jme)
+    B = spa.heliocentric_latitude(jme)
+    Theta = spa.geocentric_longitude(L)
+    beta = spa.geocentric_latitude(B)
+    x0 = spa.mean_elongation(jce)
+    x1 = spa.mean_anomaly_sun(jce)
+    x2 = spa.mean_anomaly_moon(jce)
+    x3 = spa.moon_argument_latitude(jce)
+    x4 = spa.moon_ascending_longitude(jce)
+    nutation = np.empty((2, len(x0)))
+    spa.longitude_obliquity_nutation(jce, x0, x1, x2, x3, x4, nutation)
+    delta_psi, delta_epsilon = nutation
+    epsilon = spa.true_ecliptic_obliquity(spa.mean_ecliptic_obliquity(jme), delta_epsilon)
+    lamd = spa.apparent_sun_longitude(Theta, delta_psi, spa.aberration_correction(R))
+    v = spa.apparent_sidereal_time(spa.mean_sidereal_time(jd, jc), delta_psi, epsilon)
+    alpha = spa.geocentric_sun_right_ascension(lamd, epsilon, beta)
+    delta = spa.geocentric_sun_declination(lamd, epsilon, beta)
+    return {
+        'v': v,
+        'alpha': alpha,
+        'delta': delta,
+        'xi': spa.equatorial_horizontal_parallax(R),
+        'equation_of_time': spa.equation_of_time(spa.sun_mean_longitude(jme), alpha, delta_psi, epsilon),
+        'lamd': lamd,
+        'beta': beta,
+        'delta_psi': delta_psi,
+    }
+
+
+def multisite_solar_positions(
+    times,
+    latitudes,
+    longitudes,
+    altitudes=0.0,
+    pressures=None,
+    temperature: float = SPA_TEMPERATURE,
+    delta_t: float = SPA_DELTA_T,
+    terms: dict = None,
+) -> dict:
+    """Solar positions for every site on a shared time grid, in one vectorized pass.
+
+    Args:
+        times: tz-aware DatetimeIndex (or array of unix seconds) shared by all sites.
+        latitudes, longitudes, altitudes: scalars or 1-D arrays of length n_sites.
+        pressures: site pressures in Pa (default: pvlib's alt2pres of each altitude,
+            as `Location.get_solarposition` uses).
+        temperature, delta_t: SPA parameters, pvlib's defaults.
+        terms: precomputed `time_terms(times, delta_t)` to reuse across calls.
+
+    Returns:
+        dict with 'apparent_zenith', 'zenith', 'apparent_elevation', 'elevation' and
+        'azimuth' arrays of shape (n_sites, n_times) in degrees, and the shared
+        'equation_of_time' of shape (n_times,) in minutes.
+    """
+    from pvlib import spa
+    from pvlib.atmosphere import alt2pres
+
+    lat, lon, alt = _site_arrays(latitudes, longitudes, altitudes)
+    pressure = alt2pres(alt) if pressures is None else np.broadcast_to(np.asarray(pressures, dtype=float), lat.shape)
+    terms = terms if terms is not None else time_terms(times, delta_t)
+
+    lat, lon, alt, pressure = (a[:, None] for a in (lat, lon, alt, pressure))
+    v, alpha, delta, xi = terms['v'], terms['alpha'], terms['delta'], terms['xi']
+
+    H = spa.local_hour_angle(v, lon, alpha)
+    u = spa.uterm(lat)
+    x = spa.xterm(u, lat, alt)
+    y = spa.yterm(u, lat, alt)
+    delta_alpha = spa.parallax_sun_right_ascension(x, xi, H, delta)
+    delta_prime = spa.topocentric_sun_declination(delta, x, y, xi, delta_alpha, H)
+    H_prime = spa.topocentric_local_hour_angle(H, delta_alpha)
+    e0 = spa.topocentric_elevation_angle_without_atmosphere(lat, delta_prime, H_prime)
+    delta_e = spa.atmospheric_refraction_correction(pressure / 100, temperature, e0, SPA_ATMOS_REFRACT)
+    e = spa.topocentric_elevation_angle(e0, delta_e)
+    gamma = spa.topocentric_astronomers_azimuth(H_prime, delta_prime, lat)
+    return {
+        'apparent_zenith': spa.topocentric_zenith_angle(e),
+        'zenith': spa.topocentric_zenith_angle(e0),
+        'apparent_elevation': e,
+        'elevation': e0,
+        'azimuth': spa.topocentric_azimuth_angle(gamma),
+        'equation_of_time': terms['equation_of_time'],
+    }
+
+
+def multisite_zenith(times, latitudes, longitudes, altitudes=0.0, apparent: bool = True, **kwargs):
+    """(n_sites, n_times) array of (apparent) solar zenith angles; see `multisite_solar_positions`."""
+    positions = multisite_solar_positions(times, latitudes, longitudes, altitudes, **kwargs)
+    return positions['apparent_zenith' if apparent else 'zenith']
+
+
+def multisite_positions_for_date(
+    date_str: str,
+    latitudes,
+    longitudes,
+    altitudes=0.0,
+    freq: str = '10T',
+    timezone: str = DEFAULT_TZ,
+):
+    """Sample one local calendar day (as `get_solar_positions_for_date` does) for every site.
+
+    Returns:
+        (times, positions): the shared DatetimeIndex and the `multisite_solar_positions` dict.
+    """
+    times = _day_times(date_str, freq, timezone)
+    return times, multisite_solar_positions(times, latitudes, longitudes, altitudes)
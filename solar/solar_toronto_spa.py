@@ -1,6 +1,5 @@
-import pandas as pd
-import pvlib
-from pvlib.location import Location
+# pandas and pvlib are imported inside the functions that need them so that
+# importing aeroaqua.solar stays cheap.
 
 
 # Default location values (Toronto Harbourfront)
@@ -17,6 +16,7 @@ def get_solar_positions_for_date(
     longitude: float = DEFAULT_LONGITUDE,
     altitude: float = DEFAULT_ALTITUDE,
     timezone: str = DEFAULT_TZ,
+    use_cache: bool = True,
 ):
     """Return a DataFrame of solar position values for the given date and location.
 
@@ -24,17 +24,72 @@ def get_solar_positions_for_date(
         date_str: date string in 'YYYY-MM-DD' format.
         freq: pandas frequency string, e.g. '10T'.
         latitude, longitude, altitude, timezone: location parameters.
+        use_cache: serve the table from `aeroaqua.solar.cache` (computing it on a miss).
 
     Returns:
         pandas.DataFrame: solar position table (pvlib's get_solarposition output).
     """
-    start = f"{date_str} 00:00:00"
-    end = f"{date_str} 23:59:00"
-    times = pd.date_range(start=start, end=end, freq=freq, tz=timezone)
+    if use_cache:
+        from .cache import solar_position_cache
+        return solar_position_cache.get_days([date_str], freq, latitude, longitude, altitude, timezone)[0]
+
+    times = _day_times(date_str, freq, timezone)
+    return _compute_positions(times, latitude, longitude, altitude, timezone)
+
+
+def get_solar_positions_for_dates(
+    dates,
+    freq: str = '10T',
+    latitude: float = DEFAULT_LATITUDE,
+    longitude: float = DEFAULT_LONGITUDE,
+    altitude: float = DEFAULT_ALTITUDE,
+    timezone: str = DEFAULT_TZ,
+    use_cache: bool = True,
+):
+    """Return one stacked solar position table covering several dates.
+
+    Each date is sampled exactly as `get_solar_positions_for_date` would sample it,
+    and the per-day time indices are concatenated so that pvlib's SPA runs once
+    over the whole range (only for the days not already cached).
+
+    Args:
+        dates: iterable of date strings in 'YYYY-MM-DD' format.
+        freq: pandas frequency string, e.g. '10T'.
+        latitude, longitude, altitude, timezone: location parameters.
+        use_cache: serve per-day tables from `aeroaqua.solar.cache`.
+
+    Returns:
+        pandas.DataFrame: solar position table indexed by the concatenated timestamps.
+    """
+    import pandas as pd
+
+    dates = list(dates)
+    if not dates:
+        raise ValueError('At least one date is required')
+
+    if use_cache:
+        from .cache import solar_position_cache
+        frames = solar_position_cache.get_days(dates, freq, latitude, longitude, altitude, timezone)
+        return pd.concat(frames) if len(frames) > 1 else frames[0]
+
+    day_times = [_day_times(d, freq, timezone) for d in dates]
+    times = day_times[0].append(day_times[1:]) if len(day_times) > 1 else day_times[0]
+    return _compute_positions(times, latitude, longitude, altitude, timezone)
+
+
+def _compute_positions(times, latitude: float, longitude: float, altitude: float, timezone: str):
+    from pvlib.location import Location
 
     location = Location(latitude=latitude, longitude=longitude, tz=timezone, altitude=altitude)
-    solpos = location.get_solarposition(times)
-    return solpos
+    return location.get_solarposition(times)
+
+
+def _day_times(date_str: str, freq: str, timezone: str):
+    import pandas as pd
+
+    start = f"{date_str} 00:00:00"
+    end = f"{date_str} 23:59:00"
+    return pd.date_range(start=start, end=end, freq=freq, tz=timezone)
 
 
 if __name__ == '__main__':